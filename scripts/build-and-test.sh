@@ -90,7 +90,7 @@ pytest -v --tb=short
 # Run performance tests if requested
 if [[ "$1" == "--with-performance" ]]; then
     echo_info "Running performance tests..."
-    pytest -v --tb=short -m performance
+    SPLIT4GPT_BENCHMARKS=1 pytest -v --tb=short -m performance
 fi
 
 # Run tests with coverage if requested
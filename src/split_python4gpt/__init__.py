@@ -3,13 +3,25 @@
 
 from __future__ import annotations
 
-from importlib.metadata import PackageNotFoundError, version
+from typing import TYPE_CHECKING
 
-from .minifier import PyTypingMinifier
+if TYPE_CHECKING:
+    from .minifier import PyTypingMinifier
 
 __all__ = ["PyTypingMinifier", "__version__"]
 
-try:
-    __version__: str = version("split-python4gpt")
-except PackageNotFoundError:  # pragma: no cover
-    __version__ = "0.0.0"
+
+def __getattr__(name: str) -> object:
+    # Resolved on first access so that importing the package stays cheap
+    if name == "PyTypingMinifier":
+        from .minifier import PyTypingMinifier
+
+        return PyTypingMinifier
+    if name == "__version__":
+        from importlib.metadata import PackageNotFoundError, version
+
+        try:
+            return version("split-python4gpt")
+        except PackageNotFoundError:  # pragma: no cover
+            return "0.0.0"
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
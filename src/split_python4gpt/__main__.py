@@ -4,11 +4,12 @@
 
 from __future__ import annotations
 
+import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import fire
-
-from .minifier import PyLLMSplitter
+if TYPE_CHECKING:
+    from .watch import RebuildStats
 
 
 def split_python4gpt(
@@ -30,14 +31,41 @@ def split_python4gpt(
     mini_posargs: bool = True,
     mini_retnone: bool = True,
     mini_shebang: bool = True,
+    jobs: int = 1,
+    cache: bool = False,
+    incremental: bool = False,
+    types_mode: str = "file",
+    types_timeout: float | None = None,
+    types_memory: int | None = None,
+    planner: str = "greedy",
+    plan_report: bool = False,
+    order: str = "file",
+    models: str | tuple[str, ...] | None = None,
+    llm_backend: str | None = None,
+    llm_url: str | None = None,
+    llm_concurrency: int = 8,
+    llm_rpm: int | None = None,
+    llm_tpm: int | None = None,
+    summary_cache: str | Path | None = None,
+    summary_ttl: float | None = None,
+    summary_import: str | Path | None = None,
+    summary_export: str | Path | None = None,
+    profile: str | Path | None = None,
+    include: str | tuple[str, ...] | None = None,
+    exclude: str | tuple[str, ...] | None = None,
+    gitignore: bool = True,
+    watch: bool = False,
+    watch_debounce: float = 0.2,
 ):
     """
     Minify Python scripts or projects and/or infer types in them.
 
     Args:
         path_or_folder (str | Path): Path to the input Python file or folder.
-        out (str | Path | None, optional): Output folder for the processed files. Defaults to input folder.
-        pyis (str | Path | None, optional): Directory for storing generated .pyi files. Defaults to the output folder.
+        out (str | Path | None, optional): Output folder for the processed files.
+            Defaults to input folder.
+        pyis (str | Path | None, optional): Directory for storing generated .pyi files.
+            Defaults to the output folder.
         types (bool, optional): Infer types using PyType? Defaults to True.
         mini (bool, optional): Minify the Python scripts? Defaults to True.
         mini_docs (bool, optional): Remove docstrings? Defaults to True.
@@ -50,20 +78,116 @@ def split_python4gpt(
         mini_imports (bool, optional): Combine imports? Defaults to True.
         mini_obj (bool, optional): Remove object base? Defaults to True.
         mini_pass (bool, optional): Remove pass statements? Defaults to True.
-        mini_posargs (bool, optional): Convert positional to keyword args? Defaults to True.
-        mini_retnone (bool, optional): Remove explicit return None statements? Defaults to True.
+        mini_posargs (bool, optional): Convert positional to keyword args?
+            Defaults to True.
+        mini_retnone (bool, optional): Remove explicit return None statements?
+            Defaults to True.
         mini_shebang (bool, optional): Remove shebang? Defaults to True.
+        jobs (int, optional): Concurrent pytype processes and minification workers; 0
+            uses all CPUs. Defaults to 1.
+        cache (bool, optional): Cache minification results in <out>/.split4gpt-cache and
+            report hits/misses? Defaults to False.
+        incremental (bool, optional): Only reprocess files changed since the last run,
+            tracked in <out>/.split4gpt-manifest.json? Defaults to False.
+        types_mode (str, optional): "file" runs pytype once per file, "project" runs it
+            once over the whole output tree. Defaults to "file".
+        types_timeout (float | None, optional): Per-file pytype timeout in seconds;
+            timed-out files stay untyped. Defaults to None.
+        types_memory (int | None, optional): Per-file pytype memory limit in MB (POSIX
+            only). Defaults to None.
+        planner (str, optional): Split planner: "greedy", "ffd" or "optimal".
+            Defaults to "greedy".
+        plan_report (bool, optional): Print split count and fill ratio of every planner,
+            and the number of cross-split import edges? Defaults to False.
+        order (str, optional): File order for splitting: "file" or "imports"
+            (import-graph order). Defaults to "file".
+        models (str | tuple[str, ...] | None, optional): Comma-separated target models
+            or model:limit pairs, e.g. "gpt-3.5-turbo,gpt-3.5-turbo-16k,gpt-4-32k";
+            files are processed once and splits written to split4gpt/<model>/ for each.
+            Defaults to None.
+        llm_backend (str | None, optional): Method summariser: "openai", "local",
+            "offline" (no network) or "simpleaichat"; by default "local" with --llm_url,
+            "openai" with OPENAI_API_KEY, otherwise none. Defaults to None.
+        llm_url (str | None, optional): Chat-completions endpoint for method summaries;
+            the OpenAI API is used when only OPENAI_API_KEY is set. Defaults to None.
+        llm_concurrency (int, optional): Maximum concurrent summary requests.
+            Defaults to 8.
+        llm_rpm (int | None, optional): Summary requests-per-minute limit.
+            Defaults to None.
+        llm_tpm (int | None, optional): Summary tokens-per-minute limit.
+            Defaults to None.
+        summary_cache (str | Path | None, optional): SQLite file caching LLM summaries;
+            with --cache defaults to <out>/.split4gpt-cache/summaries.sqlite.
+            Defaults to None.
+        summary_ttl (float | None, optional): Maximum age of cached summaries in days.
+            Defaults to None.
+        summary_import (str | Path | None, optional): JSON-lines file of summaries to
+            pre-seed the summary cache with. Defaults to None.
+        summary_export (str | Path | None, optional): Write the summary cache to this
+            JSON-lines file when done. Defaults to None.
+        profile (str | Path | None, optional): Write a Chrome/Perfetto trace of
+            per-stage and per-file timings to this JSON file and print a summary table.
+            Defaults to None.
+        include (str | tuple[str, ...] | None, optional): Comma-separated globs of files
+            to process in a folder, e.g. "src/**/*.py". Defaults to "*.py".
+        exclude (str | tuple[str, ...] | None, optional): Comma-separated
+            gitignore-style globs of files and folders to skip, on top of .venv,
+            node_modules, build and the like. Defaults to None.
+        gitignore (bool, optional): Skip files ignored by .gitignore files in the input
+            folder? Defaults to True.
+        watch (bool, optional): Keep running and rebuild changed files and splits
+            whenever sources change (needs --out other than the input folder).
+            Defaults to False.
+        watch_debounce (float, optional): Seconds without further changes before a
+            rebuild starts in --watch mode. Defaults to 0.2.
 
     Returns:
         list[Path]: List of output Python files.
     """
-    splitter = PyLLMSplitter()
-    splitter.process_py(
-        py_path_or_folder=path_or_folder,
-        out_py_folder=out,
-        pyi_folder=pyis,
+    # Imported here so that `--help` and argument errors stay fast
+    from .cache import DEFAULT_CACHE_DIRNAME
+    from .discovery import DEFAULT_INCLUDE
+    from .minifier import PyLLMSplitter
+    from .summary_cache import SUMMARY_CACHE_FILENAME
+
+    splitter = PyLLMSplitter(
+        gptok_targets=_patterns(models),
+        split_planner=planner,
+        split_order=order,
+        llm_backend=llm_backend,
+        llm_base_url=llm_url,
+        llm_concurrency=llm_concurrency,
+        llm_rpm=llm_rpm,
+        llm_tpm=llm_tpm,
+    )
+    if profile:
+        splitter.enable_profiler()
+    if summary_cache or summary_ttl is not None or summary_import or summary_export:
+        if not summary_cache:
+            in_path = Path(path_or_folder)
+            summary_cache = (
+                Path(out or (in_path if in_path.is_dir() else in_path.parent))
+                / DEFAULT_CACHE_DIRNAME
+                / SUMMARY_CACHE_FILENAME
+            )
+        splitter.enable_summary_cache(
+            summary_cache,
+            ttl=summary_ttl * 86400 if summary_ttl is not None else None,
+        )
+        if summary_import:
+            splitter.summary_cache.import_entries(summary_import)
+    options = dict(
         types=types,
+        types_mode=types_mode,
+        types_timeout=types_timeout,
+        types_memory=types_memory,
         mini=mini,
+        jobs=jobs,
+        cache=cache,
+        incremental=incremental,
+        include=_patterns(include) or DEFAULT_INCLUDE,
+        exclude=_patterns(exclude),
+        gitignore=gitignore,
         combine_imports=mini_imports,
         convert_posargs_to_args=mini_posargs,
         hoist_literals=mini_lits,
@@ -78,16 +202,154 @@ def split_python4gpt(
         rename_globals=mini_globs,
         rename_locals=mini_locs,
     )
-    splitter.write_splits()
+    if watch:
+        from .watch import Watcher
+
+        watcher = Watcher(
+            splitter, path_or_folder, out, pyis, debounce=watch_debounce, **options
+        )
+        print(
+            f"Watching {watcher.py_folder} ({watcher.backend}); press Ctrl+C to stop.",
+            file=sys.stderr,
+        )
+        try:
+            watcher.run(callback=_print_rebuild)
+        except KeyboardInterrupt:
+            pass
+        return
+    splitter.process_py(
+        py_path_or_folder=path_or_folder,
+        out_py_folder=out,
+        pyi_folder=pyis,
+        **options,
+    )
+    if plan_report:
+        for name, stats in splitter.split_plan_report().items():
+            print(
+                f"Planner {name}: {stats['splits']} splits, "
+                f"{stats['fill']:.1%} fill",
+                file=sys.stderr,
+            )
+    splitter.write_splits(release=True)  # nothing reads the sections later
+    if plan_report:
+        cross, total = splitter.cross_split_edges()
+        print(f"Cross-split import edges: {cross} of {total}", file=sys.stderr)
+    if splitter.summary_cache is not None:
+        if summary_export:
+            splitter.summary_cache.export_entries(summary_export)
+        stats = splitter.summary_cache.stats()
+        print(
+            f"Summary cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['entries']} entries",
+            file=sys.stderr,
+        )
+    if splitter.minify_cache is not None:
+        stats = splitter.minify_cache.stats()
+        print(
+            f"Minify cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['bytes']} bytes",
+            file=sys.stderr,
+        )
+    if profile:
+        splitter.profiler.write_trace(profile)
+        print(splitter.profiler.format_summary(), file=sys.stderr)
+        print(f"Profile written to {profile}", file=sys.stderr)
+
+
+def _print_rebuild(stats: RebuildStats) -> None:
+    """Report one watch-mode rebuild on stderr."""
+    print(
+        f"Rebuilt in {stats.seconds:.2f}s: {stats.reprocessed} of {stats.files} "
+        f"files reprocessed, {stats.removed} removed",
+        file=sys.stderr,
+    )
+
+
+def serve(
+    socket: str | Path | None = None,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    workers: int = 4,
+    queue: int = 64,
+    gptok_model: str = "gpt-3.5-turbo",
+    gptok_limit: int | None = None,
+    gptok_threshold: int = 128,
+    planner: str = "greedy",
+    order: str = "file",
+    llm_backend: str | None = None,
+    llm_url: str | None = None,
+):
+    """
+    Serve minify, process_py_code, gptok_size and split as JSON-RPC methods.
+
+    Args:
+        socket (str | Path | None, optional): Unix socket to listen on instead of HTTP.
+            Defaults to None.
+        host (str, optional): HTTP interface to bind. Defaults to "127.0.0.1".
+        port (int, optional): HTTP port; 0 picks a free one. Defaults to 8765.
+        workers (int, optional): Requests processed concurrently. Defaults to 4.
+        queue (int, optional): Requests that may wait for a worker before further ones
+            are rejected as busy. Defaults to 64.
+        gptok_model (str, optional): Model whose tokenizer counts tokens.
+            Defaults to "gpt-3.5-turbo".
+        gptok_limit (int | None, optional): Maximum tokens per split; defaults to the
+            model's context window. Defaults to None.
+        gptok_threshold (int, optional): Token count above which function and class
+            bodies are stubbed. Defaults to 128.
+        planner (str, optional): Default split planner: "greedy", "ffd" or "optimal".
+            Defaults to "greedy".
+        order (str, optional): Default file order for splitting: "file" or "imports".
+            Defaults to "file".
+        llm_backend (str | None, optional): Method summariser, as for mdsplit4gpt.
+            Defaults to None.
+        llm_url (str | None, optional): Chat-completions endpoint for method summaries.
+            Defaults to None.
+    """
+    from .minifier import PyLLMSplitter
+    from .server import SplitServer
+
+    splitter = PyLLMSplitter(
+        gptok_model=gptok_model,
+        gptok_limit=gptok_limit,
+        gptok_threshold=gptok_threshold,
+        split_planner=planner,
+        split_order=order,
+        llm_backend=llm_backend,
+        llm_base_url=llm_url,
+    )
+    with SplitServer(splitter, workers=workers, queue_size=queue) as server:
+        address = server.bind_unix(socket) if socket else server.bind_http(host, port)
+        print(f"Serving on {address}; press Ctrl+C to stop.", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def _patterns(value: str | tuple[str, ...] | list[str] | None) -> tuple[str, ...]:
+    """Return the items of a comma-separated string or a parsed sequence."""
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(str(pattern).strip() for pattern in value if str(pattern).strip())
 
 
 def cli() -> None:
     """Run the CLI using python-fire."""
-    import sys
+    import fire
 
     fire.core.Display = lambda lines, out: print(*lines, file=sys.stdout)
     fire.Fire(split_python4gpt, name="mdsplit4gpt")
 
 
+def serve_cli() -> None:
+    """Run the JSON-RPC server CLI using python-fire."""
+    import fire
+
+    fire.core.Display = lambda lines, out: print(*lines, file=sys.stdout)
+    fire.Fire(serve, name="mdsplit4gpt-server")
+
+
 if __name__ == "__main__":
     cli()
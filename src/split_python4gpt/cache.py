@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/cache.py
+"""Content-addressed on-disk cache for python-minifier results."""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+from .fileio import atomic_write
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIRNAME = ".split4gpt-cache"
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+@functools.cache
+def python_minifier_version() -> str:
+    """Return the installed python-minifier version (looked up once)."""
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("python-minifier")
+    except PackageNotFoundError:  # pragma: no cover
+        return "unknown"
+
+
+class MinifyCache:
+    """Persistent cache mapping ``(source, options, minifier version)`` to output.
+
+    Entries are stored as ``<folder>/<kk>/<key>.min`` where *key* is the
+    SHA-256 of the source text, the merged minify options and the
+    python-minifier version.  Every hit refreshes the entry's mtime, and when
+    the cache grows beyond *max_bytes* the least recently used entries are
+    deleted.  Writes go through a temporary file and :func:`os.replace`, so
+    several processes can share one cache folder.
+
+    Attributes:
+        folder: Root folder of the cache.
+        max_bytes: Size cap in bytes before LRU eviction kicks in.
+        hits: Number of lookups served from the cache.
+        misses: Number of lookups that were not in the cache.
+    """
+
+    def __init__(
+        self, folder: str | Path, max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    ) -> None:
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size: int | None = None
+
+    @staticmethod
+    def key(py_code: str, minify_options: dict[str, object]) -> str:
+        """Return the cache key for *py_code* minified with *minify_options*."""
+        digest = hashlib.sha256()
+        digest.update(python_minifier_version().encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(
+            json.dumps(minify_options, sort_keys=True, default=str).encode("utf-8")
+        )
+        digest.update(b"\0")
+        digest.update(py_code.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.folder / key[:2] / f"{key}.min"
+
+    def get(self, py_code: str, minify_options: dict[str, object]) -> str | None:
+        """Return the cached minified code, or ``None`` on a miss."""
+        entry_path = self._entry_path(self.key(py_code, minify_options))
+        try:
+            result = entry_path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return result
+
+    def put(self, py_code: str, minify_options: dict[str, object], result: str) -> None:
+        """Store *result* as the minified form of *py_code*."""
+        entry_path = self._entry_path(self.key(py_code, minify_options))
+        data = result.encode("utf-8")
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(entry_path, data)
+        except OSError as exc:
+            logger.warning("Could not write minify cache entry %s: %s", entry_path, exc)
+            return
+        self._size = self.size() + len(data)
+        if self._size > self.max_bytes:
+            self.prune()
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for entry_path in self.folder.glob("*/*.min"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+        return entries
+
+    def size(self) -> int:
+        """Return the total size of all cache entries in bytes."""
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    def prune(self) -> int:
+        """Evict least recently used entries until the cache fits its cap.
+
+        The cache is trimmed to 90% of :attr:`max_bytes` so that a full cache
+        is not pruned again on every write.
+
+        Returns:
+            Number of evicted entries.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for _, size, entry_path in entries:
+            if total <= target:
+                break
+            try:
+                entry_path.unlink()
+            except FileNotFoundError:
+                pass  # already evicted by another process
+            except OSError:
+                continue
+            else:
+                evicted += 1
+            total -= size
+        self._size = total
+        return evicted
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters and the current cache size."""
+        return {"hits": self.hits, "misses": self.misses, "bytes": self.size()}
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/discovery.py
+"""Find the source files to process with ``os.scandir``."""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INCLUDE = ("*.py",)
+DEFAULT_EXCLUDES = (
+    ".git/",
+    ".hg/",
+    ".svn/",
+    ".venv/",
+    "venv/",
+    ".tox/",
+    ".nox/",
+    ".eggs/",
+    "*.egg-info/",
+    "__pycache__/",
+    "node_modules/",
+    "site-packages/",
+    ".mypy_cache/",
+    ".pytest_cache/",
+    ".ruff_cache/",
+    ".pytype/",
+    ".split4gpt-cache/",
+    "/build/",
+    "/dist/",
+)
+# Files marking a folder as a virtual environment or conda prefix
+ENV_MARKERS = frozenset({"pyvenv.cfg", "conda-meta"})
+
+
+def _glob_regex(pattern: str) -> str:
+    """Translate a gitignore-style glob (without anchoring) to a regex."""
+    out: list[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == n:
+            out.append("(?:/.*)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1 : end].replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+            i = end
+        elif char == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return "".join(out)
+
+
+class PathRules:
+    """Ordered gitignore-style rules; the last matching rule wins.
+
+    A pattern without a slash matches a name at any depth, a pattern with a
+    slash is anchored to the folder its rules apply to, a trailing slash
+    matches folders only and a leading ``!`` re-includes what an earlier
+    rule excluded.
+    """
+
+    def __init__(self) -> None:
+        self._rules: list[tuple[str, re.Pattern[str], bool, bool]] = []
+
+    def add(self, pattern: str, base: str = "") -> None:
+        """Add *pattern*, relative to the POSIX folder *base* of the root."""
+        negate = pattern.startswith("!")
+        if negate or pattern.startswith("\\"):
+            pattern = pattern[1:]
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        if not pattern:
+            return
+        if "/" in pattern:
+            regex = _glob_regex(pattern.lstrip("/"))
+        else:
+            regex = "(?:.*/)?" + _glob_regex(pattern)
+        prefix = f"{base}/" if base else ""
+        self._rules.append((prefix, re.compile(regex + r"\Z"), negate, dir_only))
+
+    def add_lines(self, lines: Iterable[str], base: str = "") -> None:
+        """Add the patterns of a ``.gitignore`` file in folder *base*."""
+        for line in lines:
+            line = line.rstrip("\n")
+            if line.endswith(" ") and not line.endswith("\\ "):
+                line = line.rstrip(" ")
+            if line and not line.startswith("#"):
+                self.add(line, base)
+
+    def copy(self) -> PathRules:
+        """Return a copy to which a nested folder's rules can be added."""
+        rules = PathRules()
+        rules._rules = list(self._rules)
+        return rules
+
+    def match(self, rel_path: str, is_dir: bool) -> bool:
+        """Return whether the POSIX path *rel_path* is matched by the rules."""
+        matched = False
+        for prefix, regex, negate, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if prefix:
+                if not rel_path.startswith(prefix):
+                    continue
+                path = rel_path[len(prefix) :]
+            else:
+                path = rel_path
+            if regex.match(path):
+                matched = not negate
+        return matched
+
+
+class Discovery:
+    """Walk a source tree and collect the files to process.
+
+    Folders are listed with :func:`os.scandir` and pruned as soon as they
+    are excluded, so ignored trees such as ``.venv`` or ``node_modules`` are
+    never walked.  Symlinked folders are not followed.
+
+    Args:
+        include: Globs selecting files, e.g. ``"*.py"`` or ``"src/**/*.py"``.
+        exclude: Gitignore-style globs of files and folders to skip, added
+            after :data:`DEFAULT_EXCLUDES`.
+        default_excludes: Whether to apply :data:`DEFAULT_EXCLUDES` and to
+            prune virtual environments (folders holding one of
+            :data:`ENV_MARKERS`).
+        gitignore: Whether to honour ``.gitignore`` files in the tree.
+        skip: Folders to leave out wherever they are, e.g. the output folder
+            when it lies inside the input folder.
+
+    Attributes:
+        dirs_scanned: Folders listed by the last :meth:`scan`.
+        dirs_pruned: Folders skipped by the last :meth:`scan`.
+        seconds: Duration of the last :meth:`scan`.
+    """
+
+    def __init__(
+        self,
+        include: Sequence[str] = DEFAULT_INCLUDE,
+        exclude: Sequence[str] = (),
+        default_excludes: bool = True,
+        gitignore: bool = True,
+        skip: Iterable[str | Path] = (),
+    ) -> None:
+        self.include = PathRules()
+        for pattern in include:
+            self.include.add(pattern)
+        self.exclude = PathRules()
+        for pattern in (*(DEFAULT_EXCLUDES if default_excludes else ()), *exclude):
+            self.exclude.add(pattern)
+        self.default_excludes = default_excludes
+        self.gitignore = gitignore
+        self.skip = {Path(path).resolve() for path in skip}
+        self.dirs_scanned = 0
+        self.dirs_pruned = 0
+        self.seconds = 0.0
+
+    def scan(self, root: str | Path) -> list[Path]:
+        """Return the included files under *root*, sorted by relative path.
+
+        Args:
+            root: Folder to walk.
+
+        Returns:
+            Absolute paths of the included files.
+        """
+        start = time.perf_counter()
+        root = Path(root).resolve()
+        self.dirs_scanned = self.dirs_pruned = 0
+        found: list[str] = []
+        stack: list[tuple[str, str, PathRules]] = [(str(root), "", self.exclude)]
+        while stack:
+            folder, rel_folder, rules = stack.pop()
+            try:
+                with os.scandir(folder) as scanner:
+                    entries = list(scanner)
+            except OSError as exc:
+                logger.warning("Cannot list %s: %s", folder, exc)
+                continue
+            self.dirs_scanned += 1
+            names = {entry.name for entry in entries}
+            if rel_folder and self.default_excludes and names & ENV_MARKERS:
+                self.dirs_pruned += 1
+                continue
+            if self.gitignore and ".gitignore" in names:
+                rules = rules.copy()
+                try:
+                    with open(
+                        os.path.join(folder, ".gitignore"), encoding="utf-8"
+                    ) as gitignore_file:
+                        rules.add_lines(gitignore_file, rel_folder)
+                except (OSError, UnicodeDecodeError) as exc:
+                    logger.warning("Cannot read %s/.gitignore: %s", folder, exc)
+            for entry in entries:
+                rel_path = f"{rel_folder}/{entry.name}" if rel_folder else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    is_file = not is_dir and entry.is_file()
+                except OSError:
+                    continue
+                if is_dir:
+                    if rules.match(rel_path, True) or (
+                        self.skip and Path(entry.path) in self.skip
+                    ):
+                        self.dirs_pruned += 1
+                    else:
+                        stack.append((entry.path, rel_path, rules))
+                elif (
+                    is_file
+                    and self.include.match(rel_path, False)
+                    and not rules.match(rel_path, False)
+                ):
+                    found.append(rel_path)
+        found.sort(key=lambda rel_path: rel_path.split("/"))
+        self.seconds = time.perf_counter() - start
+        return [root / rel_path for rel_path in found]
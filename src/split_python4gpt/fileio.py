@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/fileio.py
+"""Atomic file writes that leave unchanged files untouched."""
+
+from __future__ import annotations
+
+import itertools
+import os
+import stat
+from pathlib import Path
+
+_tmp_ids = itertools.count()
+
+
+def atomic_write(path: str | Path, data: bytes, mode: int | None = None) -> None:
+    """Write *data* to *path* through a temporary file and :func:`os.replace`.
+
+    Readers see either the old or the new content, never a partial file.
+    The temporary file is created next to *path* (so the rename stays on one
+    filesystem) with the default permissions of new files, or with *mode*
+    when given.
+
+    Args:
+        path: Destination file; its folder must exist.
+        data: Bytes to write.
+        mode: Permission bits for the written file.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{next(_tmp_ids)}.tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def write_if_changed(path: str | Path, text: str) -> bool:
+    """Atomically write *text* as UTF-8 unless *path* already holds it.
+
+    Skipping identical content keeps the file's mtime stable for build tools
+    and watchers.  An existing file keeps its permission bits.
+
+    Args:
+        path: Destination file; its folder must exist.
+        text: Content to write.  Newlines are written as-is.
+
+    Returns:
+        ``True`` if the file was written, ``False`` if it was unchanged.
+    """
+    data = text.encode("utf-8")
+    try:
+        current = os.stat(path)
+    except FileNotFoundError:
+        mode = None
+    else:
+        if current.st_size == len(data) and Path(path).read_bytes() == data:
+            return False
+        mode = stat.S_IMODE(current.st_mode)
+    atomic_write(path, data, mode)
+    return True
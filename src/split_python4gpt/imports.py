@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/imports.py
+"""Intra-project import graph used to order files into splits."""
+
+from __future__ import annotations
+
+from ast import AST, Import, ImportFrom, walk
+from collections.abc import Iterable
+from pathlib import Path
+
+
+def package_prefix(folder: Path) -> str:
+    """Return the dotted package that *folder* belongs to, if any.
+
+    Walks up from *folder* while each directory contains an
+    ``__init__.py``, so that files of an input folder such as
+    ``src/mypkg`` are named ``mypkg.*`` and absolute imports of the package
+    resolve.
+    """
+    parts: list[str] = []
+    folder = Path(folder)
+    while (folder / "__init__.py").exists() and folder.name:
+        parts.append(folder.name)
+        folder = folder.parent
+    return ".".join(reversed(parts))
+
+
+def module_name(rel_path: Path, prefix: str = "") -> str:
+    """Return the dotted module name of the file at *rel_path*.
+
+    Args:
+        rel_path: Path of a ``.py`` file relative to the input folder.
+        prefix: Dotted package of the input folder (see
+            :func:`package_prefix`).
+    """
+    parts = list(Path(rel_path).with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(filter(None, [prefix, *parts]))
+
+
+def imported_names(nodes: Iterable[AST], module: str, is_package: bool) -> list[str]:
+    """Return the dotted names imported anywhere within *nodes*.
+
+    Relative imports are resolved against *module*.  For ``from a import b``
+    the name ``a.b`` is returned; :func:`import_graph` maps it to module
+    ``a.b`` if that exists and to ``a`` otherwise.
+
+    Args:
+        nodes: Top-level statements of the module.
+        module: Dotted name of the module the statements belong to.
+        is_package: Whether the module is a package ``__init__``.
+
+    Returns:
+        Sorted, de-duplicated dotted names.
+    """
+    package = module if is_package else module.rpartition(".")[0]
+    names: set[str] = set()
+    for top in nodes:
+        for node in walk(top):
+            if isinstance(node, Import):
+                names.update(alias.name for alias in node.names)
+            elif isinstance(node, ImportFrom):
+                base = node.module or ""
+                if node.level:
+                    parts = package.split(".") if package else []
+                    if node.level - 1 > len(parts):
+                        continue  # beyond the top-level package
+                    parts = parts[: len(parts) - (node.level - 1)]
+                    base = ".".join(filter(None, [*parts, base]))
+                if not base:
+                    names.update(alias.name for alias in node.names)
+                else:
+                    names.add(base)
+                    names.update(f"{base}.{alias.name}" for alias in node.names)
+    return sorted(names)
+
+
+def import_graph(imports: dict[str, list[str]]) -> dict[str, list[str]]:
+    """Resolve imported names to the project modules they refer to.
+
+    Args:
+        imports: Mapping from module name to the names it imports (see
+            :func:`imported_names`).
+
+    Returns:
+        Mapping from each module to the other project modules it imports,
+        in first-seen order.  Imports of modules outside the project are
+        dropped.
+    """
+    graph: dict[str, list[str]] = {}
+    for module, names in imports.items():
+        targets: dict[str, None] = {}
+        for name in names:
+            while name and name not in imports:
+                name = name.rpartition(".")[0]
+            if name and name != module:
+                targets[name] = None
+        graph[module] = list(targets)
+    return graph
+
+
+def strongly_connected_components(graph: dict[str, list[str]]) -> list[list[str]]:
+    """Return the strongly connected components of *graph*.
+
+    Uses an iterative form of Tarjan's algorithm, visiting nodes in the
+    order of *graph*.  Components are returned in reverse topological order
+    of the condensed graph: every component comes after all components it
+    imports, so dependencies precede their dependents, and modules reached
+    from the same importer stay close together.
+
+    Args:
+        graph: Mapping from node to its successors; successors missing from
+            the mapping are ignored.
+
+    Returns:
+        List of components, each a list of nodes.
+    """
+    index: dict[str, int] = {}
+    lowlink: dict[str, int] = {}
+    stack: list[str] = []
+    on_stack: set[str] = set()
+    components: list[list[str]] = []
+
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(graph[root]))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            for succ in successors:
+                if succ not in graph:
+                    continue
+                if succ not in index:
+                    index[succ] = lowlink[succ] = len(index)
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(graph[succ])))
+                    break
+                if succ in on_stack:
+                    lowlink[node] = min(lowlink[node], index[succ])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component[::-1])
+    return components
+
+
+def import_order(graph: dict[str, list[str]]) -> list[str]:
+    """Order the modules of *graph* so that coupled modules are adjacent.
+
+    Modules of one import cycle are kept together and every module follows
+    the modules it imports (see :func:`strongly_connected_components`).
+    """
+    return [
+        node for component in strongly_connected_components(graph) for node in component
+    ]
+
+
+def cross_split_edges(
+    graph: dict[str, list[str]], splits: list[list[str]]
+) -> tuple[int, int]:
+    """Count import edges whose two ends never share a split.
+
+    Each such edge means a reader of the importing module has to load an
+    additional split to see the imported one.
+
+    Args:
+        graph: Import graph from :func:`import_graph`.
+        splits: Modules contained in each split; a module cut across
+            several splits appears in each of them.
+
+    Returns:
+        ``(cross_split, total)`` edge counts.
+    """
+    split_ids: dict[str, set[int]] = {}
+    for i, modules in enumerate(splits):
+        for module in modules:
+            split_ids.setdefault(module, set()).add(i)
+    total = cross = 0
+    for module, targets in graph.items():
+        for target in targets:
+            total += 1
+            if split_ids.get(module, set()).isdisjoint(split_ids.get(target, set())):
+                cross += 1
+    return cross, total
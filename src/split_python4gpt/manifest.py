@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/manifest.py
+"""Per-file build manifest used for incremental rebuilds."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+from .fileio import atomic_write
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = ".split4gpt-manifest.json"
+MANIFEST_VERSION = 3
+
+
+def source_hash(py_code: str) -> str:
+    """Return the SHA-256 hex digest of *py_code*."""
+    return hashlib.sha256(py_code.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class Manifest:
+    """Records what each input file looked like when it was last processed.
+
+    Each entry is keyed by the file's POSIX path relative to the input folder
+    and holds the source ``mtime_ns``, ``size`` and ``sha256`` together with
+    any results worth reusing (e.g. sections and token counts).  The whole
+    manifest is tied to an *options* fingerprint: if the processing options
+    change, every entry is discarded.
+
+    Attributes:
+        path: Location of the manifest JSON file.
+        options: JSON-normalised options the entries were produced with.
+        files: Mapping from relative path to entry dict.
+    """
+
+    def __init__(self, path: str | Path, options: dict[str, object]) -> None:
+        self.path = Path(path)
+        self.options = self._normalise(options)
+        self.files: dict[str, dict] = {}
+        self._seen: set[str] = set()
+        self._dirty = True  # differs from what is on disk
+
+    @staticmethod
+    def _normalise(options: dict[str, object]) -> dict[str, object]:
+        return json.loads(json.dumps(options, sort_keys=True, default=str))
+
+    @classmethod
+    def load(cls, path: str | Path, options: dict[str, object]) -> Manifest:
+        """Load the manifest at *path*, keeping entries only if *options* match.
+
+        A missing, unreadable or outdated manifest yields an empty one.
+        """
+        manifest = cls(path, options)
+        try:
+            data = json.loads(manifest.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return manifest
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable manifest %s: %s", manifest.path, exc)
+            return manifest
+        if (
+            data.get("version") == MANIFEST_VERSION
+            and data.get("options") == manifest.options
+        ):
+            manifest.files = data.get("files", {})
+            manifest._dirty = False
+        else:
+            logger.info("Manifest options changed; rebuilding all files.")
+        return manifest
+
+    def matches(self, path: str | Path, options: dict[str, object]) -> bool:
+        """Return whether this manifest is stored at *path* for *options*."""
+        return self.path == Path(path) and self.options == self._normalise(options)
+
+    def start_run(self) -> None:
+        """Forget which files were seen, to reuse the manifest for a new run."""
+        self._seen = set()
+
+    def lookup(self, rel_path: Path, py_path: Path) -> dict | None:
+        """Return the entry for *rel_path* if *py_path* is unchanged since.
+
+        The ``mtime_ns`` and ``size`` of *py_path* are compared first; only
+        when the mtime differs is the file read and its hash compared.
+
+        Returns:
+            The stored entry, or ``None`` when the file must be reprocessed.
+        """
+        key = rel_path.as_posix()
+        entry = self.files.get(key)
+        if entry is None:
+            return None
+        try:
+            stat = py_path.stat()
+        except OSError:
+            return None
+        if stat.st_size != entry["size"]:
+            return None
+        if stat.st_mtime_ns != entry["mtime_ns"]:
+            try:
+                py_code = py_path.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                return None
+            if source_hash(py_code) != entry["sha256"]:
+                return None
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self._dirty = True
+        self._seen.add(key)
+        return entry
+
+    def record(
+        self, rel_path: Path, py_path: Path, py_code: str, **data: object
+    ) -> dict:
+        """Store a fresh entry for *rel_path* from its current source.
+
+        Args:
+            rel_path: Path relative to the input folder.
+            py_path: Absolute path to the source file (for ``stat``).
+            py_code: Source text as read for processing.
+            **data: Extra JSON-serialisable results to keep with the entry.
+
+        Returns:
+            The new entry.
+        """
+        stat = py_path.stat()
+        entry: dict = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": source_hash(py_code),
+        } | data
+        key = rel_path.as_posix()
+        self.files[key] = entry
+        self._seen.add(key)
+        self._dirty = True
+        return entry
+
+    def update(self, rel_path: Path, **data: object) -> None:
+        """Merge *data* into the existing entry for *rel_path*."""
+        entry = self.files.get(rel_path.as_posix())
+        if entry is not None:
+            entry.update(data)
+            self._dirty = True
+
+    def save(self) -> None:
+        """Atomically write the manifest, dropping files not seen this run.
+
+        Nothing is written when no entry changed since the last load or save.
+        """
+        if len(self._seen) != len(self.files):
+            self.files = {k: v for k, v in self.files.items() if k in self._seen}
+            self._dirty = True
+        if not self._dirty:
+            return
+        data = {
+            "version": MANIFEST_VERSION,
+            "options": self.options,
+            "files": self.files,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.path, json.dumps(data).encode("utf-8"))
+        self._dirty = False
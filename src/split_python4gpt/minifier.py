@@ -4,17 +4,69 @@
 
 from __future__ import annotations
 
-import contextlib
 import logging
+import os
 import shutil
+import signal
 import subprocess
-from ast import ClassDef, FunctionDef, NodeTransformer, fix_missing_locations, parse
+import tempfile
+from ast import (
+    AST,
+    AsyncFunctionDef,
+    ClassDef,
+    Constant,
+    Expr,
+    FunctionDef,
+    NodeTransformer,
+    fix_missing_locations,
+    get_docstring,
+    parse,
+)
+from collections import deque
+from collections.abc import Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from dataclasses import replace
+from inspect import signature
 from os import environ
 from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
 
 from ast import unparse as ast_unparse
 
-from python_minifier import minify
+from .cache import (
+    DEFAULT_CACHE_DIRNAME,
+    DEFAULT_CACHE_MAX_BYTES,
+    MinifyCache,
+    python_minifier_version,
+)
+from .discovery import DEFAULT_INCLUDE, Discovery
+from .fileio import write_if_changed
+from .imports import (
+    cross_split_edges,
+    import_graph,
+    import_order,
+    imported_names,
+    module_name,
+    package_prefix,
+)
+from .manifest import MANIFEST_FILENAME, Manifest
+from .planner import SPLIT_PLANNERS, plan_greedy, plan_stats
+from .profiling import NULL_PROFILER, NullProfiler, Profiler
+from .records import FileRecord, Section
+from .summary_cache import (
+    DEFAULT_SUMMARY_CACHE_MAX_ENTRIES,
+    SUMMARY_CACHE_FILENAME,
+    SummaryCache,
+)
+from .tokens import (
+    DEFAULT_TOKEN_CACHE_SIZE,
+    DEFAULT_TOKEN_THREADS,
+    TokenCounter,
+    TokenEstimator,
+)
+
+if TYPE_CHECKING:
+    from .summarize import SummarizerBackend
 
 OPENAI_MODELS: dict[str, int] = {
     "gpt-4": 8192,
@@ -27,8 +79,76 @@ OPENAI_MODELS: dict[str, int] = {
     "gpt-3.5-turbo-16k-0613": 16384,
 }
 
+
 logger = logging.getLogger(__name__)
 
+_NOT_LOADED = object()  # sentinel for lazily loaded optional dependencies
+# files whose syntax trees are held at once while sectioning
+SECTION_BATCH_FILES = 64
+
+
+class SplitTarget(NamedTuple):
+    """A context size to write splits for (see ``gptok_targets``).
+
+    Attributes:
+        name: Folder of the target's splits under ``split4gpt/``.
+        model: Model whose tokenizer measures the splits.
+        limit: Maximum tokens per split.
+    """
+
+    name: str
+    model: str
+    limit: int
+
+
+def split_target(spec: str | tuple[str, int] | SplitTarget) -> SplitTarget:
+    """Return the :class:`SplitTarget` described by *spec*.
+
+    Args:
+        spec: A model from :data:`OPENAI_MODELS` (``"gpt-4"``), a model and
+            limit (``"gpt-4:6000"`` or ``("gpt-4", 6000)``), or a target.
+            Targets with a limit other than the model's context window are
+            named ``<model>-<limit>``.
+
+    Raises:
+        ValueError: If *spec* has no limit and its model is not in
+            :data:`OPENAI_MODELS`, or the limit is not a positive integer.
+    """
+    if isinstance(spec, SplitTarget):
+        return spec
+    if isinstance(spec, str):
+        model, _, limit_text = spec.partition(":")
+        model, limit_text = model.strip(), limit_text.strip()
+        try:
+            limit = int(limit_text) if limit_text else None
+        except ValueError:
+            raise ValueError(
+                f"Invalid split target {spec!r}; expected <model> or <model>:<limit>"
+            ) from None
+    else:
+        model, limit = spec
+    if limit is None:
+        if model not in OPENAI_MODELS:
+            raise ValueError(
+                f"Unknown model {model!r}; give its limit as {model}:<tokens>"
+            )
+        limit = OPENAI_MODELS[model]
+    if limit <= 0:
+        raise ValueError(f"Split target limit must be positive, got {limit}")
+    name = model if limit == OPENAI_MODELS.get(model) else f"{model}-{limit}"
+    return SplitTarget(name, model, int(limit))
+
+
+def _load_encoding(model: str) -> object | None:
+    """Return the tiktoken encoding of *model*, or ``None`` if unavailable."""
+    try:
+        import tiktoken  # lazy optional import
+
+        return tiktoken.encoding_for_model(model)
+    except Exception as exc:
+        logger.warning("tiktoken unavailable (%s); using character estimate.", exc)
+        return None
+
 
 class PyTypingMinifier:
     """Minifies Python files and optionally infers types using pytype.
@@ -40,7 +160,21 @@ class PyTypingMinifier:
         py_folder: Resolved source folder (set by :meth:`init_folders`).
         out_py_folder: Resolved output folder.
         pyi_folder: Folder used to store ``.pyi`` stubs generated by pytype.
-        code_folder_data: Mapping from output path to per-file metadata dict.
+        code_folder_data: Mapping from output path to per-file
+            :class:`~split_python4gpt.records.FileRecord`.
+        minify_cache: On-disk cache consulted by :meth:`minify`, or ``None``
+            when caching is disabled (see :meth:`enable_minify_cache`).
+        manifest: Build manifest consulted by :meth:`read_py_folder` and
+            :meth:`read_py_file` in incremental mode, or ``None``.
+        pytype_timeouts: Files whose pytype run hit the per-file timeout and
+            were left untyped.
+        pytype_sources: Folder pytype analyses instead of
+            :attr:`out_py_folder`, holding the sources at the same relative
+            paths, or ``None``.  :meth:`process_py` stages the unminified
+            sources there while it infers types.
+        profiler: Records timing spans and counters of every stage, or a
+            no-op :class:`~split_python4gpt.profiling.NullProfiler` (see
+            :meth:`enable_profiler`).
     """
 
     def __init__(self, py_ver: str = "3.10") -> None:
@@ -55,7 +189,12 @@ class PyTypingMinifier:
         self.py_folder: Path | None = None
         self.out_py_folder: Path | None = None
         self.pyi_folder: Path | None = None
-        self.code_folder_data: dict[Path, dict] = {}
+        self.code_folder_data: dict[Path, FileRecord] = {}
+        self.minify_cache: MinifyCache | None = None
+        self.manifest: Manifest | None = None
+        self.pytype_timeouts: list[Path] = []
+        self.pytype_sources: Path | None = None
+        self.profiler: NullProfiler = NULL_PROFILER
 
     # ------------------------------------------------------------------
     # Folder / file initialisation helpers
@@ -84,6 +223,39 @@ class PyTypingMinifier:
         self.pyi_folder = Path(pyi_folder) if pyi_folder else self.out_py_folder
         self.pyi_folder.mkdir(parents=True, exist_ok=True)
 
+    def enable_minify_cache(
+        self,
+        cache_folder: str | Path | None = None,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    ) -> MinifyCache:
+        """Turn on the persistent python-minifier result cache.
+
+        Args:
+            cache_folder: Folder holding cache entries.  Defaults to
+                ``<out_py_folder>/.split4gpt-cache``.
+            max_bytes: Size cap before least recently used entries are evicted.
+
+        Returns:
+            The active :class:`~split_python4gpt.cache.MinifyCache`.
+        """
+        if cache_folder is None:
+            if self.out_py_folder is None:
+                raise ValueError("cache_folder is required before folders are set")
+            cache_folder = self.out_py_folder / DEFAULT_CACHE_DIRNAME
+        self.minify_cache = MinifyCache(cache_folder, max_bytes=max_bytes)
+        return self.minify_cache
+
+    def enable_profiler(self) -> Profiler:
+        """Turn on timing spans and counters for subsequent calls.
+
+        Returns:
+            The active :class:`~split_python4gpt.profiling.Profiler`; write
+            its trace with :meth:`~split_python4gpt.profiling.Profiler.write_trace`.
+        """
+        if not isinstance(self.profiler, Profiler):
+            self.profiler = Profiler()
+        return self.profiler
+
     def read_py_file(
         self,
         py_path: str | Path,
@@ -99,14 +271,16 @@ class PyTypingMinifier:
         """
         py_path = Path(py_path).resolve()
         self.init_folders(py_path.parent, out_py_folder, pyi_folder)
-        out_py_path, code_data = self.init_code_data(py_path)
-        self.code_folder_data[out_py_path] = code_data
+        self._register_py_file(py_path)
 
     def read_py_folder(
         self,
         py_folder: str | Path,
         out_py_folder: str | Path | None = None,
         pyi_folder: str | Path | None = None,
+        include: Sequence[str] = DEFAULT_INCLUDE,
+        exclude: Sequence[str] = (),
+        gitignore: bool = True,
     ) -> None:
         """Register all ``.py`` files under *py_folder* for processing.
 
@@ -114,59 +288,167 @@ class PyTypingMinifier:
             py_folder: Root of the source tree to process recursively.
             out_py_folder: Output folder override.
             pyi_folder: Stub folder override.
+            include: Globs selecting the files to process.
+            exclude: Extra gitignore-style globs of files and folders to skip.
+            gitignore: Whether to honour ``.gitignore`` files.
         """
         self.init_folders(py_folder, out_py_folder, pyi_folder)
-        for py_path in Path(self.py_folder).rglob("*.py"):  # type: ignore[arg-type]
-            out_py_path, code_data = self.init_code_data(py_path)
-            self.code_folder_data[out_py_path] = code_data
+        for py_path in self.discover_py_files(include, exclude, gitignore):
+            self._register_py_file(py_path)
+
+    def discover_py_files(
+        self,
+        include: Sequence[str] = DEFAULT_INCLUDE,
+        exclude: Sequence[str] = (),
+        gitignore: bool = True,
+    ) -> list[Path]:
+        """Return the files to process under :attr:`py_folder`, sorted.
 
-    def init_code_data(self, py_path: str | Path) -> tuple[Path, dict]:
-        """Copy *py_path* to the output folder and build its metadata dict.
+        Besides :data:`~split_python4gpt.discovery.DEFAULT_EXCLUDES`, the
+        output and stub folders are skipped when they lie inside the input
+        folder, as are earlier splits and pytype files, so a run never picks
+        up its own output.  See :class:`~split_python4gpt.discovery.Discovery`.
+
+        Args:
+            include: Globs selecting the files to process.
+            exclude: Extra gitignore-style globs of files and folders to skip.
+            gitignore: Whether to honour ``.gitignore`` files.
+        """
+        discovery = self.make_discovery(include, exclude, gitignore)
+        py_paths = discovery.scan(self.py_folder)  # type: ignore[arg-type]
+        self.profiler.count("dirs_scanned", discovery.dirs_scanned)
+        self.profiler.count("dirs_pruned", discovery.dirs_pruned)
+        logger.info(
+            "Discovered %d files in %.3fs (%d folders listed, %d pruned).",
+            len(py_paths),
+            discovery.seconds,
+            discovery.dirs_scanned,
+            discovery.dirs_pruned,
+        )
+        return py_paths
+
+    def make_discovery(
+        self,
+        include: Sequence[str] = DEFAULT_INCLUDE,
+        exclude: Sequence[str] = (),
+        gitignore: bool = True,
+    ) -> Discovery:
+        """Return the file discovery used by :meth:`discover_py_files`.
+
+        Args:
+            include: Globs selecting the files to process.
+            exclude: Extra gitignore-style globs of files and folders to skip.
+            gitignore: Whether to honour ``.gitignore`` files.
+
+        Returns:
+            A :class:`~split_python4gpt.discovery.Discovery` that also skips
+            the output folders of this minifier.
+        """
+        skip = [
+            Path(self.out_py_folder, "split4gpt"),  # type: ignore[arg-type]
+            Path(self.pyi_folder, ".pytype"),  # type: ignore[arg-type]
+        ]
+        for folder in (self.out_py_folder, self.pyi_folder):
+            if Path(folder).resolve() != self.py_folder:  # type: ignore[arg-type]
+                skip.append(folder)  # type: ignore[arg-type]
+        return Discovery(include, exclude, gitignore=gitignore, skip=skip)
+
+    def _register_py_file(self, py_path: Path) -> None:
+        """Add *py_path* to :attr:`code_folder_data`.
+
+        In incremental mode a file whose manifest entry is still valid is
+        registered from that entry (marked ``cached``) without being copied
+        or read; otherwise :meth:`init_code_data` is used.
+        """
+        if self.manifest is not None:
+            py_path = Path(py_path).resolve()
+            rel_py_path = py_path.relative_to(self.py_folder)  # type: ignore[arg-type]
+            out_py_path = Path(
+                self.out_py_folder, rel_py_path  # type: ignore[arg-type]
+            )
+            entry = self.manifest.lookup(rel_py_path, py_path)
+            if entry is not None and out_py_path.exists():
+                sections = entry.get("sections")
+                self.code_folder_data[out_py_path] = FileRecord(
+                    py_path,
+                    rel_py_path,
+                    self._pyi_path(rel_py_path),
+                    cached=True,
+                    sections=(
+                        [Section.from_json(sec) for sec in sections]
+                        if sections is not None
+                        else None
+                    ),
+                    gptok_size=entry.get("gptok_size", 0),
+                    imports=entry.get("imports", []),
+                )
+                return
+        out_py_path, code_data = self.init_code_data(py_path)
+        self.code_folder_data[out_py_path] = code_data
+
+    def _pyi_path(self, rel_py_path: Path) -> Path:
+        """Return where pytype writes the stub for *rel_py_path*."""
+        return Path(
+            self.pyi_folder,  # type: ignore[arg-type]
+            ".pytype",
+            "pyi",
+            rel_py_path.with_suffix(".pyi"),
+        )
+
+    def init_code_data(self, py_path: str | Path) -> tuple[Path, FileRecord]:
+        """Read *py_path* and build its record.
+
+        The source is read once; nothing is written until the processed
+        output is ready (see :meth:`process_py`).
 
         Args:
             py_path: Absolute path to a source ``.py`` file.
 
         Returns:
             A ``(out_py_path, code_data)`` tuple where *out_py_path* is the
-            destination path and *code_data* holds path/content metadata.
+            destination path and *code_data* holds the paths and source.
         """
         py_path = Path(py_path).resolve()
         rel_py_path = py_path.relative_to(self.py_folder)  # type: ignore[arg-type]
         out_py_path = Path(self.out_py_folder, rel_py_path)  # type: ignore[arg-type]
-        rel_out_py_path = out_py_path.relative_to(self.out_py_folder)  # type: ignore[arg-type]
-        out_py_path.parent.mkdir(parents=True, exist_ok=True)
-        if out_py_path != py_path:
-            shutil.copy2(py_path, out_py_path)
-        pyi_path = Path(
-            self.pyi_folder,  # type: ignore[arg-type]
-            ".pytype",
-            "pyi",
-            rel_out_py_path.with_suffix(".pyi").name,
+        rel_out_py_path = out_py_path.relative_to(
+            self.out_py_folder  # type: ignore[arg-type]
         )
-        py_code = out_py_path.read_text(encoding="utf-8")
-        code_data: dict = {
-            "py_path": py_path,
-            "rel_path": rel_py_path,
-            "pyi_path": pyi_path,
-            "py_code": py_code,
-        }
-        return out_py_path, code_data
+        pyi_path = self._pyi_path(rel_out_py_path)
+        with self.profiler.span("read", "file", file=rel_py_path):
+            py_code = py_path.read_text(encoding="utf-8")
+        if self.profiler.enabled:
+            self.profiler.count("bytes_in", len(py_code.encode("utf-8")))
+        return out_py_path, FileRecord(py_path, rel_py_path, pyi_path, py_code)
 
     # ------------------------------------------------------------------
     # Core operations
     # ------------------------------------------------------------------
 
-    def infer_types(self, py_path: Path, pyi_path: Path, py_code: str) -> str:
+    def infer_types(
+        self,
+        py_path: Path,
+        pyi_path: Path,
+        py_code: str,
+        timeout: float | None = None,
+        memory_limit: int | None = None,
+    ) -> str:
         """Run pytype on *py_path* and merge type stubs back into the source.
 
-        If the pytype executable is unavailable or fails, a warning is logged
-        and the original *py_code* is returned unchanged.
+        If the pytype executable is unavailable, fails, or exceeds one of the
+        limits, a warning is logged and the original *py_code* is returned
+        unchanged.
 
         Args:
-            py_path: Absolute path to the (output) Python file to analyse.
-            pyi_path: Expected location of the ``.pyi`` stub generated by
-                pytype.
+            py_path: Absolute path to the (output) Python file to analyse;
+                pytype reads it from :attr:`pytype_sources` when that is set.
+            pyi_path: Where the ``.pyi`` stub generated by pytype is kept.
             py_code: Current source text of the file.
+            timeout: Seconds after which pytype, together with the ``ninja``
+                and worker processes it started, is killed.  Timed-out files
+                are recorded in :attr:`pytype_timeouts`.
+            memory_limit: Address-space limit for the pytype process in
+                megabytes (POSIX only).
 
         Returns:
             Source text annotated with inferred types, or *py_code* unchanged
@@ -182,25 +464,192 @@ class PyTypingMinifier:
         try:
             from pytype.tools.merge_pyi import merge_pyi  # lazy optional import
 
-            command = [
-                self.PY_TYPE_PY_EXE,
-                "-m",
-                "pytype",
-                f"--python-version={self.PY_TYPE_PY_VER}",
-                str(py_path.relative_to(self.pyi_folder)),  # type: ignore[arg-type]
-            ]
-            subprocess.run(command, cwd=self.pyi_folder, check=True, capture_output=True)
-            pyi_code = pyi_path.read_text(encoding="utf-8")
+            rel_py_path = py_path.relative_to(
+                self.out_py_folder  # type: ignore[arg-type]
+            )
+            source_folder = self.pytype_sources or self.out_py_folder
+            pytype_folder = Path(self.pyi_folder, ".pytype")  # type: ignore[arg-type]
+            pytype_folder.mkdir(parents=True, exist_ok=True)
+            # Each run gets its own output folder: pytype rewrites build.ninja
+            # and imports/ there, so concurrent runs must not share one.
+            with tempfile.TemporaryDirectory(prefix="job-", dir=pytype_folder) as job:
+                command = _memory_limited(
+                    [
+                        self.PY_TYPE_PY_EXE,
+                        "-m",
+                        "pytype",
+                        f"--python-version={self.PY_TYPE_PY_VER}",
+                        f"--output={job}",
+                        f"--pythonpath={self._pytype_path()}",
+                        str(rel_py_path),
+                    ],
+                    memory_limit,
+                )
+                with self.profiler.span("pytype", "file", file=py_path.name):
+                    _run_process_group(
+                        command, source_folder, timeout  # type: ignore[arg-type]
+                    )
+                pyi_code = Path(job, "pyi", rel_py_path.with_suffix(".pyi")).read_text(
+                    encoding="utf-8"
+                )
+            pyi_path.parent.mkdir(parents=True, exist_ok=True)
+            write_if_changed(pyi_path, pyi_code)
             py_code = merge_pyi.merge_sources(py=py_code, pyi=pyi_code)
+        except subprocess.TimeoutExpired:
+            logger.warning("Pytype timed out for %s after %ss.", py_path, timeout)
+            self.pytype_timeouts.append(py_path)
         except Exception as exc:
             logger.warning("Pytype failed for %s: %s", py_path, exc)
         return py_code
 
+    def infer_types_many(
+        self,
+        files: list[tuple[Path, Path, str]],
+        jobs: int = 1,
+        timeout: float | None = None,
+        memory_limit: int | None = None,
+    ) -> list[str]:
+        """Run :meth:`infer_types` on many files with a bounded worker pool.
+
+        Up to *jobs* pytype processes run at once.  Files are started largest
+        first so that a few big modules do not end up running alone at the
+        end.  A summary of timed-out files is logged when the pool finishes.
+
+        Args:
+            files: ``(py_path, pyi_path, py_code)`` tuples.
+            jobs: Maximum number of concurrent pytype processes; ``0`` or less
+                uses one per CPU.
+            timeout: Per-file timeout in seconds.
+            memory_limit: Per-process memory limit in megabytes.
+
+        Returns:
+            Typed source text for each file, in input order.
+        """
+        workers = jobs if jobs > 0 else (os.cpu_count() or 1)
+        order = sorted(range(len(files)), key=lambda i: len(files[i][2]), reverse=True)
+        results = [py_code for _, _, py_code in files]
+        timeouts_before = len(self.pytype_timeouts)
+
+        def run(i: int) -> None:
+            py_path, pyi_path, py_code = files[i]
+            results[i] = self.infer_types(
+                py_path, pyi_path, py_code, timeout=timeout, memory_limit=memory_limit
+            )
+
+        if workers <= 1 or len(files) <= 1:
+            for i in order:
+                run(i)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(run, order))
+
+        timed_out = self.pytype_timeouts[timeouts_before:]
+        if timed_out:
+            logger.warning(
+                "Pytype timed out for %d of %d files (left untyped): %s",
+                len(timed_out),
+                len(files),
+                ", ".join(str(path) for path in timed_out),
+            )
+        return results
+
+    def infer_types_project(
+        self, files: dict[Path, str], jobs: int = 1
+    ) -> dict[Path, str]:
+        """Run pytype once over many output files and merge their stubs.
+
+        Unlike :meth:`infer_types`, which starts one pytype process per file,
+        this invokes pytype's project analyser a single time.  It resolves
+        the import graph, analyses modules in dependency order, and writes
+        stubs to ``<pyi_folder>/.pytype/pyi/<package>/<module>.pyi``.  Each
+        stub is mapped back to its source by full relative path, so
+        same-named modules in different packages no longer collide.
+
+        Args:
+            files: Mapping from output file path (inside
+                :attr:`out_py_folder`) to its current source text.  pytype
+                reads the files from :attr:`pytype_sources` when that is set.
+            jobs: Number of pytype worker processes (``-j``); ``0`` or less
+                uses one per CPU.
+
+        Returns:
+            Mapping with the same keys and type-annotated source text.  Files
+            pytype could not analyse keep their original text.
+        """
+        results = dict(files)
+        if not files:
+            return results
+        if not self.PY_TYPE_PY_EXE:
+            for py_path in files:
+                logger.warning(
+                    "Pytype failed for %s: Python %s executable not found.",
+                    py_path,
+                    self.PY_TYPE_PY_VER,
+                )
+            return results
+        try:
+            from pytype.tools.merge_pyi import merge_pyi  # lazy optional import
+        except Exception as exc:
+            for py_path in files:
+                logger.warning("Pytype failed for %s: %s", py_path, exc)
+            return results
+
+        pytype_folder = Path(
+            self.pyi_folder, ".pytype"  # type: ignore[arg-type]
+        ).resolve()
+        rel_paths = {
+            py_path: py_path.relative_to(self.out_py_folder)  # type: ignore[arg-type]
+            for py_path in files
+        }
+        command = [
+            self.PY_TYPE_PY_EXE,
+            "-m",
+            "pytype.tools.analyze_project.main",
+            f"--python-version={self.PY_TYPE_PY_VER}",
+            f"--output={pytype_folder}",
+            f"--pythonpath={self._pytype_path()}",
+            f"--jobs={jobs if jobs > 0 else 'auto'}",
+            "--keep-going",
+            *(str(rel_path) for rel_path in rel_paths.values()),
+        ]
+        try:
+            with self.profiler.span("pytype", "call", files=len(files)):
+                completed = subprocess.run(
+                    command,
+                    cwd=self.pytype_sources or self.out_py_folder,
+                    capture_output=True,
+                    text=True,
+                )
+        except OSError as exc:
+            for py_path in files:
+                logger.warning("Pytype failed for %s: %s", py_path, exc)
+            return results
+        if completed.returncode:
+            logger.warning(
+                "Pytype reported errors for some files (exit %d).",
+                completed.returncode,
+            )
+
+        for py_path, rel_path in rel_paths.items():
+            pyi_path = pytype_folder / "pyi" / rel_path.with_suffix(".pyi")
+            try:
+                pyi_code = pyi_path.read_text(encoding="utf-8")
+                results[py_path] = merge_pyi.merge_sources(
+                    py=files[py_path], pyi=pyi_code
+                )
+            except Exception as exc:
+                logger.warning("Pytype failed for %s: %s", py_path, exc)
+        return results
+
     def minify(self, py_code: str, **custom_minify_options: object) -> str:
         """Minify *py_code* using python-minifier with sensible defaults.
 
         Keyword overrides are merged on top of the defaults, so any
         ``python_minifier.minify`` option can be passed as a keyword argument.
+        When :attr:`minify_cache` is set, results are looked up by source and
+        merged options before python-minifier is invoked.
 
         Args:
             py_code: Python source text to minify.
@@ -224,7 +673,61 @@ class PyTypingMinifier:
             "rename_globals": False,
             "rename_locals": False,
         } | custom_minify_options
-        return minify(py_code, **minify_options)  # type: ignore[arg-type]
+        from python_minifier import minify  # lazy: only needed to minify
+
+        if self.minify_cache is None:
+            with self.profiler.span("python_minifier", "call"):
+                return minify(py_code, **minify_options)  # type: ignore[arg-type]
+        cached = self.minify_cache.get(py_code, minify_options)
+        if cached is not None:
+            self.profiler.count("minify_cache_hits")
+            return cached
+        self.profiler.count("minify_cache_misses")
+        with self.profiler.span("python_minifier", "call"):
+            result = minify(py_code, **minify_options)  # type: ignore[arg-type]
+        self.minify_cache.put(py_code, minify_options, result)
+        return result
+
+    def process_py_file(
+        self,
+        out_py_path: Path,
+        pyi_path: Path,
+        py_code: str,
+        types: bool = True,
+        mini: bool = True,
+        **minify_options: object,
+    ) -> str:
+        """Run type inference and/or minification on a single file's source.
+
+        Failures are contained to the file: pytype errors leave the code
+        untyped and minification errors fall back to the pre-minification
+        text.
+
+        Args:
+            out_py_path: Output path of the file (used by pytype and logging).
+            pyi_path: Expected location of the pytype ``.pyi`` stub.
+            py_code: Source text to process.
+            types: Whether to run pytype type inference.
+            mini: Whether to minify the output.
+            **minify_options: Extra options forwarded to :meth:`minify`.
+
+        Returns:
+            The processed source text.
+        """
+        original_py_code = py_code
+
+        if types:
+            py_code = self.infer_types(out_py_path, pyi_path, py_code)
+
+        if mini:
+            with self.profiler.span("minify_file", "file", file=out_py_path.name):
+                try:
+                    py_code = self.minify(py_code, **minify_options)
+                except Exception as exc:
+                    logger.error("Minification failed for %s: %s", out_py_path, exc)
+                    py_code = original_py_code  # fall back to pre-minification text
+
+        return py_code
 
     def process_py(
         self,
@@ -233,6 +736,15 @@ class PyTypingMinifier:
         pyi_folder: str | Path | None = None,
         types: bool = True,
         mini: bool = True,
+        jobs: int = 1,
+        cache: bool = False,
+        incremental: bool = False,
+        types_mode: str = "file",
+        types_timeout: float | None = None,
+        types_memory: int | None = None,
+        include: Sequence[str] = DEFAULT_INCLUDE,
+        exclude: Sequence[str] = (),
+        gitignore: bool = True,
         **minify_options: object,
     ) -> list[Path]:
         """Process one Python file or an entire directory tree.
@@ -246,37 +758,377 @@ class PyTypingMinifier:
             pyi_folder: Folder for pytype stub files.
             types: Whether to run pytype type inference.
             mini: Whether to minify the output.
+            jobs: Number of concurrent pytype processes and of worker
+                processes used for minification.  ``1`` processes files
+                serially in this process; ``0`` or less uses one per CPU.
+            cache: Whether to cache minification results under
+                ``<out_py_folder>/.split4gpt-cache`` (see
+                :meth:`enable_minify_cache`).  An already enabled cache is
+                always used.
+            incremental: Whether to skip files that are unchanged since the
+                last run with the same options, according to the manifest
+                stored in ``<out_py_folder>/.split4gpt-manifest.json``.  A
+                manifest loaded by an earlier call is reused.
+            types_mode: ``"file"`` runs pytype separately for each file
+                (:meth:`infer_types`); ``"project"`` runs it once over all
+                files in dependency order (:meth:`infer_types_project`).
+            types_timeout: Per-file pytype timeout in seconds (``"file"``
+                mode).  Files that time out stay untyped and are listed in
+                :attr:`pytype_timeouts`.
+            types_memory: Per-file pytype memory limit in megabytes
+                (``"file"`` mode, POSIX only).
+            include: Globs selecting the files of a directory to process.
+            exclude: Extra gitignore-style globs of files and folders to skip
+                (see :meth:`discover_py_files`).
+            gitignore: Whether to honour ``.gitignore`` files.
             **minify_options: Extra options forwarded to :meth:`minify`.
 
         Returns:
             List of absolute paths to all written output files.
         """
         py_path_or_folder = Path(py_path_or_folder).resolve()
-        if py_path_or_folder.is_dir():
-            self.read_py_folder(py_path_or_folder, out_py_folder, pyi_folder)
-        elif py_path_or_folder.is_file():
-            self.read_py_file(py_path_or_folder, out_py_folder, pyi_folder)
-        else:
+        if not py_path_or_folder.exists():
             return []
+        if incremental:
+            self.init_folders(
+                py_path_or_folder
+                if py_path_or_folder.is_dir()
+                else py_path_or_folder.parent,
+                out_py_folder,
+                pyi_folder,
+            )
+            manifest_path = (
+                self.out_py_folder / MANIFEST_FILENAME  # type: ignore[operator]
+            )
+            options = self._manifest_options(
+                types, types_mode, mini, minify_options
+            )
+            if self.manifest is not None and self.manifest.matches(
+                manifest_path, options
+            ):
+                self.manifest.start_run()  # still current from the last run
+            else:
+                self.manifest = Manifest.load(manifest_path, options)
+        with self.profiler.span("discover"):
+            if py_path_or_folder.is_dir():
+                self.read_py_folder(
+                    py_path_or_folder,
+                    out_py_folder,
+                    pyi_folder,
+                    include,
+                    exclude,
+                    gitignore,
+                )
+            else:
+                self.read_py_file(py_path_or_folder, out_py_folder, pyi_folder)
+        if cache and self.minify_cache is None:
+            self.enable_minify_cache()
+
+        if types_mode not in ("file", "project"):
+            raise ValueError(f"Unknown types_mode: {types_mode!r}")
+
+        items = [
+            (path, data)
+            for path, data in self.code_folder_data.items()
+            if not data.cached
+        ]
+        self.profiler.count("files", len(items))
+        py_codes = [data.py_code for _, data in items]
+        if types and types_mode == "project":
+            with self.profiler.span("types"), self._staged_sources(items):
+                typed = self.infer_types_project(
+                    {path: data.py_code for path, data in items}, jobs=jobs
+                )
+            py_codes = [typed[path] for path, _ in items]
+        elif types:
+            with self.profiler.span("types"), self._staged_sources(items):
+                py_codes = self.infer_types_many(
+                    [(path, data.pyi_path, data.py_code) for path, data in items],
+                    jobs=jobs,
+                    timeout=types_timeout,
+                    memory_limit=types_memory,
+                )
+        # in place, the next run reads the outputs, so record those instead
+        in_place = self.out_py_folder == self.py_folder
+        for _, data in items:
+            if self.manifest is not None and not in_place:
+                self.manifest.record(
+                    data.rel_path, data.py_path, data.py_code  # type: ignore[arg-type]
+                )
+            self._keep_input(data, data.py_code)  # type: ignore[arg-type]
+            data.py_code = None  # the inputs now live in py_codes
+        results = self._map_py_files(
+            [
+                (path, data.pyi_path, py_code)
+                for (path, data), py_code in zip(items, py_codes)
+            ],
+            False,  # types were inferred above
+            mini,
+            minify_options,
+            jobs,
+        )
+        with self.profiler.span("minify"):
+            for (out_py_path, code_data), py_code in zip(items, results):
+                with self.profiler.span("write", "file", file=code_data.rel_path):
+                    self._write_output(out_py_path, py_code)
+                if self.manifest is not None and in_place:
+                    self.manifest.record(code_data.rel_path, out_py_path, py_code)
+                if self.profiler.enabled:
+                    self.profiler.count("bytes_out", len(py_code.encode("utf-8")))
+                self._keep_output(code_data, py_code)
+        if self.manifest is not None:
+            logger.info(
+                "Incremental run: %d of %d files unchanged.",
+                len(self.code_folder_data) - len(items),
+                len(self.code_folder_data),
+            )
+            self.manifest.save()
 
-        for out_py_path, code_data in self.code_folder_data.items():
-            original_py_code: str = code_data["py_code"]
-            py_code: str = original_py_code
+        return list(self.code_folder_data.keys())
 
-            if types:
-                py_code = self.infer_types(out_py_path, code_data["pyi_path"], py_code)
+    @contextmanager
+    def _staged_sources(
+        self, items: list[tuple[Path, FileRecord]]
+    ) -> Iterator[None]:
+        """Stage the unminified sources of *items* for pytype.
 
-            if mini:
-                try:
-                    py_code = self.minify(py_code, **minify_options)
-                except Exception as exc:
-                    logger.error("Minification failed for %s: %s", out_py_path, exc)
-                    py_code = original_py_code  # fall back to pre-minification text
+        pytype analyses files on disk, but the output folder should only
+        receive the final code, so the sources are written to a temporary
+        :attr:`pytype_sources` folder under ``<pyi_folder>/.pytype`` for the
+        duration of the ``with`` block.
+        """
+        pytype_folder = Path(self.pyi_folder, ".pytype")  # type: ignore[arg-type]
+        pytype_folder.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="src-", dir=pytype_folder) as staged:
+            for _, data in items:
+                staged_path = Path(staged, data.rel_path)
+                staged_path.parent.mkdir(parents=True, exist_ok=True)
+                staged_path.write_text(
+                    data.py_code, encoding="utf-8"  # type: ignore[arg-type]
+                )
+            self.pytype_sources = Path(staged)
+            try:
+                yield
+            finally:
+                self.pytype_sources = None
 
-            code_data["py_code"] = py_code
-            out_py_path.write_text(py_code, encoding="utf-8")
+    def _pytype_path(self) -> str:
+        """Return pytype's ``--pythonpath`` for the current sources.
 
-        return list(self.code_folder_data.keys())
+        Staged sources come first; files left out of the run because they
+        are unchanged are still found in :attr:`out_py_folder`.
+        """
+        if self.pytype_sources is None:
+            return str(self.out_py_folder)
+        return os.pathsep.join([str(self.pytype_sources), str(self.out_py_folder)])
+
+    def _write_output(self, out_py_path: Path, py_code: str) -> None:
+        """Atomically write *py_code* unless *out_py_path* already holds it."""
+        out_py_path.parent.mkdir(parents=True, exist_ok=True)
+        if not write_if_changed(out_py_path, py_code):
+            self.profiler.count("writes_skipped")
+
+    def _keep_input(self, code_data: FileRecord, py_code: str) -> None:
+        """Look at a file's source before it is minified.
+
+        Nothing is needed from it here; subclasses keep what minification
+        would remove.
+        """
+
+    def _keep_output(self, code_data: FileRecord, py_code: str) -> None:
+        """Hold on to a file's processed source after it has been written.
+
+        The output is on disk, so nothing is kept here; subclasses that
+        still need the text keep it in ``code_data.py_code``.
+        """
+
+    def _manifest_options(
+        self,
+        types: bool,
+        types_mode: str,
+        mini: bool,
+        minify_options: dict[str, object],
+    ) -> dict[str, object]:
+        """Return the options that invalidate the manifest when changed."""
+        return {
+            "class": type(self).__name__,
+            "py_ver": self.PY_TYPE_PY_VER,
+            "python_minifier": python_minifier_version(),
+            "types": types,
+            "types_mode": types_mode if types else None,
+            "mini": mini,
+            "minify_options": minify_options,
+        }
+
+    def _map_py_files(
+        self,
+        files: list[tuple[Path, Path, str]],
+        types: bool,
+        mini: bool,
+        minify_options: dict[str, object],
+        jobs: int,
+    ) -> Iterator[str]:
+        """Yield processed source for each ``(out_py_path, pyi_path, py_code)``.
+
+        Results are yielded in input order regardless of *jobs*, so serial
+        and parallel runs produce identical output.
+        """
+        workers = jobs if jobs > 0 else (os.cpu_count() or 1)
+        workers = min(workers, len(files))
+        if workers <= 1:
+            for out_py_path, pyi_path, py_code in files:
+                yield self.process_py_file(
+                    out_py_path, pyi_path, py_code, types, mini, **minify_options
+                )
+            return
+        jobs_args = (
+            (out_py_path, pyi_path, py_code, types, mini, minify_options)
+            for out_py_path, pyi_path, py_code in files
+        )
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self._worker_state(),),
+        ) as executor:
+            chunksize = max(1, len(files) // (workers * 4))
+            for py_code, hits, misses in executor.map(
+                _process_py_file_job, jobs_args, chunksize=chunksize
+            ):
+                if self.minify_cache is not None:
+                    self.minify_cache.hits += hits
+                    self.minify_cache.misses += misses
+                    self.profiler.count("minify_cache_hits", hits)
+                    self.profiler.count("minify_cache_misses", misses)
+                yield py_code
+
+    def _worker_state(self) -> dict[str, object]:
+        """Return the attributes a worker process needs to process files."""
+        return {
+            "PY_TYPE_PY_VER": self.PY_TYPE_PY_VER,
+            "PY_TYPE_PY_EXE": self.PY_TYPE_PY_EXE,
+            "py_folder": self.py_folder,
+            "out_py_folder": self.out_py_folder,
+            "pyi_folder": self.pyi_folder,
+            "minify_cache": self.minify_cache,
+        }
+
+
+def _memory_limited(command: list[str], memory_limit: int | None) -> list[str]:
+    """Return *command* wrapped so that it runs with a capped address space.
+
+    The limit is applied by a small Python launcher that sets ``RLIMIT_AS``
+    and then replaces itself with *command*, rather than by a ``preexec_fn``,
+    which is unsafe while other threads are running (see
+    :meth:`PyTypingMinifier.infer_types_many`).  The launcher runs on the
+    interpreter at ``command[0]``.
+
+    Args:
+        command: Command line whose first item is an absolute path to a
+            Python interpreter.
+        memory_limit: Limit in megabytes, or ``None`` for no limit.
+    """
+    if not memory_limit:
+        return command
+    try:
+        import resource  # noqa: F401 - POSIX only
+    except ImportError:
+        logger.warning("Memory limits are not supported on this platform.")
+        return command
+    limit = memory_limit * 1024 * 1024
+    return [command[0], "-c", _MEMORY_LIMIT_LAUNCHER, str(limit), *command]
+
+
+_MEMORY_LIMIT_LAUNCHER = (
+    "import os, resource, sys; "
+    "limit = int(sys.argv[1]); "
+    "resource.setrlimit(resource.RLIMIT_AS, (limit, limit)); "
+    "os.execv(sys.argv[2], sys.argv[2:])"
+)
+
+
+def _run_process_group(
+    command: list[str], cwd: str | Path, timeout: float | None = None
+) -> None:
+    """Run *command* in a new session and wait for it.
+
+    pytype starts ``ninja``, which starts its own worker processes, so on
+    timeout the whole process group is killed rather than only the direct
+    child.
+
+    Raises:
+        subprocess.TimeoutExpired: *command* ran longer than *timeout*.
+        subprocess.CalledProcessError: *command* exited with a non-zero
+            status.
+    """
+    process = subprocess.Popen(
+        command,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError):  # no process groups
+            process.kill()
+        process.communicate()
+        raise
+    if process.returncode:
+        raise subprocess.CalledProcessError(
+            process.returncode, command, stdout, stderr
+        )
+
+
+# ---------------------------------------------------------------------------
+# Process-pool workers for PyTypingMinifier.process_py(jobs=N)
+# ---------------------------------------------------------------------------
+
+_worker_minifier: PyTypingMinifier | None = None
+
+
+def _init_worker(state: dict[str, object]) -> None:
+    """Build the per-process :class:`PyTypingMinifier` used by pool workers.
+
+    The instance is restored from *state* rather than constructed, so workers
+    neither re-probe the pytype interpreter nor repeat its warning.
+    """
+    global _worker_minifier
+    minifier = PyTypingMinifier.__new__(PyTypingMinifier)
+    minifier.code_folder_data = {}
+    minifier.pytype_timeouts = []
+    minifier.profiler = NULL_PROFILER  # spans are only recorded in the parent
+    minifier.__dict__.update(state)
+    _worker_minifier = minifier
+
+
+def _process_py_file_job(
+    args: tuple[Path, Path, str, bool, bool, dict[str, object]],
+) -> tuple[str, int, int]:
+    """Process one file inside a pool worker; never raises.
+
+    Returns:
+        The processed source plus the minify-cache hits and misses incurred
+        by this file, so the parent can aggregate cache statistics.
+    """
+    out_py_path, pyi_path, py_code, types, mini, minify_options = args
+    worker = _worker_minifier
+    cache = worker.minify_cache  # type: ignore[union-attr]
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    try:
+        result = worker.process_py_file(  # type: ignore[union-attr]
+            out_py_path, pyi_path, py_code, types, mini, **minify_options
+        )
+    except Exception as exc:
+        logger.error("Processing failed for %s: %s", out_py_path, exc)
+        result = py_code
+    if cache:
+        return result, cache.hits - hits, cache.misses - misses
+    return result, 0, 0
 
 
 # ---------------------------------------------------------------------------
@@ -284,6 +1136,75 @@ class PyTypingMinifier:
 # ---------------------------------------------------------------------------
 
 
+class SourceSlicer:
+    """Extract the exact source text of AST nodes from one parsed string.
+
+    A cheaper, repeatable alternative to :func:`ast.get_source_segment`: line
+    offsets are computed once, so slicing every node of a large module is
+    linear rather than quadratic.  Decorators are included in a node's span.
+
+    Args:
+        source: The text the AST was parsed from.
+    """
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.lines = source.split("\n")
+        self.line_starts = [0]
+        for line in self.lines[:-1]:
+            self.line_starts.append(self.line_starts[-1] + len(line) + 1)
+
+    def _offset(self, lineno: int, col_offset: int) -> int:
+        """Convert an AST ``(lineno, UTF-8 byte column)`` to a string index."""
+        line = self.lines[lineno - 1]
+        if not line.isascii():
+            col_offset = len(line.encode("utf-8")[:col_offset].decode("utf-8"))
+        return self.line_starts[lineno - 1] + col_offset
+
+    def _start(self, node: AST, decorators: bool = True) -> int:
+        """Return the string index where *node* (and its decorators) begin."""
+        start = self._offset(node.lineno, node.col_offset)  # type: ignore[attr-defined]
+        decorator_list = getattr(node, "decorator_list", None)
+        if decorators and decorator_list:
+            first = decorator_list[0]
+            start = self.source.rfind(
+                "@", 0, self._offset(first.lineno, first.col_offset)
+            )
+        return start
+
+    def span(self, node: AST) -> tuple[int, int]:
+        """Return the ``(start, end)`` string indices spanned by *node*."""
+        end = self._offset(
+            node.end_lineno, node.end_col_offset  # type: ignore[attr-defined]
+        )
+        return self._start(node), end
+
+    def segment(self, node: AST) -> str:
+        """Return the source text spanned by *node*."""
+        start, end = self.span(node)
+        return self.source[start:end]
+
+    def header(self, node: AST, decorators: bool = True) -> str:
+        """Return the text of compound *node* up to its first body statement.
+
+        For ``def f(x):return x`` this is ``def f(x):``.  Trailing whitespace
+        is stripped.
+        """
+        end = self._start(node.body[0])  # type: ignore[attr-defined]
+        return self.source[self._start(node, decorators) : end].rstrip()
+
+    def indent(self, node: AST, default: str = "") -> str:
+        """Return the whitespace before *node* if it starts its line.
+
+        Returns *default* when *node* shares its line with preceding code
+        (e.g. ``def f():return 1``).
+        """
+        start = self._start(node)
+        line_start = self.source.rfind("\n", 0, start) + 1
+        prefix = self.source[line_start:start]
+        return prefix if not prefix.strip() else default
+
+
 class PyBodySummarizer(NodeTransformer):
     """AST transformer that replaces large function/class bodies with stubs.
 
@@ -293,29 +1214,60 @@ class PyBodySummarizer(NodeTransformer):
     Args:
         py_llm_splitter: The :class:`PyLLMSplitter` instance that drives
             summarisation and token counting.
+        source: Optional :class:`SourceSlicer` for the minified module the
+            nodes come from.  When given, method sizes are measured on the
+            sliced source instead of re-unparsing and re-minifying each one.
+        docstrings: Docstrings of the module before minification, by
+            qualified name (see :func:`_source_docstrings`).  A method whose
+            minified code lost its docstring is summarised with it.
+
+    Attributes:
+        changed: Whether any body has been replaced since construction.
+        pending: ``(node, code)`` pairs of stubbed functions whose summary
+            is left to the splitter's :attr:`~PyLLMSplitter.llm_summarizer`.
     """
 
-    def __init__(self, py_llm_splitter: PyLLMSplitter) -> None:
+    def __init__(
+        self,
+        py_llm_splitter: PyLLMSplitter,
+        source: SourceSlicer | None = None,
+        docstrings: Mapping[str, str] | None = None,
+    ) -> None:
         self.py_llm_splitter = py_llm_splitter
+        self.source = source
+        self.docstrings = docstrings or {}
+        self.changed = False
+        self.pending: list[tuple[FunctionDef, str]] = []
 
-    def visit_FunctionDef(self, node: FunctionDef, code: str | None = None) -> FunctionDef:  # type: ignore[override]
-        """Replace *node*'s body with ``...`` (and an AI summary if *code* given).
+    def visit_FunctionDef(  # type: ignore[override]
+        self, node: FunctionDef, code: str | None = None, doc: str | None = None
+    ) -> FunctionDef:
+        """Replace *node*'s body with ``...``, queueing it for a summary.
+
+        When *code* is given and the splitter has an
+        :attr:`~PyLLMSplitter.llm_summarizer`, the node is added to
+        :attr:`pending`; the summary docstring is spliced in later by
+        :meth:`PyLLMSplitter.summarize_pending`.
 
         Args:
             node: The function AST node to transform.
             code: Minified source of the function body, used to generate a
                 summary.  Pass ``None`` to skip summarisation.
+            doc: The function's docstring before minification, put back
+                into *code* for the summariser if minification removed it.
 
         Returns:
             The mutated function node.
         """
         node.body = []
-        if code:
-            with contextlib.suppress(Exception):
-                doc = self.py_llm_splitter.llm_summarize(
-                    self.py_llm_splitter.minify(code, remove_literal_statements=False)
-                )
-                node.body.append(parse(f'"""{doc}"""').body[0])
+        self.changed = True
+        if code and self.py_llm_splitter.llm_summarizer is not None:
+            if doc:
+                code = _with_docstring(code, doc)
+            minified = self.py_llm_splitter.minify(
+                code, remove_literal_statements=False
+            )
+            self.pending.append((node, minified))
         node.body.append(parse("...").body[0])
         return node
 
@@ -330,16 +1282,58 @@ class PyBodySummarizer(NodeTransformer):
         """
         for i, body_node in enumerate(node.body):
             if isinstance(body_node, FunctionDef):
-                code = ast_unparse(body_node)
-                minified_code = self.py_llm_splitter.minify(
-                    code, remove_literal_statements=False
-                )
+                if self.source is not None:
+                    minified_code = self.source.segment(body_node)
+                else:
+                    minified_code = self.py_llm_splitter.minify(
+                        ast_unparse(body_node), remove_literal_statements=False
+                    )
                 size = self.py_llm_splitter.gptok_size(minified_code)
                 if size > self.py_llm_splitter.gptok_threshold:
-                    node.body[i] = self.visit_FunctionDef(body_node, minified_code)
+                    node.body[i] = self.visit_FunctionDef(
+                        body_node,
+                        minified_code,
+                        self.docstrings.get(f"{node.name}.{body_node.name}"),
+                    )
         return node
 
 
+def _source_docstrings(py_code: str) -> dict[str, str]:
+    """Return the docstrings of all classes and functions in *py_code*.
+
+    Keys are qualified names such as ``"Index.load"``.  Returns an empty
+    mapping if *py_code* does not parse.
+    """
+    try:
+        tree = parse(py_code)
+    except SyntaxError:
+        return {}
+    docstrings: dict[str, str] = {}
+    scopes: list[tuple[AST, str]] = [(tree, "")]
+    while scopes:
+        scope, prefix = scopes.pop()
+        for node in scope.body:  # type: ignore[attr-defined]
+            if isinstance(node, (FunctionDef, AsyncFunctionDef, ClassDef)):
+                name = f"{prefix}{node.name}"
+                doc = get_docstring(node)
+                if doc:
+                    docstrings[name] = doc
+                scopes.append((node, f"{name}."))
+    return docstrings
+
+
+def _with_docstring(code: str, doc: str) -> str:
+    """Return function *code* with *doc* as its docstring, unless it has one."""
+    try:
+        node = parse(code).body[0]
+    except (SyntaxError, IndexError):
+        return code
+    if not isinstance(node, (FunctionDef, AsyncFunctionDef)) or get_docstring(node):
+        return code
+    node.body.insert(0, Expr(Constant(doc)))
+    return ast_unparse(fix_missing_locations(node))
+
+
 class PyLLMSplitter(PyTypingMinifier):
     """Extends :class:`PyTypingMinifier` with token-based splitting and LLM summaries.
 
@@ -351,8 +1345,47 @@ class PyLLMSplitter(PyTypingMinifier):
             summarisation.
         gptok_limit: Maximum tokens per output split file.  Defaults to the
             context window of *gptok_model*.
+        gptok_targets: Write splits for several context sizes from one run:
+            models or ``"model:limit"`` specs (see :func:`split_target`).
+            Files are processed and sectioned once, with sections cut to fit
+            the smallest target (or *gptok_limit* if smaller), and
+            :meth:`write_splits` packs them for each target into
+            ``split4gpt/<name>/``.  Section sizes are recounted only for
+            targets whose tokenizer differs from *gptok_model*'s.
         gptok_threshold: Minimum token count before a function/class body is
             replaced with a stub.
+        gptok_cache_size: Number of token counts memoized by
+            :attr:`gptok_counter`; ``0`` disables the cache.
+        gptok_threads: Threads tiktoken uses for batched token counting in
+            :meth:`gptok_sizes`.
+        gptok_estimate: Estimate most section sizes from their length using
+            a ratio calibrated on a sample of this run's sections, and
+            tokenize exactly only where an estimate's error bounds straddle
+            ``gptok_threshold`` or a split boundary in :meth:`write_splits`.
+            Requires tiktoken; ignored otherwise.
+        gptok_estimate_sample: Number of sections tokenized exactly to
+            calibrate the estimator.
+        split_planner: How sections are assigned to splits: ``"greedy"``
+            (in file order, streaming), ``"ffd"`` (first-fit-decreasing) or
+            ``"optimal"`` (bounded branch-and-bound).  See
+            :mod:`split_python4gpt.planner`.
+        llm_backend: Summariser for stubbed methods: ``"openai"``,
+            ``"local"`` (self-hosted OpenAI-compatible server),
+            ``"offline"`` (heuristic description, no network) or
+            ``"simpleaichat"``; see :mod:`split_python4gpt.summarize`.
+            Defaults to ``"local"`` when *llm_base_url* is set,
+            ``"openai"`` when ``OPENAI_API_KEY`` is, and no summaries
+            otherwise.  Summaries are requested in one concurrent batch
+            after all files have been sectioned.
+        llm_base_url: Chat-completions endpoint of the HTTP backends.
+        llm_concurrency: Maximum summary requests in flight.
+        llm_rpm: Summary requests-per-minute limit.
+        llm_tpm: Summary tokens-per-minute limit.
+        llm_retries: Retries per summary request.
+        split_order: Order in which files are fed to the planner:
+            ``"file"`` (discovery order) or ``"imports"`` (import cycles
+            kept together, each file after the project files it imports;
+            see :mod:`split_python4gpt.imports`).
         **kwargs: Forwarded to :class:`PyTypingMinifier`.
     """
 
@@ -361,47 +1394,165 @@ class PyLLMSplitter(PyTypingMinifier):
         *args: object,
         gptok_model: str = "gpt-3.5-turbo",
         gptok_limit: int | None = None,
+        gptok_targets: Sequence[str | tuple[str, int]] | None = None,
         gptok_threshold: int = 128,
+        gptok_cache_size: int = DEFAULT_TOKEN_CACHE_SIZE,
+        gptok_threads: int = DEFAULT_TOKEN_THREADS,
+        gptok_estimate: bool = False,
+        gptok_estimate_sample: int = 256,
+        split_planner: str = "greedy",
+        split_order: str = "file",
+        llm_backend: str | None = None,
+        llm_base_url: str | None = None,
+        llm_concurrency: int = 8,
+        llm_rpm: int | None = None,
+        llm_tpm: int | None = None,
+        llm_retries: int = 5,
         **kwargs: object,
     ) -> None:
         super().__init__(*args, **kwargs)  # type: ignore[arg-type]
         self.gptok_model = gptok_model
         self.gptok_limit: int = gptok_limit or OPENAI_MODELS.get(gptok_model, 2048)
+        targets = (split_target(spec) for spec in gptok_targets or ())
+        self.gptok_targets: list[SplitTarget] = list(
+            {target.name: target for target in targets}.values()
+        )
+        if self.gptok_targets:
+            # sections must fit in a split of every target
+            self.gptok_limit = min(
+                [target.limit for target in self.gptok_targets]
+                + ([gptok_limit] if gptok_limit else [])
+            )
         self.gptok_threshold = gptok_threshold
-        self.code_summary: dict[str, dict] = {}
-
-        # tiktoken — lazy; fall back to char-count estimate if unavailable
-        self.gptoker = None
-        try:
-            import tiktoken  # lazy optional import
+        self.gptok_threads = gptok_threads
+        self.gptok_estimate = gptok_estimate
+        self.gptok_estimate_sample = gptok_estimate_sample
+        self.gptok_estimator: TokenEstimator | None = None
+        if split_planner not in SPLIT_PLANNERS:
+            raise ValueError(
+                f"Unknown split_planner {split_planner!r}; "
+                f"expected one of {sorted(SPLIT_PLANNERS)}"
+            )
+        self.split_planner = split_planner
+        if split_order not in ("file", "imports"):
+            raise ValueError(f"Unknown split_order: {split_order!r}")
+        self.split_order = split_order
+        self.split_paths: list[list[str]] = []
+        self.code_summary: dict[str, FileRecord] = {}
+
+        # tiktoken is loaded on first use (see the gptoker property)
+        self._gptoker: object | None = _NOT_LOADED
+        self._gptok_counter: TokenCounter | None = None
+        self._target_counters: dict[str, TokenCounter] = {}
+        self.gptok_cache_size = gptok_cache_size
+
+        # Summariser backend; by default remote only when configured
+        self.llm_summarizer: SummarizerBackend | None = None
+        self.summary_cache: SummaryCache | None = None
+        self._pending_summaries: list[tuple] = []
+        self._docstrings: dict[Path, dict[str, str]] = {}  # by rel_path
+        if llm_backend is None:
+            if llm_base_url:
+                llm_backend = "local"
+            elif environ.get("OPENAI_API_KEY"):
+                llm_backend = "openai"
+        if llm_backend is not None:
+            from .summarize import make_summarizer  # lazy: asyncio, urllib
+
+            try:
+                self.llm_summarizer = make_summarizer(
+                    llm_backend,
+                    self.gptok_model,
+                    base_url=llm_base_url,
+                    concurrency=llm_concurrency,
+                    rpm=llm_rpm,
+                    tpm=llm_tpm,
+                    max_retries=llm_retries,
+                    count_tokens=self.gptok_size,
+                )
+            except ImportError as exc:
+                logger.warning(
+                    "Summarizer %r unavailable (%s); LLM summarisation disabled.",
+                    llm_backend,
+                    exc,
+                )
 
-            self.gptoker = tiktoken.encoding_for_model(gptok_model)
-        except Exception as exc:
-            logger.warning("tiktoken unavailable (%s); using character estimate.", exc)
+    @property
+    def gptoker(self) -> object | None:
+        """The tiktoken encoding for :attr:`gptok_model`, loaded on first use.
 
-        # simpleaichat — lazy; LLM summarisation disabled when unavailable
-        self.llm_summarize = None
-        try:
-            from simpleaichat import AIChat  # lazy optional import
-
-            self.llm_summarize = AIChat(
-                api_key=environ.get("OPENAI_API_KEY"),
-                system=(
-                    "Write an extremely short, compact description of this Python code, "
-                    'starting with "This class" or "This method" or "This function"'
-                ),
-                model=self.gptok_model,
-            )
-        except Exception as exc:
-            logger.warning(
-                "AIChat unavailable (%s); LLM summarisation disabled.", exc
+        ``None`` when tiktoken or the encoding is unavailable, in which case
+        token counts fall back to a character estimate.
+        """
+        if self._gptoker is _NOT_LOADED:
+            self._gptoker = _load_encoding(self.gptok_model)
+        return self._gptoker
+
+    @gptoker.setter
+    def gptoker(self, encoder: object | None) -> None:
+        self._gptoker = encoder
+
+    @property
+    def gptok_counter(self) -> TokenCounter:
+        """The memoizing :class:`TokenCounter` for :attr:`gptoker`."""
+        if self._gptok_counter is None:
+            self._gptok_counter = TokenCounter(
+                self.gptoker, cache_size=self.gptok_cache_size
             )
+        return self._gptok_counter
+
+    @gptok_counter.setter
+    def gptok_counter(self, counter: TokenCounter) -> None:
+        self._gptok_counter = counter
+
+    def _target_counter(self, model: str) -> TokenCounter:
+        """Return the token counter for *model*, shared by models of one encoding."""
+        if model == self.gptok_model:
+            return self.gptok_counter
+        counter = self._target_counters.get(model)
+        if counter is None:
+            encoder = _load_encoding(model)
+            encoding_name = getattr(encoder, "name", "estimate")
+            for other in [self.gptok_counter, *self._target_counters.values()]:
+                if other.encoding_name == encoding_name:
+                    counter = other
+                    break
+            else:
+                counter = TokenCounter(encoder, cache_size=self.gptok_cache_size)
+            self._target_counters[model] = counter
+        return counter
+
+    def enable_summary_cache(
+        self,
+        path: str | Path | None = None,
+        ttl: float | None = None,
+        max_entries: int = DEFAULT_SUMMARY_CACHE_MAX_ENTRIES,
+    ) -> SummaryCache:
+        """Turn on the persistent LLM summary cache.
+
+        Args:
+            path: SQLite database file.  Defaults to
+                ``<out_py_folder>/.split4gpt-cache/summaries.sqlite``.
+            ttl: Maximum entry age in seconds, or ``None`` for no expiry.
+            max_entries: Entry cap before least recently used entries are
+                evicted.
+
+        Returns:
+            The active :class:`~split_python4gpt.summary_cache.SummaryCache`.
+        """
+        if path is None:
+            if self.out_py_folder is None:
+                raise ValueError("path is required before folders are set")
+            path = self.out_py_folder / DEFAULT_CACHE_DIRNAME / SUMMARY_CACHE_FILENAME
+        self.summary_cache = SummaryCache(path, ttl=ttl, max_entries=max_entries)
+        return self.summary_cache
 
     def gptok_size(self, text: str) -> int:
         """Count GPT tokens in *text* using the model's tokeniser.
 
-        Falls back to ``len(text) // 4`` (a rough GPT token estimate) when the
-        tiktoken encoder is unavailable.
+        Counts are memoized by :attr:`gptok_counter`.  Falls back to
+        ``len(text) // 4`` (a rough GPT token estimate) when the tiktoken
+        encoder is unavailable.
 
         Args:
             text: Arbitrary text to measure.
@@ -409,97 +1560,982 @@ class PyLLMSplitter(PyTypingMinifier):
         Returns:
             Number of tokens (exact when tiktoken available, estimated otherwise).
         """
-        if self.gptoker is not None:
-            return len(list(self.gptoker.encode(text)))
-        return len(text) // 4  # rough estimate: ~4 chars per token
+        return self.gptok_counter.count(text)
 
-    def process_py_code(self, py_code: str) -> list[dict]:
-        """Split *py_code* into token-bounded sections.
+    def gptok_sizes(self, texts: list[str]) -> list[int]:
+        """Count GPT tokens in each of *texts* with one batched call.
 
-        Large top-level functions and classes are replaced with stubs before
-        sectioning.  Uses :func:`ast.unparse` (stdlib) to convert AST nodes
-        back to source — no third-party code-generation library required.
+        Uncached texts are tokenized together on :attr:`gptok_threads`
+        threads.  Results are identical to calling :meth:`gptok_size` on each
+        text.
 
         Args:
-            py_code: Python source text (already minified/typed).
+            texts: Texts to measure.
 
         Returns:
-            List of ``{"py": str, "gptok_size": int}`` dicts.
+            Token counts in the same order as *texts*.
         """
-        tree = parse(py_code)
-        sections: list[dict] = []
-        body_summary = PyBodySummarizer(self)
+        with self.profiler.span("tokenize", "call", texts=len(texts)):
+            return self.gptok_counter.count_batch(texts, num_threads=self.gptok_threads)
 
-        for node in tree.body:
-            code = ast_unparse(node)
-            minified_code = self.minify(code, remove_literal_statements=False)
-            size = self.gptok_size(minified_code)
+    def process_py_code(self, py_code: str, minified: bool = False) -> list[dict]:
+        """Split *py_code* into token-bounded sections.
 
-            if size > self.gptok_threshold and isinstance(node, (FunctionDef, ClassDef)):
-                node = body_summary.visit(node)
-                fix_missing_locations(node)
-                minified_code = self.minify(
-                    ast_unparse(node), remove_literal_statements=False
-                )
-                size = self.gptok_size(minified_code)
+        The code is minified once (keeping docstrings) and each top-level
+        statement's section is sliced straight out of the result using the
+        AST's line/column spans, so python-minifier is not re-run per node.
+        Only large top-level functions and classes whose bodies get replaced
+        with stubs are unparsed and minified again.
+
+        Args:
+            py_code: Python source text.
+            minified: Whether *py_code* is already minified, in which case
+                its sections are taken verbatim.
 
-            sections.append({"py": minified_code, "gptok_size": size})
+        Returns:
+            List of ``{"py": str, "gptok_size": int}`` dicts.  Each section
+            ends with a newline so that sections can be concatenated.
+        """
+        if not minified:
+            py_code = self.minify(py_code, remove_literal_statements=False)
+        nodes, source, texts = self._slice_py_code(py_code)
+        sections = self._build_sections(
+            nodes, source, texts, *self._count_section_texts(texts)
+        )
+        self.summarize_pending()
+        return [section.as_dict(py_code) for section in sections]
+
+    def _slice_py_code(self, py_code: str) -> tuple[list[AST], SourceSlicer, list[str]]:
+        """Parse *py_code* and slice out the text of every top-level statement."""
+        nodes = parse(py_code).body
+        source = SourceSlicer(py_code)
+        return nodes, source, [source.segment(node) + "\n" for node in nodes]
+
+    def _count_section_texts(self, texts: list[str]) -> tuple[list[int], list[bool]]:
+        """Return token counts for *texts* and whether each one is exact.
+
+        Without :attr:`gptok_estimate` every count is exact.  Otherwise an
+        evenly spaced sample is tokenized to calibrate
+        :attr:`gptok_estimator` (on first use), texts the estimator does not
+        apply to are tokenized exactly, and the rest are estimated.
+        """
+        if not self.gptok_estimate or self.gptoker is None:
+            return self.gptok_sizes(texts), [True] * len(texts)
+        sizes: list[int | None] = [None] * len(texts)
+        if self.gptok_estimator is None:
+            n = min(len(texts), max(1, self.gptok_estimate_sample))
+            sample = [i * len(texts) // n for i in range(n)]  # spread over all
+            sample_sizes = self.gptok_sizes([texts[i] for i in sample])
+            for i, size in zip(sample, sample_sizes):
+                sizes[i] = size
+            self.gptok_estimator = TokenEstimator.calibrate(
+                [texts[i] for i in sample], sample_sizes
+            )
+            if self.gptok_estimator is None:
+                return self.gptok_sizes(texts), [True] * len(texts)
+        estimator = self.gptok_estimator
+        exact = [
+            size is not None or not estimator.applies_to(text)
+            for size, text in zip(sizes, texts)
+        ]
+        to_count = [i for i, size in enumerate(sizes) if size is None and exact[i]]
+        for i, size in zip(to_count, self.gptok_sizes([texts[i] for i in to_count])):
+            sizes[i] = size
+        return [
+            size if size is not None else estimator.estimate(text)
+            for size, text in zip(sizes, texts)
+        ], exact
+
+    def _build_sections(
+        self,
+        nodes: list[AST],
+        source: SourceSlicer,
+        texts: list[str],
+        sizes: list[int],
+        exact: list[bool],
+        limit: int | None = None,
+        docstrings: Mapping[str, str] | None = None,
+    ) -> list[Section]:
+        """Turn sliced statements and their token counts into sections.
+
+        Oversized functions and classes are stubbed by
+        :class:`PyBodySummarizer` and re-measured.  An estimated size whose
+        error bounds straddle :attr:`gptok_threshold` is counted exactly
+        first; sections that keep an estimated size are not ``exact``.
+        Sections still larger than *limit* (default :attr:`gptok_limit`)
+        are broken up by :meth:`split_oversized`.  Statements kept as they
+        are become offsets into *source*; only re-rendered text is stored.
+
+        Sections with stubs awaiting an :attr:`llm_summarizer` summary are
+        left as placeholders until :meth:`summarize_pending` is called.
+        *docstrings* from before minification (see
+        :func:`_source_docstrings`) are given to the summariser with the
+        stubbed methods.
+        """
+        limit = self.gptok_limit if limit is None else limit
+        sections: list[Section] = []
+        for node, minified_code, size, is_exact in zip(nodes, texts, sizes, exact):
+            span: tuple[int, int] | None = source.span(node)
+            if not is_exact:
+                low, high = self.gptok_estimator.bounds(  # type: ignore[union-attr]
+                    minified_code
+                )
+                if low <= self.gptok_threshold < high:
+                    size, is_exact = self.gptok_size(minified_code), True
+            if size > self.gptok_threshold and isinstance(
+                node, (FunctionDef, ClassDef)
+            ):
+                body_summary = PyBodySummarizer(self, source, docstrings)
+                node = body_summary.visit(node)
+                if body_summary.pending:
+                    placeholder = Section(0, text="")
+                    sections.append(placeholder)
+                    self._pending_summaries.append(
+                        (sections, placeholder, node, limit, body_summary.pending)
+                    )
+                    continue
+                if body_summary.changed:
+                    fix_missing_locations(node)
+                    with self.profiler.span("unparse", "call"):
+                        unparsed = ast_unparse(node)
+                    minified_code = (
+                        self.minify(unparsed, remove_literal_statements=False) + "\n"
+                    )
+                    size, is_exact = self.gptok_size(minified_code), True
+                    span = None
+            if not is_exact and size > limit // 2:
+                size, is_exact = self.gptok_size(minified_code), True
+            sections.extend(
+                self._fit_section(minified_code, size, is_exact, limit, span)
+            )
 
         return sections
 
+    def _fit_section(
+        self,
+        text: str,
+        size: int,
+        is_exact: bool,
+        limit: int,
+        span: tuple[int, int] | None = None,
+    ) -> list[Section]:
+        """Return the section(s) for *text*, split up if it exceeds *limit*.
+
+        A section that fits and whose *text* is the source slice at *span*
+        stores only the offsets.
+        """
+        if size > limit:
+            return [
+                Section(self.gptok_size(piece), text=piece)
+                for piece in self.split_oversized(text, limit)
+            ]
+        if span is None:
+            return [Section(size, text=text, exact=is_exact)]
+        return [Section(size, *span, exact=is_exact)]
+
+    def summarize_pending(self) -> None:
+        """Summarise all stubbed functions collected so far, concurrently.
+
+        Every summary requested by :meth:`_build_sections` since the last
+        call is sent in one batch through :attr:`llm_summarizer`, except
+        those found in :attr:`summary_cache`.  Each summary is spliced into
+        its function as a docstring, and the affected sections are
+        rendered, measured and, if needed, split.  Functions whose summary
+        failed keep a bare ``...`` stub.
+        """
+        pending, self._pending_summaries = self._pending_summaries, []
+        if not pending:
+            return
+        targets = [target for *_, node_targets in pending for target in node_targets]
+        summarizer: SummarizerBackend = self.llm_summarizer  # type: ignore[assignment]
+        cache = self.summary_cache if summarizer.cacheable else None
+        docs: list[str | None] = [
+            cache.get(code, summarizer.model, summarizer.system) if cache else None
+            for _, code in targets
+        ]
+        missing = [i for i, doc in enumerate(docs) if doc is None]
+        self.profiler.count("summaries", len(targets))
+        self.profiler.count("summary_cache_hits", len(targets) - len(missing))
+        with self.profiler.span("summarize", backend=summarizer.name):
+            fetched = summarizer.run([targets[i][1] for i in missing])
+        for i, doc in zip(missing, fetched):
+            docs[i] = doc
+            if cache is not None and doc:
+                cache.put(targets[i][1], summarizer.model, summarizer.system, doc)
+        if cache is not None:
+            cache.commit()
+        for (node, _), doc in zip(targets, docs):
+            if doc:
+                node.body.insert(0, Expr(Constant(doc)))
+        logger.info(
+            "Summarised %d of %d functions (%d from cache).",
+            sum(map(bool, docs)),
+            len(targets),
+            len(targets) - len(missing),
+        )
+        for sections, placeholder, node, limit, _ in pending:
+            fix_missing_locations(node)
+            with self.profiler.span("unparse", "call"):
+                unparsed = ast_unparse(node)
+            text = self.minify(unparsed, remove_literal_statements=False) + "\n"
+            i = next(i for i, sec in enumerate(sections) if sec is placeholder)
+            sections[i : i + 1] = self._fit_section(
+                text, self.gptok_size(text), True, limit
+            )
+
+    def split_oversized(self, text: str, limit: int) -> list[str]:
+        """Break a section of more than *limit* tokens into pieces that fit.
+
+        Classes and functions are broken down hierarchically: the header
+        (decorators and ``class``/``def`` line) followed by as many
+        consecutive body statements as fit, then further pieces that start
+        with a continuation header (``def f(x):  # continued``), recursing
+        into body statements that are too big on their own.  Whatever is
+        still too big, such as a giant module-level statement, is cut
+        between lines, or within a line as a last resort.
+
+        Args:
+            text: Source text of the section.
+            limit: Maximum tokens per piece.
+
+        Returns:
+            Pieces whose concatenation holds all of *text*'s code, each of at
+            most *limit* tokens.
+        """
+        try:
+            nodes = parse(text).body
+        except SyntaxError:
+            return self._split_lines(text, limit)
+        source = SourceSlicer(text)
+        pieces: list[str] = []
+        for node in nodes:
+            pieces.extend(self._split_node(node, source, "", "", limit))
+        return pieces
+
+    def _split_node(
+        self,
+        node: AST,
+        source: SourceSlicer,
+        prefix: str,
+        cont_prefix: str,
+        limit: int,
+    ) -> list[str]:
+        """Split *node* into pieces, the first starting with *prefix*.
+
+        *prefix* holds the headers of the enclosing class/function for the
+        first piece and *cont_prefix* their continuation headers for the
+        others.
+        """
+        indent = source.indent(node)
+        text = prefix + indent + source.segment(node) + "\n"
+        if self.gptok_size(text) <= limit:
+            return [text]
+        body = getattr(node, "body", None)
+        if not isinstance(node, (ClassDef, FunctionDef, AsyncFunctionDef)) or not body:
+            return self._split_lines(text, limit)
+
+        header = prefix + indent + source.header(node) + "\n"
+        cont = cont_prefix + indent + source.header(node, False) + "  # continued\n"
+        cont_size = self.gptok_size(cont)
+        head, head_size = header, self.gptok_size(header)
+        texts = [
+            source.indent(stmt, indent + " ") + source.segment(stmt) + "\n"
+            for stmt in body
+        ]
+        sizes = self.gptok_sizes(texts)
+        pieces: list[str] = []
+        i = 0
+        while i < len(body):
+            # take as many statements as fit by their summed sizes ...
+            j, total = i, head_size
+            while j < len(body) and total + sizes[j] <= limit:
+                total += sizes[j]
+                j += 1
+            piece = head + "".join(texts[i:j])
+            # ... and give some back if the joined text turns out larger
+            while j > i + 1 and self.gptok_size(piece) > limit:
+                j -= 1
+                piece = head + "".join(texts[i:j])
+            if j == i or self.gptok_size(piece) > limit:
+                pieces.extend(self._split_node(body[i], source, head, cont, limit))
+                j = i + 1
+            else:
+                pieces.append(piece)
+            head, head_size = cont, cont_size
+            i = j
+        return pieces
+
+    def _split_lines(self, text: str, limit: int) -> list[str]:
+        """Cut *text* into pieces of at most *limit* tokens.
+
+        Halves *text* between lines (or, for a single line, between
+        characters) until each half fits, then merges neighbouring pieces
+        back together while they still fit.
+        """
+        if len(text) <= 1 or self.gptok_size(text) <= limit:
+            return [text]
+        lines = text.splitlines(keepends=True)
+        if len(lines) > 1:
+            mid = len(lines) // 2
+            halves = "".join(lines[:mid]), "".join(lines[mid:])
+        else:
+            halves = text[: len(text) // 2], text[len(text) // 2 :]
+        pieces = self._split_lines(halves[0], limit) + self._split_lines(
+            halves[1], limit
+        )
+        merged = [pieces[0]]
+        for piece in pieces[1:]:
+            if self.gptok_size(merged[-1] + piece) <= limit:
+                merged[-1] += piece
+            else:
+                merged.append(piece)
+        return merged
+
     def process_py(self, *args: object, **kwargs: object) -> list[Path]:
         """Process files and compute per-file sections for splitting.
 
         Delegates to :meth:`PyTypingMinifier.process_py` then attaches
-        section data to each file entry in :attr:`code_summary`.
+        sections to each file's record in :attr:`code_summary`.  Files are
+        sectioned in batches of :data:`SECTION_BATCH_FILES`, each tokenized
+        together.  Once a file is sectioned its processed source is dropped;
+        the sections keep offsets into the written output file.  In
+        incremental mode, files that were unchanged keep the sections stored
+        in the manifest and are not re-sectioned.  With ``cache=True`` LLM
+        summaries are also cached (see :meth:`enable_summary_cache`).
 
         Returns:
             List of output file paths (same as parent return value).
         """
+        options = signature(super().process_py).bind(*args, **kwargs).arguments
+        mini = options.get("mini", True)
         paths = super().process_py(*args, **kwargs)  # type: ignore[arg-type]
+        if not mini:
+            # the outputs are left as they are, but sections are still minified
+            for path in paths:
+                code_data = self.code_folder_data[path]
+                if code_data.sections is None:
+                    code_data.py_code = self.minify(
+                        code_data.py_code,  # type: ignore[arg-type]
+                        remove_literal_statements=False,
+                    )
+        if (
+            options.get("cache")
+            and self.summary_cache is None
+            and self.llm_summarizer is not None
+            and self.out_py_folder is not None
+        ):
+            self.enable_summary_cache()
+
+        prefix = package_prefix(self.py_folder) if self.py_folder else ""
+        todo = [path for path in paths if self.code_folder_data[path].sections is None]
+        built = [self.code_folder_data[path] for path in todo]
+        # bounded batches: syntax trees of every file at once would pin the
+        # memory they took long after the files were sectioned
+        for start in range(0, len(todo), SECTION_BATCH_FILES):
+            self._section_files(
+                todo[start : start + SECTION_BATCH_FILES], prefix, mini
+            )
+        with self.profiler.span("sectioning"):
+            for path in paths:
+                self.code_summary[str(path)] = self.code_folder_data[path]
+            self._docstrings.clear()
+            self.summarize_pending()
+
+        for code_data in built:
+            sections: list[Section] = code_data.sections  # type: ignore[assignment]
+            code_data.gptok_size = sum(sec.gptok_size for sec in sections)
+            self.profiler.count("sections", len(sections))
+            self.profiler.count("tokens", code_data.gptok_size)
+            if self.manifest is not None:
+                self.manifest.update(
+                    code_data.rel_path,
+                    sections=[sec.to_json() for sec in sections],
+                    gptok_size=code_data.gptok_size,
+                    imports=code_data.imports,
+                )
 
-        for path in paths:
-            code_data = self.code_folder_data[path]
-            sections = self.process_py_code(code_data["py_code"])
-            code_data["sections"] = sections
-            code_data["gptok_size"] = sum(sec["gptok_size"] for sec in sections)
-            self.code_summary[str(path)] = code_data
-
+        if self.manifest is not None:
+            self.manifest.save()
         return paths
 
-    def write_splits(self) -> None:
+    def _section_files(self, paths: list[Path], prefix: str, mini: bool) -> None:
+        """Section the processed sources of *paths*, tokenized in one batch.
+
+        *prefix* is the package prefix of their module names.  Unless *mini*,
+        the sources are minified text that differs from the output files,
+        so sections keep their own text.
+        """
+        with self.profiler.span("parse"):
+            sliced = {
+                path: self._slice_py_code(
+                    self.code_folder_data[path].py_code  # type: ignore[arg-type]
+                )
+                for path in paths
+            }
+        with self.profiler.span("tokenization"):
+            all_sizes, all_exact = (
+                iter(counts)
+                for counts in self._count_section_texts(
+                    [text for _, _, texts in sliced.values() for text in texts]
+                )
+            )
+        with self.profiler.span("sectioning"):
+            for path in paths:
+                code_data = self.code_folder_data[path]
+                nodes, source, texts = sliced.pop(path)
+                sizes = [next(all_sizes) for _ in texts]
+                exact = [next(all_exact) for _ in texts]
+                rel_path = code_data.rel_path
+                code_data.imports = imported_names(
+                    nodes,
+                    module_name(rel_path, prefix),
+                    rel_path.stem == "__init__",
+                )
+                # leave room for the "# File:" header that precedes the file
+                limit = self.gptok_limit - self.gptok_size(f"# File: {path}\n")
+                docstrings = self._docstrings.pop(rel_path, None)
+                with self.profiler.span("build_sections", "file", file=rel_path):
+                    code_data.sections = self._build_sections(
+                        nodes, source, texts, sizes, exact, limit, docstrings
+                    )
+                if not mini:
+                    # sections slice the minified text, not the output file
+                    for i, sec in enumerate(code_data.sections):
+                        if sec.text is None:
+                            text = sec.render(source.source)
+                            code_data.sections[i] = Section(
+                                sec.gptok_size, text=text, exact=sec.exact
+                            )
+                code_data.py_code = None  # sections now point into the output
+
+    def split_sources(
+        self, sources: Mapping[str, str], mini: bool = True, **minify_options: object
+    ) -> list[str]:
+        """Section and split in-memory sources without reading or writing files.
+
+        Each source is minified (unless *mini* is false), sectioned like the
+        files of :meth:`process_py` and packed by :attr:`split_planner`.
+        :attr:`code_summary` is replaced by the new sources, so
+        :attr:`split_paths` lists their names afterwards.
+
+        Args:
+            sources: Mapping from a file name, used in the ``# File:``
+                headers and for :attr:`split_order`, to its source text.
+            mini: Whether to minify the sources first.
+            **minify_options: Extra options forwarded to :meth:`minify`.
+
+        Returns:
+            The text of each split, in order.
+        """
+        self.code_summary = {}
+        for name, py_code in sources.items():
+            docstrings = None
+            if mini:
+                if self.llm_summarizer is not None:
+                    docstrings = _source_docstrings(py_code)
+                py_code = self.minify(py_code, **minify_options)
+            rel_path = Path(name)
+            nodes, source, texts = self._slice_py_code(py_code)
+            code_data = FileRecord(rel_path, rel_path, rel_path.with_suffix(".pyi"))
+            code_data.py_code = py_code
+            code_data.imports = imported_names(
+                nodes, module_name(rel_path), rel_path.stem == "__init__"
+            )
+            limit = self.gptok_limit - self.gptok_size(f"# File: {name}\n")
+            code_data.sections = self._build_sections(
+                nodes,
+                source,
+                texts,
+                *self._count_section_texts(texts),
+                limit,
+                docstrings,
+            )
+            self.code_summary[name] = code_data
+        self.summarize_pending()
+        for code_data in self.code_summary.values():
+            sections: list[Section] = code_data.sections  # type: ignore[assignment]
+            code_data.gptok_size = sum(sec.gptok_size for sec in sections)
+        return list(self.iter_splits(release=True))
+
+    def _manifest_options(
+        self,
+        types: bool,
+        types_mode: str,
+        mini: bool,
+        minify_options: dict[str, object],
+    ) -> dict[str, object]:
+        """Extend the base options with everything that affects sections."""
+        options = super()._manifest_options(types, types_mode, mini, minify_options)
+        return options | {
+            "gptok_model": self.gptok_model,
+            "gptok_limit": self.gptok_limit,
+            "gptok_threshold": self.gptok_threshold,
+            "gptok_exact": self.gptoker is not None,
+            "gptok_estimate": self.gptok_estimate,
+            "llm_backend": self.llm_summarizer.name if self.llm_summarizer else None,
+        }
+
+    def _keep_input(self, code_data: FileRecord, py_code: str) -> None:
+        """Keep the docstrings that minification removes, for the summariser."""
+        if self.llm_summarizer is not None:
+            self._docstrings[code_data.rel_path] = _source_docstrings(py_code)
+
+    def _keep_output(self, code_data: FileRecord, py_code: str) -> None:
+        """Keep the processed source until the file has been sectioned."""
+        code_data.py_code = py_code
+
+    def _file_source(self, path: str, code_data: FileRecord) -> str:
+        """Return the processed source that *code_data*'s sections slice.
+
+        The source is read back from the output file at *path* unless it is
+        still held in memory or no section refers to it.
+        """
+        if code_data.py_code is not None:
+            return code_data.py_code
+        if all(sec.text is not None for sec in code_data.sections or ()):
+            return ""
+        return Path(path).read_text(encoding="utf-8")
+
+    def _section_bounds(self, section: Section, text: str) -> tuple[int, int]:
+        """Return ``(low, high)`` bounds of *section*'s token count."""
+        if not section.exact:
+            if self.gptok_estimator is not None:
+                return self.gptok_estimator.bounds(text)
+            self._make_sections_exact([(section, text)])
+        return section.gptok_size, section.gptok_size
+
+    def _make_sections_exact(self, sections: list[tuple[Section, str]]) -> None:
+        """Replace estimated sizes with exact counts of ``(section, text)`` pairs."""
+        estimated = [(sec, text) for sec, text in sections if not sec.exact]
+        for (section, _), size in zip(
+            estimated, self.gptok_sizes([text for _, text in estimated])
+        ):
+            section.gptok_size = size
+            section.exact = True
+
+    def import_graph(self) -> dict[str, list[str]]:
+        """Return the intra-project import graph of :attr:`code_summary`.
+
+        Returns:
+            Mapping from each :attr:`code_summary` key to the keys of the
+            project files it imports.
+        """
+        prefix = package_prefix(self.py_folder) if self.py_folder else ""
+        modules = {
+            module_name(code_data.rel_path, prefix): path
+            for path, code_data in self.code_summary.items()
+        }
+        graph = import_graph(
+            {
+                module: self.code_summary[path].imports
+                for module, path in modules.items()
+            }
+        )
+        return {
+            modules[module]: [modules[target] for target in targets]
+            for module, targets in graph.items()
+        }
+
+    def _ordered_summary(self) -> list[tuple[str, FileRecord]]:
+        """Return :attr:`code_summary` items in :attr:`split_order`.
+
+        Raises:
+            ValueError: A file's sections were released by an earlier
+                ``release=True`` call.
+        """
+        for path, code_data in self.code_summary.items():
+            if code_data.sections is None:
+                raise ValueError(
+                    f"Sections of {path} were released by an earlier "
+                    "write_splits(release=True) or iter_splits(release=True); "
+                    "run process_py again to rebuild them"
+                )
+        if self.split_order == "imports":
+            return [
+                (path, self.code_summary[path])
+                for path in import_order(self.import_graph())
+            ]
+        return list(self.code_summary.items())
+
+    def cross_split_edges(self) -> tuple[int, int]:
+        """Count import edges between files that share no split.
+
+        Measured on the splits last produced by :meth:`iter_splits` (see
+        :attr:`split_paths`).
+
+        Returns:
+            ``(cross_split, total)`` intra-project import edge counts.
+        """
+        return cross_split_edges(self.import_graph(), self.split_paths)
+
+    def iter_splits(self, release: bool = False) -> Iterator[str]:
+        """Yield the text of each token-bounded split as soon as it is full.
+
+        With the ``"greedy"`` :attr:`split_planner`, each split contains
+        consecutive sections from :attr:`code_summary` that together do not
+        exceed :attr:`gptok_limit` tokens, and only the split being assembled
+        is held in memory.  Other planners first cut every file into
+        contiguous chunks (see :meth:`split_chunks`) and then pack the chunks,
+        so they need all sections up front.
+
+        Files are taken in :attr:`split_order`, and the files contributing
+        to each split are recorded in :attr:`split_paths`.  A file's
+        ``# File:`` header goes into the split of its first section.  Each
+        file's source is read back from its output file when its first
+        sliced section is placed.
+
+        Sections with estimated sizes are packed by their upper bound.  When
+        the upper bound would overflow the split but the lower bound would
+        not, the estimated sections of the current split and the candidate
+        are counted exactly before deciding.  A full split that still holds
+        estimated sizes is counted exactly before it is yielded, and re-packed
+        if it is over the limit (see :meth:`_close_split`), so estimates that
+        are off for text unlike the calibration sample cannot overflow it.
+
+        Args:
+            release: Drop each file's ``sections`` from its
+                :attr:`code_summary` record once all of its sections have
+                been placed, so memory held by already-emitted text is freed.
+                Later calls that need the sections raise ``ValueError``.
+
+        Yields:
+            The text of each split, in order.
+        """
+        self.split_paths = []
+        if self.split_planner != "greedy":
+            chunks = self.split_chunks(release=release)
+            plan = SPLIT_PLANNERS[self.split_planner](
+                [size for _, _, size in chunks], self.gptok_limit
+            )
+            for split in plan:
+                self.split_paths.append(
+                    list(dict.fromkeys(chunks[i][0] for i in split))
+                )
+                yield "".join(chunks[i][1] for i in split)
+            return
+
+        limit = self.gptok_limit
+        pieces = self._split_pieces(release)
+        queue: deque[tuple[str, Section | None, str]] = deque()  # to re-pack
+        current: list[tuple[str, Section | None, str]] = []
+        bounds: list[tuple[int, int]] = []  # (low, high) of each piece
+        current_sections = 0  # sections (not headers) in current
+        current_low = current_high = 0  # bounds of current's token count
+
+        while True:
+            piece = queue.popleft() if queue else next(pieces, None)
+            if piece is not None:
+                _, section, text = piece
+                if section is None:
+                    low = high = self.gptok_size(text)
+                else:
+                    low, high = self._section_bounds(section, text)
+                if current_high + high > limit >= current_low + low:
+                    # The bounds straddle the limit: settle it with exact counts
+                    self._make_sections_exact(
+                        [(sec, txt) for _, sec, txt in current if sec is not None]
+                        + ([(section, text)] if section is not None else [])
+                    )
+                    bounds = [
+                        (sec.gptok_size,) * 2 if sec is not None else bound
+                        for (_, sec, _), bound in zip(current, bounds)
+                    ]
+                    current_low = current_high = sum(low for low, _ in bounds)
+                    if section is not None:
+                        low = high = section.gptok_size
+                if (
+                    section is None
+                    or not current_sections
+                    or current_high + high <= limit
+                ):
+                    current.append(piece)
+                    bounds.append((low, high))
+                    current_sections += section is not None
+                    current_low += low
+                    current_high += high
+                    continue
+            elif not current:
+                break
+            # The split is full, or the input is exhausted: emit it
+            split, rest = self._close_split(current, bounds, final=piece is None)
+            if split:
+                self.split_paths.append(list(dict.fromkeys(p for p, _, _ in split)))
+                yield "".join(text for _, _, text in split)
+            queue.extendleft(reversed([*rest, piece] if piece else rest))
+            current, bounds, current_sections = [], [], 0
+            current_low = current_high = 0
+
+    def _split_pieces(self, release: bool) -> Iterator[tuple[str, Section | None, str]]:
+        """Yield ``(path, section, text)`` for every file header and section.
+
+        Headers have no section.  Files are taken in :attr:`split_order`;
+        with *release*, each file's sections and source are dropped once
+        all of its pieces have been yielded.
+        """
+        for path, code_data in self._ordered_summary():
+            yield path, None, f"# File: {path}\n"
+            source = self._file_source(path, code_data)
+            for section in code_data.sections:  # type: ignore[union-attr]
+                yield path, section, section.render(source)
+            if release:
+                code_data.sections = None
+                code_data.py_code = None
+
+    def _close_split(
+        self,
+        pieces: list[tuple[str, Section | None, str]],
+        bounds: list[tuple[int, int]],
+        final: bool = False,
+    ) -> tuple[
+        list[tuple[str, Section | None, str]], list[tuple[str, Section | None, str]]
+    ]:
+        """Decide which ``(path, section, text)`` *pieces* of a full split to emit.
+
+        The upper *bounds* of the pieces fit in :attr:`gptok_limit`, but
+        the estimator's bounds only hold for text like its calibration
+        sample, so a split with estimated sizes is counted exactly.  If it
+        is over the limit, its sections are counted exactly and the split
+        is cut after the last section that fits (never before its first
+        section).  A first section that alone exceeds the limit is broken
+        up by :meth:`split_oversized` instead.  Trailing headers move on
+        with the first section of their file, unless the split is *final*.
+
+        Returns:
+            The pieces to emit as the split, and those to pack again.
+        """
+        limit = self.gptok_limit
+        end = len(pieces)
+        while not final and pieces[end - 1][1] is None:
+            end -= 1
+        if any(low != high for low, high in bounds[:end]):
+            if self.gptok_size("".join(text for _, _, text in pieces[:end])) <= limit:
+                return pieces[:end], pieces[end:]
+            self._make_sections_exact(
+                [(sec, text) for _, sec, text in pieces[:end] if sec is not None]
+            )
+        cut = first = None
+        total = 0
+        for i, (path, section, text) in enumerate(pieces[:end]):
+            if section is None:
+                total += bounds[i][0]
+                continue
+            total += section.gptok_size
+            if first is None:
+                first = i
+                parts = (
+                    self.split_oversized(text, limit)
+                    if section.gptok_size > limit
+                    else []
+                )
+                if len(parts) > 1:
+                    refit = [
+                        (path, Section(self.gptok_size(part), text=part), part)
+                        for part in parts
+                    ]
+                    return [], [*pieces[:i], *refit, *pieces[i + 1 :]]
+            if total > limit:
+                break
+            cut = i + 1
+        if cut is None:
+            cut = end if first is None else first + 1
+        return pieces[:cut], pieces[cut:]
+
+    def split_chunks(self, release: bool = False) -> list[tuple[str, str, int]]:
+        """Cut every file into contiguous chunks that each fit in a split.
+
+        A chunk is a ``# File:`` header followed by as many consecutive
+        sections of that file as fit in :attr:`gptok_limit`, so a file
+        that fits in one split stays in one piece.  Files are taken in
+        :attr:`split_order`.  All section sizes are counted exactly, and a
+        section found to exceed the limit (after an underestimate) is broken
+        up by :meth:`split_oversized`.
+
+        Args:
+            release: Drop each file's ``sections`` once it has been
+                chunked.
+
+        Returns:
+            ``(path, text, gptok_size)`` tuples in file order.
+        """
+        chunks: list[tuple[str, str, int]] = []
+        for path, code_data in self._ordered_summary():
+            header = f"# File: {path}\n"
+            header_size = self.gptok_size(header)
+            source = self._file_source(path, code_data)
+            sections: list[Section] = code_data.sections  # type: ignore[assignment]
+            texts = [sec.render(source) for sec in sections]
+            self._make_sections_exact(list(zip(sections, texts)))
+            parts: list[str] = [header]
+            size = header_size
+            for section, text in zip(sections, texts):
+                if section.gptok_size > self.gptok_limit:  # was underestimated
+                    pieces = self.split_oversized(text, self.gptok_limit)
+                else:
+                    pieces = [text]
+                for piece in pieces:
+                    piece_size = (
+                        section.gptok_size
+                        if len(pieces) == 1
+                        else self.gptok_size(piece)
+                    )
+                    if len(parts) > 1 and size + piece_size > self.gptok_limit:
+                        chunks.append((path, "".join(parts), size))
+                        parts, size = [header], header_size
+                    parts.append(piece)
+                    size += piece_size
+            chunks.append((path, "".join(parts), size))
+            if release:
+                code_data.sections = None
+                code_data.py_code = None
+        return chunks
+
+    def split_plan_report(self) -> dict[str, dict[str, float]]:
+        """Compare split count and fill ratio of every split planner.
+
+        ``"greedy"`` is measured on the sections in file order (the file
+        header counted with its first section); the other planners on the
+        chunks from :meth:`split_chunks`.
+
+        Returns:
+            Mapping from planner name to ``{"splits": int, "fill": float}``.
+        """
+        sizes: list[int] = []
+        for path, code_data in self._ordered_summary():
+            sections: list[Section] = code_data.sections  # type: ignore[assignment]
+            if not all(sec.exact for sec in sections):
+                source = self._file_source(path, code_data)
+                self._make_sections_exact(
+                    [(sec, sec.render(source)) for sec in sections]
+                )
+            file_sizes = [sec.gptok_size for sec in sections] or [0]
+            file_sizes[0] += self.gptok_size(f"# File: {path}\n")
+            sizes.extend(file_sizes)
+        limit = self.gptok_limit
+        report = {"greedy": plan_stats(plan_greedy(sizes, limit), sizes, limit)}
+        chunk_sizes = [size for _, _, size in self.split_chunks()]
+        for name, planner in SPLIT_PLANNERS.items():
+            if name != "greedy":
+                plan = planner(chunk_sizes, limit)
+                report[name] = plan_stats(plan, chunk_sizes, limit)
+        return report
+
+    def write_splits(self, release: bool = False) -> None:
         """Write token-bounded split files to ``<out_py_folder>/split4gpt/``.
 
-        Each split file contains consecutive sections from :attr:`code_summary`
-        that together do not exceed :attr:`gptok_limit` tokens.  Does nothing
-        when :attr:`out_py_folder` has not been set (i.e. no files were
-        processed).
+        Splits come from :meth:`iter_splits` and each one is written as soon
+        as it is complete.  Split files whose content is unchanged are not
+        rewritten, and split files left over from an earlier run with more
+        splits are removed.  With :attr:`gptok_targets`, the sections are
+        packed once per target into ``split4gpt/<name>/split*.py`` (see
+        :meth:`_split_target`), and split files directly in ``split4gpt/``
+        are removed.  Does nothing when :attr:`out_py_folder` has not
+        been set (i.e. no files were processed).
+
+        Args:
+            release: Free each file's sections and source once written (see
+                :meth:`iter_splits`), for one-shot runs that split many
+                files.  Afterwards :meth:`iter_splits`, :meth:`write_splits`
+                and :meth:`split_plan_report` raise ``ValueError`` until
+                :meth:`process_py` runs again.
         """
         if self.out_py_folder is None:
-            logger.warning("write_splits called before process_py; no output folder set.")
+            logger.warning(
+                "write_splits called before process_py; no output folder set."
+            )
             return
         splits_folder = self.out_py_folder / "split4gpt"
-        splits_folder.mkdir(parents=True, exist_ok=True)
 
-        textportions: list[str] = []
-        current_size = 0
-        current_portion: list[str] = []
+        if not self.gptok_targets:
+            self._write_split_folder(splits_folder, release)
+        else:
+            for target in self.gptok_targets:
+                with self._split_target(target):
+                    count = self._write_split_folder(splits_folder / target.name, False)
+                logger.info(
+                    "Wrote %d splits of up to %d tokens for %s.",
+                    count,
+                    target.limit,
+                    target.name,
+                )
+            for stale_path in splits_folder.glob("split*.py"):
+                stale_path.unlink(missing_ok=True)
+            if release:
+                for code_data in self.code_summary.values():
+                    code_data.sections = None
+                    code_data.py_code = None
+
+        if self.gptoker is not None:
+            stats = self.gptok_counter.stats()
+            self.profiler.count("token_cache_hits", stats["hits"])
+            self.profiler.count("token_cache_misses", stats["misses"])
+            logger.info(
+                "Token count cache: %d hits, %d misses "
+                "(%.1f%% hit rate, %d/%d entries).",
+                stats["hits"],
+                stats["misses"],
+                stats["hit_rate"] * 100,
+                stats["size"],
+                stats["maxsize"],
+            )
+
+    def _write_split_folder(self, splits_folder: Path, release: bool) -> int:
+        """Write the splits of :meth:`iter_splits` to *splits_folder*.
 
-        for path, code_data in self.code_summary.items():
-            header = f"# File: {path}\n"
-            current_portion.append(header)
-            current_size += self.gptok_size(header)
-
-            for section in code_data["sections"]:
-                if current_size + section["gptok_size"] > self.gptok_limit:
-                    textportions.append("".join(current_portion))
-                    current_portion = []
-                    current_size = 0
-                current_portion.append(section["py"])
-                current_size += section["gptok_size"]
-
-        if current_portion:
-            textportions.append("".join(current_portion))
-
-        for i, textportion in enumerate(textportions, start=1):
-            (splits_folder / f"split{i}.py").write_text(textportion, encoding="utf-8")
+        Returns:
+            The number of splits.
+        """
+        splits_folder.mkdir(parents=True, exist_ok=True)
+        count = 0
+        with self.profiler.span("splits"):
+            splits = enumerate(self.iter_splits(release=release), start=1)
+            for count, textportion in splits:
+                with self.profiler.span("write", "file", file=f"split{count}.py"):
+                    if not write_if_changed(
+                        splits_folder / f"split{count}.py", textportion
+                    ):
+                        self.profiler.count("writes_skipped")
+                self.profiler.count("splits")
+            for stale_path in splits_folder.glob("split*.py"):
+                number = stale_path.stem[len("split") :]
+                if number.isdigit() and int(number) > count:
+                    stale_path.unlink(missing_ok=True)
+
+        cross, total = self.cross_split_edges()
+        logger.info("Cross-split import edges: %d of %d.", cross, total)
+        return count
+
+    @contextmanager
+    def _split_target(self, target: SplitTarget) -> Iterator[None]:
+        """Pack splits for *target* inside the ``with`` block.
+
+        :attr:`gptok_limit` becomes the target's limit.  When the target's
+        model has another tokenizer than :attr:`gptok_model`, its
+        :class:`TokenCounter` is used and :attr:`code_summary` is replaced
+        by copies whose sections are recounted with it, so the shared
+        sections keep their sizes.  Sections that exceed the target's limit
+        under its tokenizer are broken up with :meth:`split_oversized`.
+        """
+        saved = self.gptok_limit, self._gptok_counter, self.code_summary
+        counter = self._target_counter(target.model)
+        try:
+            self.gptok_limit = target.limit
+            if counter is not self.gptok_counter:
+                self._gptok_counter = counter
+                summary = {}
+                for path, code_data in self.code_summary.items():
+                    source = self._file_source(path, code_data)
+                    texts = [sec.render(source) for sec in code_data.sections or []]
+                    sizes = counter.count_batch(texts, num_threads=self.gptok_threads)
+                    # leave room for the "# File:" header, as in process_py
+                    limit = target.limit - self.gptok_size(f"# File: {path}\n")
+                    sections = []
+                    for sec, text, size in zip(code_data.sections or [], texts, sizes):
+                        if size > limit:
+                            sections.extend(self._fit_section(text, size, True, limit))
+                        else:
+                            sections.append(Section(size, sec.start, sec.end, sec.text))
+                    summary[path] = replace(code_data, sections=sections)
+                self.code_summary = summary
+            yield
+        finally:
+            self.gptok_limit, self._gptok_counter, self.code_summary = saved
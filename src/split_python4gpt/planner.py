@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/planner.py
+"""Split planners: assign sized items to token-bounded splits."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+
+
+def plan_greedy(sizes: list[int], limit: int) -> list[list[int]]:
+    """Pack items in order, starting a new split when the next one won't fit.
+
+    Args:
+        sizes: Token size of each item.
+        limit: Maximum tokens per split.
+
+    Returns:
+        Lists of item indices, one list per split.
+    """
+    bins: list[list[int]] = []
+    current: list[int] = []
+    current_size = 0
+    for i, size in enumerate(sizes):
+        if current and current_size + size > limit:
+            bins.append(current)
+            current, current_size = [], 0
+        current.append(i)
+        current_size += size
+    if current:
+        bins.append(current)
+    return bins
+
+
+def plan_first_fit_decreasing(sizes: list[int], limit: int) -> list[list[int]]:
+    """Place items largest first into the first split that has room.
+
+    Items larger than *limit* get a split of their own.  Within each split
+    items keep their original order.
+    """
+    bins: list[list[int]] = []
+    loads: list[int] = []
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i], i)):
+        for b, load in enumerate(loads):
+            if load + sizes[i] <= limit:
+                bins[b].append(i)
+                loads[b] += sizes[i]
+                break
+        else:
+            bins.append([i])
+            loads.append(sizes[i])
+    return _normalise(bins)
+
+
+def plan_optimal(
+    sizes: list[int], limit: int, max_nodes: int = 200_000, max_items: int = 500
+) -> list[list[int]]:
+    """Minimise the number of splits with a bounded branch-and-bound search.
+
+    Starts from the first-fit-decreasing solution and searches for one with
+    fewer splits, stopping early when the lower bound
+    ``ceil(total / limit)`` is reached or after *max_nodes* search steps.
+    Inputs with more than *max_items* items are not searched.  The result is
+    therefore optimal for all but large inputs, and never worse than
+    first-fit-decreasing.
+    """
+    best = plan_first_fit_decreasing(sizes, limit)
+    fitting = [i for i in range(len(sizes)) if sizes[i] <= limit]
+    oversized = [[i] for i in range(len(sizes)) if sizes[i] > limit]
+    order = sorted(fitting, key=lambda i: (-sizes[i], i))
+    lower_bound = -(-sum(sizes[i] for i in order) // limit) + len(oversized)
+    if len(best) <= lower_bound or len(order) > max_items:
+        return best
+
+    best_count = len(best)
+    best_bins: list[list[int]] | None = None
+    bins: list[list[int]] = []
+    loads: list[int] = []
+    nodes = 0
+
+    def search(k: int) -> bool:
+        nonlocal best_count, best_bins, nodes
+        nodes += 1
+        if nodes > max_nodes:
+            return True
+        if len(bins) + len(oversized) >= best_count:
+            return False
+        if k == len(order):
+            best_count = len(bins) + len(oversized)
+            best_bins = [list(b) for b in bins]
+            return best_count <= lower_bound
+        i = order[k]
+        tried: set[int] = set()
+        for b in range(len(bins)):
+            if loads[b] + sizes[i] <= limit and loads[b] not in tried:
+                tried.add(loads[b])  # bins with equal load are interchangeable
+                bins[b].append(i)
+                loads[b] += sizes[i]
+                done = search(k + 1)
+                loads[b] -= sizes[i]
+                bins[b].pop()
+                if done:
+                    return True
+        bins.append([i])
+        loads.append(sizes[i])
+        done = search(k + 1)
+        bins.pop()
+        loads.pop()
+        return done
+
+    search(0)
+    if best_bins is None:
+        return best
+    return _normalise(best_bins + oversized)
+
+
+def _normalise(bins: list[list[int]]) -> list[list[int]]:
+    """Sort items within each split, and splits by their first item."""
+    return sorted((sorted(b) for b in bins), key=lambda b: b[0])
+
+
+SPLIT_PLANNERS: dict[str, Callable[[list[int], int], list[list[int]]]] = {
+    "greedy": plan_greedy,
+    "ffd": plan_first_fit_decreasing,
+    "optimal": plan_optimal,
+}
+
+
+def plan_stats(bins: list[list[int]], sizes: list[int], limit: int) -> dict[str, float]:
+    """Return the split count and fill ratio of a plan.
+
+    The fill ratio is the total size of all items divided by the combined
+    capacity of all splits.
+    """
+    total = sum(sizes[i] for b in bins for i in b)
+    return {
+        "splits": len(bins),
+        "fill": total / (len(bins) * limit) if bins else 0.0,
+    }
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/profiling.py
+"""Timing spans and counters, exported as a Chrome/Perfetto trace."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from pathlib import Path
+
+
+class NullProfiler:
+    """Profiler that records nothing; the default of every minifier.
+
+    :meth:`span` returns one shared no-op context manager and :meth:`count`
+    does nothing, so instrumented code costs a method call per span when
+    profiling is off.
+    """
+
+    enabled = False
+    _NULL_SPAN: AbstractContextManager[None] = nullcontext()
+
+    def span(
+        self, name: str, cat: str = "stage", **args: object
+    ) -> AbstractContextManager[None]:
+        """Return a context manager timing *name* (a no-op here)."""
+        return self._NULL_SPAN
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add *value* to counter *name* (a no-op here)."""
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Profiler(NullProfiler):
+    """Collect timed spans and counters of a run.
+
+    Spans nest: the time of a span includes the spans opened inside it on
+    the same thread, and :meth:`summary` reports both total and self time.
+    Spans and counters may be recorded from several threads; spans in
+    worker processes (``jobs > 1``) are not recorded.
+
+    Attributes:
+        events: Recorded spans as ``(name, cat, start_ns, duration_ns,
+            thread_id, args)`` tuples, in completion order.
+        counters: Counter totals by name.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.events: list[tuple[str, str, int, int, int, dict[str, object]]] = []
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    @contextmanager
+    def _span(self, name: str, cat: str, args: dict[str, object]) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            self.events.append(
+                (
+                    name,
+                    cat,
+                    start - self._origin,
+                    end - start,
+                    threading.get_ident(),
+                    args,
+                )
+            )
+
+    def span(
+        self, name: str, cat: str = "stage", **args: object
+    ) -> AbstractContextManager[None]:
+        """Return a context manager that records a span named *name*.
+
+        Args:
+            name: Span name; spans with the same name are aggregated in
+                :meth:`summary`.
+            cat: Category shown by trace viewers, e.g. ``"stage"`` for a
+                pipeline stage or ``"file"`` for per-file work.
+            **args: Details attached to the trace event, e.g. ``file=...``.
+        """
+        return self._span(name, cat, args)
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add *value* to counter *name*."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Aggregate spans by name.
+
+        Returns:
+            Mapping from span name to ``{"calls": int, "total": seconds,
+            "self": seconds}``, where self time excludes nested spans on the
+            same thread.  Sorted by decreasing self time.
+        """
+        stats: dict[str, dict[str, float]] = {}
+        by_thread: dict[int, list[tuple[int, int, str]]] = {}
+        for name, _, start, duration, tid, _ in self.events:
+            by_thread.setdefault(tid, []).append((start, -duration, name))
+            entry = stats.setdefault(name, {"calls": 0, "total": 0.0, "self": 0.0})
+            entry["calls"] += 1
+            entry["total"] += duration / 1e9
+            entry["self"] += duration / 1e9
+        for spans in by_thread.values():
+            stack: list[tuple[int, str]] = []  # (end, name) of open spans
+            for start, neg_duration, name in sorted(spans):
+                while stack and stack[-1][0] <= start:
+                    stack.pop()
+                if stack:
+                    stats[stack[-1][1]]["self"] += neg_duration / 1e9
+                stack.append((start - neg_duration, name))
+        return dict(sorted(stats.items(), key=lambda item: -item[1]["self"]))
+
+    def wall_time(self) -> float:
+        """Return seconds from the first span start to the last span end."""
+        if not self.events:
+            return 0.0
+        start = min(event[2] for event in self.events)
+        end = max(event[2] + event[3] for event in self.events)
+        return (end - start) / 1e9
+
+    def format_summary(self) -> str:
+        """Return :meth:`summary` and the counters as a text table."""
+        wall = self.wall_time() or 1.0
+        lines = [f"{'span':<20}{'calls':>8}{'total s':>11}{'self s':>11}{'self %':>8}"]
+        for name, entry in self.summary().items():
+            lines.append(
+                f"{name:<20}{entry['calls']:>8}{entry['total']:>11.3f}"
+                f"{entry['self']:>11.3f}{entry['self'] / wall:>8.1%}"
+            )
+        lines.extend(
+            f"{name:<20}{value:>30,}" for name, value in sorted(self.counters.items())
+        )
+        return "\n".join(lines)
+
+    def trace_events(self) -> list[dict[str, object]]:
+        """Return spans and counters in the Chrome trace event format."""
+        pid = os.getpid()
+        thread_ids: dict[int, int] = {threading.main_thread().ident or 0: 0}
+        events: list[dict[str, object]] = []
+        for name, cat, start, duration, tid, args in sorted(
+            self.events, key=lambda event: event[2]
+        ):
+            event = {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": start / 1e3,
+                "dur": duration / 1e3,
+                "pid": pid,
+                "tid": thread_ids.setdefault(tid, len(thread_ids)),
+            }
+            if args:
+                event["args"] = {key: str(value) for key, value in args.items()}
+            events.append(event)
+        events.extend(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": "main" if tid == 0 else f"worker-{tid}"},
+            }
+            for tid in thread_ids.values()
+        )
+        if self.counters:
+            end = max((event[2] + event[3] for event in self.events), default=0)
+            events.append(
+                {
+                    "name": "counters",
+                    "ph": "C",
+                    "ts": end / 1e3,
+                    "pid": pid,
+                    "tid": 0,
+                    "args": dict(self.counters),
+                }
+            )
+        return events
+
+    def write_trace(self, path: str | Path) -> None:
+        """Write a trace for ``chrome://tracing`` or https://ui.perfetto.dev."""
+        trace = {
+            "traceEvents": self.trace_events(),
+            "displayTimeUnit": "ms",
+            "otherData": {"counters": dict(self.counters)},
+        }
+        Path(path).write_text(json.dumps(trace), encoding="utf-8")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/records.py
+"""Compact per-file state kept between processing and splitting."""
+
+from __future__ import annotations
+
+import warnings
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+
+
+@dataclass(slots=True)
+class Section:
+    """One token-bounded piece of a processed file.
+
+    Most sections are a top-level statement sliced from the file's processed
+    source; they keep only the statement's offsets, and their text is
+    ``source[start:end] + "\\n"``.  Sections that were re-rendered (stubbed
+    bodies, pieces of oversized statements) carry their own *text*.
+
+    Attributes:
+        gptok_size: Token count, or an estimate when *exact* is false.
+        start: Offset of the statement in the processed source.
+        end: Offset just past the statement.
+        text: The section's own text, or ``None`` for a source slice.
+        exact: Whether *gptok_size* is an exact count.
+    """
+
+    gptok_size: int
+    start: int = 0
+    end: int = 0
+    text: str | None = None
+    exact: bool = True
+
+    def render(self, source: str) -> str:
+        """Return the section text, slicing *source* when it has none."""
+        if self.text is not None:
+            return self.text
+        return source[self.start : self.end] + "\n"
+
+    def as_dict(self, source: str) -> dict:
+        """Return ``{"py", "gptok_size"}`` (and ``"gptok_exact": False``)."""
+        data: dict = {"py": self.render(source), "gptok_size": self.gptok_size}
+        if not self.exact:
+            data["gptok_exact"] = False
+        return data
+
+    def to_json(self) -> dict:
+        """Return a JSON-serialisable form for the build manifest."""
+        data: dict = {"gptok_size": self.gptok_size}
+        if self.text is not None:
+            data["py"] = self.text
+        else:
+            data["start"], data["end"] = self.start, self.end
+        if not self.exact:
+            data["gptok_exact"] = False
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict) -> Section:
+        """Rebuild a section stored by :meth:`to_json`."""
+        return cls(
+            data["gptok_size"],
+            data.get("start", 0),
+            data.get("end", 0),
+            data.get("py"),
+            data.get("gptok_exact", True),
+        )
+
+
+@dataclass(slots=True)
+class FileRecord:
+    """Per-file state of :class:`~split_python4gpt.minifier.PyTypingMinifier`.
+
+    *py_code* holds the source only while the file is being processed; once
+    the output is written (and, for the splitter, sectioned) it is dropped,
+    and section text is read back from the output file when splits are
+    assembled.
+
+    Attributes:
+        py_path: Absolute path of the source file.
+        rel_path: Path relative to the input folder.
+        pyi_path: Where pytype writes the file's stub.
+        py_code: Source text while it is needed, else ``None``.
+        cached: Whether the file was unchanged since the last incremental
+            run and taken from the manifest.
+        sections: Sections of the processed file, once sectioned.
+        gptok_size: Total tokens of all sections.
+        imports: Dotted names imported by the file.
+    """
+
+    py_path: Path
+    rel_path: Path
+    pyi_path: Path
+    py_code: str | None = None
+    cached: bool = False
+    sections: list[Section] | None = None
+    gptok_size: int = 0
+    imports: list[str] = field(default_factory=list)
+
+    def __getitem__(self, key: str) -> object:
+        """Return field *key*, as ``record["py_code"]`` did on the old dicts.
+
+        Deprecated: use attribute access.  Note that *py_code* is ``None``
+        once the file is written and sectioned, and that *sections* holds
+        :class:`Section` objects (see :meth:`Section.as_dict`).
+        """
+        self._check_key(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: object) -> None:
+        """Set field *key*; deprecated like :meth:`__getitem__`."""
+        self._check_key(key)
+        setattr(self, key, value)
+
+    @staticmethod
+    def _check_key(key: str) -> None:
+        """Reject unknown keys and warn about the deprecated item access."""
+        if key not in {f.name for f in fields(FileRecord)}:
+            raise KeyError(key)
+        warnings.warn(
+            f'FileRecord[{key!r}] is deprecated; use the attribute ".{key}"',
+            DeprecationWarning,
+            stacklevel=3,
+        )
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/server.py
+"""JSON-RPC server that keeps one splitter warm for many callers."""
+
+from __future__ import annotations
+
+import copy
+import http.client
+import inspect
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .planner import SPLIT_PLANNERS
+
+if TYPE_CHECKING:
+    from .minifier import PyLLMSplitter
+
+logger = logging.getLogger(__name__)
+
+RPC_METHODS = ("minify", "process_py_code", "gptok_size", "split", "stats")
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+SERVER_BUSY = -32000
+
+
+class RpcError(Exception):
+    """A JSON-RPC error, raised by methods and by :class:`RpcClient`.
+
+    Args:
+        code: JSON-RPC error code, e.g. :data:`INVALID_PARAMS`.
+        message: Human-readable description.
+    """
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(f"{message} ({code})")
+        self.code = code
+        self.message = message
+
+
+class SplitServer:
+    """Serve ``minify``, ``process_py_code``, ``gptok_size`` and ``split``.
+
+    Requests are JSON-RPC 2.0 objects (or batches), accepted over
+    localhost HTTP (``POST`` to any path) or a Unix socket (one request per
+    line).  Every connection gets a thread, but at most *workers* requests
+    run at once and at most *queue_size* more wait for a worker; further
+    requests are rejected at once with :data:`SERVER_BUSY` rather than
+    queued without bound.
+
+    The splitter's tokenizer, token count cache and python-minifier are
+    loaded when the server is created and shared by all requests.  Methods
+    that keep per-call state (``process_py_code``, ``split``) run on a
+    shallow copy of the splitter with fresh records.  The copies do not use
+    the SQLite summary cache, whose connection belongs to the thread that
+    opened it.
+
+    Methods:
+        ``minify(code, options={})``: Minified source.
+        ``process_py_code(code)``: Sections as ``{"py", "gptok_size"}``
+        dicts.
+        ``gptok_size(text)``: Token count.
+        ``split(files, mini=True, options={}, limit=None, planner=None,
+        order=None)``: ``{"splits": [...], "paths": [[...], ...]}`` for a
+        mapping of file names to sources.
+        ``stats()``: Request counters (including requests running or
+        queued) and token cache statistics.
+
+    Args:
+        splitter: The splitter to serve.
+        workers: Requests processed concurrently.
+        queue_size: Admitted requests that may wait for a worker.
+        max_request_bytes: Largest accepted request body or line.
+
+    Attributes:
+        requests: Requests received.
+        rejected: Requests rejected as busy.
+        errors: Requests that failed with an internal error.
+        in_flight: Admitted requests, running or waiting for a worker.
+    """
+
+    def __init__(
+        self,
+        splitter: PyLLMSplitter,
+        workers: int = DEFAULT_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        max_request_bytes: int = DEFAULT_MAX_REQUEST_BYTES,
+    ) -> None:
+        if workers < 1 or queue_size < 0:
+            raise ValueError("workers must be positive and queue_size not negative")
+        self.splitter = splitter
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_request_bytes = max_request_bytes
+        self.requests = self.rejected = self.errors = self.in_flight = 0
+        self._admitted = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="split4gpt-rpc")
+        self._counter_lock = threading.Lock()
+        self._transport: socketserver.BaseServer | None = None
+        self._socket_path: Path | None = None
+        start = time.perf_counter()
+        splitter.gptok_counter  # load the tokenizer once, shared by sessions
+        splitter.minify("pass\n")  # import python-minifier
+        logger.info("Splitter warmed up in %.2fs.", time.perf_counter() - start)
+
+    # ------------------------------------------------------------------
+    # RPC methods
+    # ------------------------------------------------------------------
+
+    def rpc_minify(self, code: str, options: dict | None = None) -> str:
+        """Minify *code* with python-minifier *options* on top of the defaults."""
+        return self.splitter.minify(code, **(options or {}))
+
+    def rpc_process_py_code(self, code: str) -> list[dict]:
+        """Return the token-bounded sections of *code*."""
+        return self._session().process_py_code(code)
+
+    def rpc_gptok_size(self, text: str) -> int:
+        """Count the tokens of *text*."""
+        return self.splitter.gptok_size(text)
+
+    def rpc_split(
+        self,
+        files: dict[str, str],
+        mini: bool = True,
+        options: dict | None = None,
+        limit: int | None = None,
+        planner: str | None = None,
+        order: str | None = None,
+    ) -> dict[str, list]:
+        """Minify, section and pack *files*, a mapping of names to sources."""
+        if not isinstance(files, dict):
+            raise RpcError(INVALID_PARAMS, "files must map file names to sources")
+        session = self._session()
+        if limit is not None:
+            session.gptok_limit = int(limit)
+        if planner is not None:
+            if planner not in SPLIT_PLANNERS:
+                raise RpcError(INVALID_PARAMS, f"Unknown planner {planner!r}")
+            session.split_planner = planner
+        if order is not None:
+            if order not in ("file", "imports"):
+                raise RpcError(INVALID_PARAMS, f"Unknown order {order!r}")
+            session.split_order = order
+        splits = session.split_sources(files, mini, **(options or {}))
+        return {"splits": splits, "paths": session.split_paths}
+
+    def rpc_stats(self) -> dict[str, object]:
+        """Return request counters and token cache statistics."""
+        return {
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "token_cache": self.splitter.gptok_counter.stats(),
+        }
+
+    def _session(self) -> PyLLMSplitter:
+        """Return a copy of the splitter with its own per-call state."""
+        session = copy.copy(self.splitter)
+        session.code_folder_data = {}
+        session.code_summary = {}
+        session.split_paths = []
+        session._pending_summaries = []
+        session.summary_cache = None
+        return session
+
+    # ------------------------------------------------------------------
+    # JSON-RPC dispatch
+    # ------------------------------------------------------------------
+
+    def call(self, method: str, params: list | dict | None = None) -> object:
+        """Run RPC *method* with positional or named *params* in this thread.
+
+        Raises:
+            RpcError: For an unknown method, parameters that do not fit it,
+                or code that does not parse.
+        """
+        if method not in RPC_METHODS:
+            raise RpcError(METHOD_NOT_FOUND, f"Method not found: {method}")
+        function = getattr(self, f"rpc_{method}")
+        args, kwargs = (params, {}) if isinstance(params, list) else ([], params or {})
+        try:
+            inspect.signature(function).bind(*args, **kwargs)
+        except TypeError as exc:
+            raise RpcError(INVALID_PARAMS, str(exc)) from None
+        try:
+            return function(*args, **kwargs)
+        except SyntaxError as exc:
+            raise RpcError(INVALID_PARAMS, f"Invalid Python: {exc}") from None
+        except (TypeError, ValueError) as exc:
+            raise RpcError(INVALID_PARAMS, str(exc)) from None
+
+    def handle(self, request: object) -> dict | list | None:
+        """Answer a decoded JSON-RPC request or batch.
+
+        Returns:
+            The response, or ``None`` when only notifications were sent.
+        """
+        if isinstance(request, list):
+            if not request:
+                return _error(None, INVALID_REQUEST, "Empty batch")
+            responses = [self._handle_one(item) for item in request]
+            return [response for response in responses if response is not None] or None
+        return self._handle_one(request)
+
+    def handle_bytes(self, data: bytes) -> bytes | None:
+        """Answer an encoded JSON-RPC request; ``None`` for notifications."""
+        try:
+            request = json.loads(data)
+        except ValueError as exc:
+            response: dict | list | None = _error(
+                None, PARSE_ERROR, f"Parse error: {exc}"
+            )
+        else:
+            response = self.handle(request)
+        if response is None:
+            return None
+        return json.dumps(response, ensure_ascii=False).encode("utf-8")
+
+    def _handle_one(self, request: object) -> dict | None:
+        """Answer one request object, waiting for a worker if admitted."""
+        if (
+            not isinstance(request, dict)
+            or request.get("jsonrpc") != "2.0"
+            or not isinstance(request.get("method"), str)
+            or not isinstance(request.get("params", []), (list, dict))
+        ):
+            return _error(None, INVALID_REQUEST, "Invalid Request")
+        request_id = request.get("id")
+        with self._counter_lock:
+            self.requests += 1
+        if not self._admitted.acquire(blocking=False):
+            with self._counter_lock:
+                self.rejected += 1
+            return _error(request_id, SERVER_BUSY, "Server busy")
+        with self._counter_lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(
+                self.call, request["method"], request.get("params")
+            )
+            result = future.result()
+        except RpcError as exc:
+            response = _error(request_id, exc.code, exc.message)
+        except Exception as exc:
+            logger.exception("RPC %s failed", request["method"])
+            with self._counter_lock:
+                self.errors += 1
+            response = _error(request_id, INTERNAL_ERROR, f"Internal error: {exc}")
+        else:
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        finally:
+            with self._counter_lock:
+                self.in_flight -= 1
+            self._admitted.release()
+        return response if "id" in request else None
+
+    # ------------------------------------------------------------------
+    # Transports
+    # ------------------------------------------------------------------
+
+    def bind_http(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Listen for HTTP ``POST`` requests; returns the server URL.
+
+        Args:
+            host: Interface to bind; keep the default to stay local.
+            port: TCP port, or ``0`` for any free port.
+        """
+        self._transport = _HttpServer((host, port), _HttpHandler)
+        self._transport.rpc = self  # type: ignore[attr-defined]
+        host, port = self._transport.server_address[:2]  # type: ignore[misc]
+        return f"http://{host}:{port}"
+
+    def bind_unix(self, path: str | Path) -> str:
+        """Listen on the Unix socket *path*, replacing a stale socket file.
+
+        Raises:
+            ValueError: If the platform has no Unix sockets.
+        """
+        if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+            raise ValueError("Unix sockets are not supported on this platform")
+        path = Path(path)
+        if path.is_socket():
+            path.unlink()
+        self._transport = _UnixServer(str(path), _UnixHandler)
+        self._transport.rpc = self  # type: ignore[attr-defined]
+        self._socket_path = path
+        return str(path)
+
+    def serve_forever(self) -> None:
+        """Serve the bound transport until :meth:`shutdown` is called."""
+        if self._transport is None:
+            raise ValueError("Call bind_http or bind_unix first")
+        self._transport.serve_forever()
+
+    def shutdown(self) -> None:
+        """Stop :meth:`serve_forever`; safe to call from another thread."""
+        if self._transport is not None:
+            self._transport.shutdown()
+
+    def close(self) -> None:
+        """Close the listening socket and stop the workers."""
+        if self._transport is not None:
+            self._transport.server_close()
+            self._transport = None
+        if self._socket_path is not None:
+            self._socket_path.unlink(missing_ok=True)
+            self._socket_path = None
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> SplitServer:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def _error(request_id: object, code: int, message: str) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {"code": code, "message": message},
+    }
+
+
+class _HttpServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _HttpHandler(BaseHTTPRequestHandler):
+    """``POST`` a JSON-RPC request, get the response; keeps connections open."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body are separate writes
+    server: _HttpServer
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        rpc: SplitServer = self.server.rpc  # type: ignore[attr-defined]
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self.send_error(411)
+            return
+        if length > rpc.max_request_bytes:
+            self.send_error(413)
+            return
+        response = rpc.handle_bytes(self.rfile.read(length))
+        if response is None:
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format: str, *args: object) -> None:
+        logger.debug("%s - " + format, self.address_string(), *args)
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class _UnixHandler(socketserver.StreamRequestHandler):
+    """Newline-delimited JSON-RPC: one request per line, one response per line."""
+
+    def handle(self) -> None:
+        rpc: SplitServer = self.server.rpc  # type: ignore[attr-defined]
+        while True:
+            line = self.rfile.readline(rpc.max_request_bytes + 1)
+            if not line:
+                return
+            if len(line) > rpc.max_request_bytes:
+                message = f"Request larger than {rpc.max_request_bytes} bytes"
+                self.wfile.write(
+                    json.dumps(_error(None, INVALID_REQUEST, message)).encode() + b"\n"
+                )
+                return
+            if not line.strip():
+                continue
+            response = rpc.handle_bytes(line)
+            if response is not None:
+                self.wfile.write(response + b"\n")
+
+
+class RpcClient:
+    """Blocking client for :class:`SplitServer`; one per thread.
+
+    Args:
+        address: ``http://host:port`` URL or Unix socket path.
+        timeout: Socket timeout in seconds.
+    """
+
+    def __init__(self, address: str | Path, timeout: float | None = 60.0) -> None:
+        address = str(address)
+        self._next_id = 0
+        if address.startswith("http://"):
+            host_port = address[len("http://") :].split("/", 1)[0]
+            self._http: http.client.HTTPConnection | None = http.client.HTTPConnection(
+                host_port, timeout=timeout
+            )
+            self._unix: socket.socket | None = None
+        else:
+            self._http = None
+            self._unix = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._unix.settimeout(timeout)
+            self._unix.connect(os.fspath(address))
+            self._reader = self._unix.makefile("rb")
+
+    def call(self, method: str, **params: object) -> object:
+        """Call *method* with named *params* and return its result.
+
+        Raises:
+            RpcError: If the server answered with an error.
+        """
+        self._next_id += 1
+        request = {"jsonrpc": "2.0", "id": self._next_id, "method": method}
+        if params:
+            request["params"] = params
+        body = json.dumps(request).encode("utf-8")
+        if self._http is not None:
+            self._http.request("POST", "/", body, {"Content-Type": "application/json"})
+            data = self._http.getresponse().read()
+        else:
+            self._unix.sendall(body + b"\n")  # type: ignore[union-attr]
+            data = self._reader.readline()
+        response = json.loads(data)
+        if "error" in response:
+            raise RpcError(response["error"]["code"], response["error"]["message"])
+        return response["result"]
+
+    def close(self) -> None:
+        """Close the connection."""
+        if self._http is not None:
+            self._http.close()
+        if self._unix is not None:
+            self._reader.close()
+            self._unix.close()
+
+    def __enter__(self) -> RpcClient:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
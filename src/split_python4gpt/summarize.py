@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/summarize.py
+"""Summariser backends: chat-completions APIs and an offline heuristic."""
+
+from __future__ import annotations
+
+import abc
+import asyncio
+import builtins
+import json
+import logging
+import random
+import time
+import urllib.error
+import urllib.request
+from ast import (
+    AST,
+    AsyncFunctionDef,
+    Attribute,
+    Call,
+    ClassDef,
+    FunctionDef,
+    Lambda,
+    Name,
+    Raise,
+    Yield,
+    YieldFrom,
+    get_docstring,
+    iter_child_nodes,
+    parse,
+    unparse,
+)
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+
+logger = logging.getLogger(__name__)
+
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+LOCAL_CHAT_URL = "http://localhost:8000/v1/chat/completions"
+DEFAULT_SYSTEM_PROMPT = (
+    "Write an extremely short, compact description of this Python code, "
+    'starting with "This class" or "This method" or "This function"'
+)
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class RateLimiter:
+    """Sliding-window limiter for requests and tokens per period.
+
+    :meth:`acquire` waits until one more request of the given token cost
+    fits within both limits over the last *period* seconds.
+
+    Args:
+        rpm: Maximum requests per period, or ``None`` for no limit.
+        tpm: Maximum tokens per period, or ``None`` for no limit.  A single
+            request costing more than *tpm* is let through on its own.
+        period: Window length in seconds.
+    """
+
+    def __init__(
+        self, rpm: int | None = None, tpm: int | None = None, period: float = 60.0
+    ) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.period = period
+        self._events: deque[tuple[float, int]] = deque()
+        self._tokens = 0
+        self._lock = asyncio.Lock()
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        while self._events and self._events[0][0] <= now - self.period:
+            self._tokens -= self._events.popleft()[1]
+        wait = 0.0
+        if self.rpm and len(self._events) >= self.rpm:
+            wait = self._events[-self.rpm][0] + self.period - now
+        if self.tpm and self._events and self._tokens + tokens > self.tpm:
+            # wait until enough of the oldest requests have left the window
+            excess = self._tokens + tokens - self.tpm
+            for stamp, cost in self._events:
+                excess -= cost
+                if excess <= 0:
+                    break
+            wait = max(wait, stamp + self.period - now)
+        return wait
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until a request costing *tokens* may be sent, then record it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(tokens, now)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self._events.append((now, tokens))
+            self._tokens += tokens
+
+
+class SummarizerBackend(abc.ABC):
+    """Interface of a summariser backend.
+
+    A backend turns code snippets into short descriptions.  Subclasses
+    implement :meth:`run`, returning ``None`` for snippets they could not
+    summarise.
+
+    Args:
+        model: Model name, part of the summary cache key.
+        system: System prompt, part of the summary cache key.
+
+    Attributes:
+        name: Backend name as used in :data:`SUMMARIZER_BACKENDS`.
+        cacheable: Whether results are worth storing in a summary cache.
+    """
+
+    name = "base"
+    cacheable = True
+
+    def __init__(self, model: str, system: str = DEFAULT_SYSTEM_PROMPT) -> None:
+        self.model = model
+        self.system = system
+
+    @abc.abstractmethod
+    def run(self, codes: list[str]) -> list[str | None]:
+        """Return one summary (or ``None``) per snippet in *codes*, in order."""
+
+
+class AsyncSummarizer(SummarizerBackend):
+    """Summarise many code snippets concurrently via chat completions.
+
+    Requests are sent with :mod:`urllib` from worker threads, at most
+    *concurrency* at a time and within the *rpm*/*tpm* limits.  Timeouts,
+    connection errors and retryable HTTP statuses (429, 5xx) are retried
+    with exponential backoff and jitter, honouring ``Retry-After``.
+
+    Args:
+        model: Chat model name.
+        api_key: Bearer token; omitted from requests when ``None``.
+        base_url: Full URL of the chat-completions endpoint.
+        system: System prompt.
+        concurrency: Maximum requests in flight.
+        rpm: Requests-per-minute limit.
+        tpm: Tokens-per-minute limit (prompt plus *max_tokens*).
+        max_retries: Retries per snippet before giving up.
+        backoff: Initial backoff in seconds, doubled after each retry.
+        timeout: Per-request timeout in seconds.
+        max_tokens: Completion token cap sent with each request.
+        count_tokens: Callable measuring prompt tokens for *tpm*; defaults
+            to ``len(text) // 4``.
+
+    Attributes:
+        requests: Number of HTTP requests sent, including retries.
+        failures: Number of snippets that could not be summarised.
+    """
+
+    name = "http"
+
+    def __init__(
+        self,
+        model: str,
+        api_key: str | None = None,
+        base_url: str = OPENAI_CHAT_URL,
+        system: str = DEFAULT_SYSTEM_PROMPT,
+        concurrency: int = 8,
+        rpm: int | None = None,
+        tpm: int | None = None,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        timeout: float = 60.0,
+        max_tokens: int = 128,
+        count_tokens: Callable[[str], int] | None = None,
+    ) -> None:
+        super().__init__(model, system)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.concurrency = max(1, concurrency)
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens or (lambda text: len(text) // 4)
+        self.requests = 0
+        self.failures = 0
+
+    def _post(self, code: str) -> str:
+        """Send one chat-completions request and return the reply text."""
+        body = json.dumps(
+            {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": self.system},
+                    {"role": "user", "content": code},
+                ],
+                "max_tokens": self.max_tokens,
+            }
+        ).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(self.base_url, body, headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = json.loads(response.read())
+        return data["choices"][0]["message"]["content"].strip()
+
+    async def summarize(
+        self, code: str, semaphore: asyncio.Semaphore, limiter: RateLimiter
+    ) -> str | None:
+        """Summarise *code*, retrying transient failures.
+
+        Returns:
+            The summary, or ``None`` if every attempt failed.
+        """
+        cost = (
+            self.count_tokens(self.system) + self.count_tokens(code) + self.max_tokens
+        )
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            async with semaphore:
+                await limiter.acquire(cost)
+                self.requests += 1
+                try:
+                    return await asyncio.to_thread(self._post, code)
+                except urllib.error.HTTPError as exc:
+                    if exc.code not in RETRY_STATUSES:
+                        logger.warning("Summary request failed: HTTP %d", exc.code)
+                        break
+                    error: Exception = exc
+                    retry_after = (
+                        exc.headers.get("Retry-After") if exc.headers else None
+                    )
+                except (urllib.error.URLError, TimeoutError, OSError) as exc:
+                    error = exc
+                except (ValueError, KeyError, IndexError) as exc:
+                    logger.warning("Malformed summary response: %s", exc)
+                    break
+            if attempt == self.max_retries:
+                logger.warning(
+                    "Summary request failed after %d tries: %s", attempt + 1, error
+                )
+                break
+            try:
+                wait = float(retry_after) if retry_after else delay
+            except ValueError:
+                wait = delay
+            await asyncio.sleep(wait * (1 + random.random() * 0.1))
+            delay *= 2
+        self.failures += 1
+        return None
+
+    async def summarize_many(self, codes: list[str]) -> list[str | None]:
+        """Summarise all *codes* concurrently, keeping their order."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = RateLimiter(self.rpm, self.tpm)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            asyncio.get_running_loop().set_default_executor(executor)
+            return await asyncio.gather(
+                *(self.summarize(code, semaphore, limiter) for code in codes)
+            )
+
+    def run(self, codes: list[str]) -> list[str | None]:
+        """Blocking wrapper around :meth:`summarize_many`."""
+        if not codes:
+            return []
+        return asyncio.run(self.summarize_many(codes))
+
+
+class OpenAISummarizer(AsyncSummarizer):
+    """:class:`AsyncSummarizer` for the OpenAI API.
+
+    The API key defaults to the ``OPENAI_API_KEY`` environment variable.
+    """
+
+    name = "openai"
+
+    def __init__(
+        self, model: str, api_key: str | None = None, **kwargs: object
+    ) -> None:
+        super().__init__(
+            model,
+            api_key=api_key or environ.get("OPENAI_API_KEY"),
+            **kwargs,  # type: ignore[arg-type]
+        )
+
+
+class LocalHTTPSummarizer(AsyncSummarizer):
+    """:class:`AsyncSummarizer` for a self-hosted OpenAI-compatible server.
+
+    Defaults to ``http://localhost:8000/v1/chat/completions`` (the vLLM and
+    llama.cpp server route) with no API key.
+    """
+
+    name = "local"
+
+    def __init__(
+        self, model: str, base_url: str | None = None, **kwargs: object
+    ) -> None:
+        super().__init__(
+            model,
+            base_url=base_url or LOCAL_CHAT_URL,
+            **kwargs,  # type: ignore[arg-type]
+        )
+
+
+class AIChatSummarizer(SummarizerBackend):
+    """Summarise snippets one at a time with ``simpleaichat.AIChat``.
+
+    Kept for compatibility; requires the ``llm`` extras.
+    """
+
+    name = "simpleaichat"
+
+    def __init__(
+        self,
+        model: str,
+        api_key: str | None = None,
+        system: str = DEFAULT_SYSTEM_PROMPT,
+    ) -> None:
+        super().__init__(model, system)
+        from simpleaichat import AIChat  # lazy optional import
+
+        self.ai = AIChat(
+            api_key=api_key or environ.get("OPENAI_API_KEY"), system=system, model=model
+        )
+
+    def run(self, codes: list[str]) -> list[str | None]:
+        summaries: list[str | None] = []
+        for code in codes:
+            try:
+                summaries.append(str(self.ai(code)).strip())
+            except Exception as exc:
+                logger.warning("AIChat summary failed: %s", exc)
+                summaries.append(None)
+        return summaries
+
+
+class OfflineSummarizer(SummarizerBackend):
+    """Describe functions from their code alone, without any model.
+
+    The description combines the kind of callable (method or function,
+    async, generator, property), the first line of its docstring, the names
+    it calls and the exceptions it raises, e.g. ``"This method: Load the
+    index. Calls open, json.load. Raises KeyError."``.  Builtins are left
+    out of the called names.  Takes microseconds per function, so results
+    are not cached.
+
+    Args:
+        max_names: Maximum number of called names listed.
+    """
+
+    name = "offline"
+    cacheable = False
+
+    def __init__(
+        self, model: str = "offline", system: str = "", max_names: int = 8
+    ) -> None:
+        super().__init__(model, system)
+        self.max_names = max_names
+
+    def run(self, codes: list[str]) -> list[str | None]:
+        return [self.describe(code) for code in codes]
+
+    def describe(self, code: str) -> str | None:
+        """Return the description of the first function in *code*."""
+        try:
+            node = parse(code).body[0]
+        except (SyntaxError, IndexError):
+            return None
+        if not isinstance(node, (FunctionDef, AsyncFunctionDef)):
+            return None
+
+        args = node.args.posonlyargs + node.args.args
+        kind = "method" if args and args[0].arg in ("self", "cls") else "function"
+        decorators = {unparse(dec) for dec in node.decorator_list}
+        if "property" in decorators:
+            kind = "property"
+        elif "staticmethod" in decorators or "classmethod" in decorators:
+            kind = "method"
+        body = list(_own_nodes(node))
+        if any(isinstance(sub, (Yield, YieldFrom)) for sub in body):
+            kind = f"generator {kind}"
+        if isinstance(node, AsyncFunctionDef):
+            kind = f"async {kind}"
+
+        parts = [f"This {kind}"]
+        doc = get_docstring(node)
+        if doc and doc.strip():
+            parts[0] += f": {doc.strip().splitlines()[0].rstrip('.')}."
+        else:
+            parts[0] += "."
+        raised = [sub.exc for sub in body if isinstance(sub, Raise) and sub.exc]
+        raises = _unique(
+            name
+            for exc in raised
+            for name in [_dotted_name(exc.func if isinstance(exc, Call) else exc)]
+            if name
+        )
+        calls = _unique(
+            name
+            for sub in body
+            if isinstance(sub, Call) and not any(sub is exc for exc in raised)
+            for name in [_dotted_name(sub.func)]
+            if name and not hasattr(builtins, name)
+        )
+        if calls:
+            more = ", ..." if len(calls) > self.max_names else ""
+            parts.append(f"Calls {', '.join(calls[: self.max_names])}{more}.")
+        if raises:
+            parts.append(f"Raises {', '.join(raises)}.")
+        return " ".join(parts)
+
+
+def _own_nodes(node: AST) -> Iterator[AST]:
+    """Yield the nodes in *node*'s body, not descending into nested scopes."""
+    stack = list(iter_child_nodes(node))
+    while stack:
+        child = stack.pop(0)
+        yield child
+        if not isinstance(child, (FunctionDef, AsyncFunctionDef, ClassDef, Lambda)):
+            stack.extend(iter_child_nodes(child))
+
+
+def _dotted_name(node: AST) -> str | None:
+    """Return ``a.b.c`` for a name/attribute chain, dropping ``self``/``cls``."""
+    parts: list[str] = []
+    while isinstance(node, Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, Name):
+        return ".".join(reversed(parts)) or None
+    if node.id not in ("self", "cls"):
+        parts.append(node.id)
+    return ".".join(reversed(parts)) or None
+
+
+def _unique(names: Iterable[str]) -> list[str]:
+    return list(dict.fromkeys(names))
+
+
+SUMMARIZER_BACKENDS: dict[str, type[SummarizerBackend]] = {
+    "openai": OpenAISummarizer,
+    "local": LocalHTTPSummarizer,
+    "offline": OfflineSummarizer,
+    "simpleaichat": AIChatSummarizer,
+}
+
+
+def make_summarizer(
+    backend: str,
+    model: str,
+    base_url: str | None = None,
+    api_key: str | None = None,
+    **http_options: object,
+) -> SummarizerBackend:
+    """Create the summariser backend named *backend*.
+
+    Args:
+        backend: A key of :data:`SUMMARIZER_BACKENDS`.
+        model: Model name.
+        base_url: Endpoint for the HTTP backends.
+        api_key: API key for the HTTP and ``simpleaichat`` backends.
+        **http_options: Extra :class:`AsyncSummarizer` options
+            (``concurrency``, ``rpm``, ``tpm``, ``max_retries``,
+            ``count_tokens`` ...), ignored by the other backends.
+
+    Raises:
+        ValueError: If *backend* is unknown.
+    """
+    if backend == "offline":
+        return OfflineSummarizer()
+    if backend == "simpleaichat":
+        return AIChatSummarizer(model, api_key=api_key)
+    if backend == "openai":
+        if base_url:
+            http_options["base_url"] = base_url
+        return OpenAISummarizer(model, api_key=api_key, **http_options)
+    if backend == "local":
+        return LocalHTTPSummarizer(
+            model, base_url=base_url, api_key=api_key, **http_options
+        )
+    raise ValueError(
+        f"Unknown summarizer backend {backend!r}; "
+        f"expected one of {sorted(SUMMARIZER_BACKENDS)}"
+    )
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/summary_cache.py
+"""Persistent SQLite store for LLM summaries."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_CACHE_FILENAME = "summaries.sqlite"
+DEFAULT_SUMMARY_CACHE_MAX_ENTRIES = 100_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+class SummaryCache:
+    """SQLite-backed cache of summaries keyed by code, model and prompt.
+
+    The key is the SHA-256 of the model name, the system prompt and the
+    minified code sent for summarisation, so changing either the model or
+    the prompt invalidates earlier entries.  Entries older than *ttl*
+    seconds are treated as missing, and when more than *max_entries* are
+    stored the least recently used ones are evicted.
+
+    Args:
+        path: SQLite database file; created if missing.
+        ttl: Maximum entry age in seconds, or ``None`` to keep entries
+            forever.
+        max_entries: Entry cap before least recently used entries are
+            evicted.
+
+    Attributes:
+        hits: Number of lookups served from the cache.
+        misses: Number of lookups that were missing or expired.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttl: float | None = None,
+        max_entries: int = DEFAULT_SUMMARY_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        import sqlite3  # lazy: only needed once a cache is enabled
+
+        self._db = sqlite3.connect(self.path)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+
+    @staticmethod
+    def key(code: str, model: str, system: str) -> str:
+        """Return the cache key for summarising *code* with *model*/*system*."""
+        digest = hashlib.sha256()
+        for part in (model, system, code):
+            digest.update(part.encode("utf-8", "surrogatepass"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _expired_before(self) -> float:
+        return time.time() - self.ttl if self.ttl is not None else float("-inf")
+
+    def get(self, code: str, model: str, system: str) -> str | None:
+        """Return the cached summary, or ``None`` on a miss."""
+        key = self.key(code, model, system)
+        row = self._db.execute(
+            "SELECT summary, created FROM summaries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < self._expired_before():
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._db.execute(
+            "UPDATE summaries SET accessed = ? WHERE key = ?", (time.time(), key)
+        )
+        return row[0]
+
+    def put(self, code: str, model: str, system: str, summary: str) -> None:
+        """Store *summary* for *code* summarised with *model*/*system*."""
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?)",
+            (self.key(code, model, system), model, summary, now, now),
+        )
+
+    def prune(self) -> int:
+        """Delete expired entries, then the least recently used over the cap.
+
+        Returns:
+            Number of deleted entries.
+        """
+        deleted = self._db.execute(
+            "DELETE FROM summaries WHERE created < ?", (self._expired_before(),)
+        ).rowcount
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            deleted += self._db.execute(
+                "DELETE FROM summaries WHERE key IN "
+                "(SELECT key FROM summaries ORDER BY accessed LIMIT ?)",
+                (excess,),
+            ).rowcount
+        self._db.commit()
+        return deleted
+
+    def commit(self) -> None:
+        """Prune and write pending changes to disk."""
+        self.prune()
+
+    def export_entries(self, path: str | Path) -> int:
+        """Write all unexpired entries to *path* as JSON lines.
+
+        Returns:
+            Number of exported entries.
+        """
+        rows = self._db.execute(
+            "SELECT key, model, summary, created FROM summaries WHERE created >= ?",
+            (self._expired_before(),),
+        )
+        count = 0
+        with Path(path).open("w", encoding="utf-8") as out_file:
+            for key, model, summary, created in rows:
+                entry = {
+                    "key": key,
+                    "model": model,
+                    "summary": summary,
+                    "created": created,
+                }
+                out_file.write(json.dumps(entry) + "\n")
+                count += 1
+        return count
+
+    def import_entries(self, path: str | Path) -> int:
+        """Merge entries exported by :meth:`export_entries` from *path*.
+
+        Existing entries are replaced only by newer ones.  Malformed lines
+        are skipped with a warning.
+
+        Returns:
+            Number of imported entries.
+        """
+        count = 0
+        with Path(path).open(encoding="utf-8") as in_file:
+            for lineno, line in enumerate(in_file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    values = (
+                        str(entry["key"]),
+                        str(entry["model"]),
+                        str(entry["summary"]),
+                        float(entry["created"]),
+                    )
+                except (ValueError, KeyError, TypeError) as exc:
+                    logger.warning(
+                        "Skipping summary entry %s:%d: %s", path, lineno, exc
+                    )
+                    continue
+                count += self._db.execute(
+                    "INSERT INTO summaries VALUES (?, ?, ?, ?, ?4) "
+                    "ON CONFLICT(key) DO UPDATE SET "
+                    "summary = excluded.summary, model = excluded.model, "
+                    "created = excluded.created, accessed = excluded.accessed "
+                    "WHERE excluded.created > summaries.created",
+                    values,
+                ).rowcount
+        self.commit()
+        return count
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def close(self) -> None:
+        """Commit and close the database."""
+        self.commit()
+        self._db.close()
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters and the number of stored entries."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
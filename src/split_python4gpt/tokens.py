@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/tokens.py
+"""Memoized GPT token counting."""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_TOKEN_CACHE_SIZE = 65536
+DEFAULT_TOKEN_THREADS = 8
+
+
+class TokenCounter:
+    """Count tokens with a tiktoken encoding, memoizing recent results.
+
+    Counts are kept in a bounded LRU keyed by the encoding name and a 128-bit
+    BLAKE2b digest of the text, so repeated strings (file headers, unchanged
+    methods, before/after sizes of stubs) are tokenized only once and large
+    texts are not retained by the cache.  Texts are encoded with
+    ``encode_ordinary``, which skips special-token checks and whose result
+    is only measured, never copied.
+
+    When *encoder* is ``None`` a rough ``len(text) // 4`` estimate is
+    returned and nothing is cached.
+
+    Args:
+        encoder: A ``tiktoken.Encoding`` or ``None``.
+        cache_size: Maximum number of cached counts; ``0`` disables caching.
+
+    Attributes:
+        hits: Number of counts served from the cache.
+        misses: Number of counts that required tokenization.
+    """
+
+    def __init__(
+        self, encoder: object | None, cache_size: int = DEFAULT_TOKEN_CACHE_SIZE
+    ) -> None:
+        self.encoder = encoder
+        self.encoding_name: str = getattr(encoder, "name", "estimate")
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[bytes, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, text: str) -> bytes:
+        digest = hashlib.blake2b(digest_size=16, person=b"split4gpt-tokens")
+        digest.update(self.encoding_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8", "surrogatepass"))
+        return digest.digest()
+
+    def _encode_count(self, text: str) -> int:
+        return len(self.encoder.encode_ordinary(text))  # type: ignore[union-attr]
+
+    def count(self, text: str) -> int:
+        """Return the number of tokens in *text*."""
+        if self.encoder is None:
+            return len(text) // 4  # rough estimate: ~4 chars per token
+        if not self.cache_size:
+            self.misses += 1
+            return self._encode_count(text)
+        key = self._key(text)
+        with self._lock:
+            size = self._cache.get(key)
+            if size is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return size
+            self.misses += 1
+        size = self._encode_count(text)
+        self._store(key, size)
+        return size
+
+    def count_batch(
+        self, texts: list[str], num_threads: int = DEFAULT_TOKEN_THREADS
+    ) -> list[int]:
+        """Return the number of tokens in each of *texts*.
+
+        Cached texts are answered from the cache; all others are encoded in
+        one ``encode_ordinary_batch`` call, which tiktoken spreads over
+        *num_threads* threads with the GIL released.  Counts are identical to
+        calling :meth:`count` on each text.
+
+        Args:
+            texts: Texts to measure.
+            num_threads: Threads used by tiktoken for the uncached texts.
+
+        Returns:
+            Token counts in the same order as *texts*.
+        """
+        if self.encoder is None:
+            return [self.count(text) for text in texts]
+        sizes: list[int | None] = [None] * len(texts)
+        pending: dict[bytes, list[int]] = {}
+        pending_texts: list[str] = []
+        with self._lock:
+            for i, text in enumerate(texts):
+                # without a cache every position gets its own (uncached) key
+                key = self._key(text) if self.cache_size else i.to_bytes(8, "little")
+                size = self._cache.get(key) if self.cache_size else None
+                if size is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    sizes[i] = size
+                elif key in pending:
+                    self.hits += 1  # duplicate within the batch
+                    pending[key].append(i)
+                else:
+                    self.misses += 1
+                    pending[key] = [i]
+                    pending_texts.append(text)
+        if pending_texts:
+            encode_batch = getattr(self.encoder, "encode_ordinary_batch", None)
+            if encode_batch is not None and len(pending_texts) > 1:
+                counts = [
+                    len(tokens)
+                    for tokens in encode_batch(pending_texts, num_threads=num_threads)
+                ]
+            else:
+                counts = [self._encode_count(text) for text in pending_texts]
+            for (key, indices), size in zip(pending.items(), counts):
+                for i in indices:
+                    sizes[i] = size
+                if self.cache_size:
+                    self._store(key, size)
+        return sizes  # type: ignore[return-value]
+
+    def _store(self, key: bytes, size: int) -> None:
+        with self._lock:
+            self._cache[key] = size
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def stats(self) -> dict[str, float]:
+        """Return hit/miss counters, hit rate and current cache size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._cache),
+            "maxsize": self.cache_size,
+        }
+
+
+class TokenEstimator:
+    """Estimate token counts from text length with calibrated error bounds.
+
+    The chars-to-tokens ratio is learned from a sample of texts whose exact
+    counts are known (see :meth:`calibrate`).  Each estimate comes with a
+    ``(low, high)`` interval derived from the smallest and largest ratio seen
+    in the sample, widened by a safety margin.  Only ASCII texts are
+    estimated; others behave differently from code and should be counted
+    exactly.
+
+    Args:
+        ratio: Tokens per character used for point estimates.
+        low_ratio: Tokens per character used for the lower bound.
+        high_ratio: Tokens per character used for the upper bound.
+    """
+
+    def __init__(self, ratio: float, low_ratio: float, high_ratio: float) -> None:
+        self.ratio = ratio
+        self.low_ratio = low_ratio
+        self.high_ratio = high_ratio
+
+    @classmethod
+    def calibrate(
+        cls,
+        texts: list[str],
+        sizes: list[int],
+        margin: float = 0.1,
+        min_chars: int = 16,
+    ) -> TokenEstimator | None:
+        """Fit an estimator to *texts* with known token *sizes*.
+
+        Args:
+            texts: Sample texts.
+            sizes: Exact token counts of *texts*.
+            margin: Relative widening applied to the observed ratio range.
+            min_chars: Texts shorter than this are ignored (their ratio is
+                dominated by rounding).
+
+        Returns:
+            The fitted estimator, or ``None`` if the sample has no usable
+            text.
+        """
+        ratios: list[float] = []
+        total_chars = total_tokens = 0
+        for text, size in zip(texts, sizes):
+            if len(text) < min_chars or not text.isascii():
+                continue
+            ratios.append(size / len(text))
+            total_chars += len(text)
+            total_tokens += size
+        if not ratios:
+            return None
+        return cls(
+            total_tokens / total_chars,
+            min(ratios) * (1 - margin),
+            max(ratios) * (1 + margin),
+        )
+
+    def applies_to(self, text: str) -> bool:
+        """Whether *text* is similar enough to the sample to be estimated."""
+        return text.isascii()
+
+    def estimate(self, text: str) -> int:
+        """Return the point estimate of the token count of *text*."""
+        return round(len(text) * self.ratio)
+
+    def bounds(self, text: str) -> tuple[int, int]:
+        """Return a ``(low, high)`` interval for the token count of *text*."""
+        return int(len(text) * self.low_ratio), int(len(text) * self.high_ratio) + 1
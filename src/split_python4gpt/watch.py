@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# this_file: src/split_python4gpt/watch.py
+"""Rebuild splits whenever the sources change, in one resident process."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from .minifier import PyLLMSplitter
+
+logger = logging.getLogger(__name__)
+
+WATCH_BACKENDS = ("auto", "watchfiles", "poll")
+
+
+class RebuildStats(NamedTuple):
+    """Outcome of one :meth:`Watcher.rebuild`."""
+
+    reprocessed: int
+    files: int
+    removed: int
+    seconds: float
+
+
+class Watcher:
+    """Rebuild the splits of a resident splitter whenever sources change.
+
+    Each rebuild is an incremental :meth:`~PyLLMSplitter.process_py` run:
+    only added or modified files are read, minified and sectioned, the
+    others reuse the in-memory manifest, and the splits are re-packed and
+    written with unchanged split files left untouched.  Outputs of deleted
+    sources are removed.  The tokenizer, token count cache and summary
+    cache stay warm between rebuilds.
+
+    Changes are noticed through the optional ``watchfiles`` package
+    (inotify, FSEvents or ReadDirectoryChangesW) or, without it, by polling
+    file sizes and mtimes.  Either way a rebuild starts only once the tree
+    has been quiet for *debounce* seconds and the files selected by
+    discovery actually differ, so writes to the output folder or to ignored
+    files do not trigger one.
+
+    Args:
+        splitter: The splitter to keep resident.
+        py_folder: Source folder to watch.
+        out_py_folder: Output folder; must differ from *py_folder*.
+        pyi_folder: Stub folder override.
+        debounce: Quiet period in seconds that ends a burst of changes.
+        interval: Polling interval in seconds (``"poll"`` backend).
+        backend: ``"watchfiles"``, ``"poll"`` or ``"auto"`` (watchfiles
+            when installed).
+        **process_options: Options forwarded to :meth:`~PyLLMSplitter.process_py`.
+
+    Raises:
+        ValueError: If *py_folder* is not a folder, the output folder is the
+            input folder, or *backend* is unknown.
+    """
+
+    def __init__(
+        self,
+        splitter: PyLLMSplitter,
+        py_folder: str | Path,
+        out_py_folder: str | Path | None,
+        pyi_folder: str | Path | None = None,
+        debounce: float = 0.2,
+        interval: float = 0.5,
+        backend: str = "auto",
+        **process_options: object,
+    ) -> None:
+        py_folder = Path(py_folder).resolve()
+        if not py_folder.is_dir():
+            raise ValueError(f"Watch mode needs a folder, got {py_folder}")
+        if out_py_folder is None or Path(out_py_folder).resolve() == py_folder:
+            raise ValueError("Watch mode needs an output folder other than the input")
+        if backend not in WATCH_BACKENDS:
+            raise ValueError(
+                f"Unknown watch backend {backend!r}; expected one of {WATCH_BACKENDS}"
+            )
+        if backend == "auto":
+            try:
+                import watchfiles  # noqa: F401 - lazy optional import
+            except ImportError:
+                backend = "poll"
+            else:
+                backend = "watchfiles"
+        self.splitter = splitter
+        self.backend = backend
+        self.debounce = debounce
+        self.interval = interval
+        self.py_folder = py_folder
+        self.out_py_folder = Path(out_py_folder).resolve()
+        self.pyi_folder = pyi_folder
+        self.process_options = process_options | {"incremental": True}
+        splitter.init_folders(py_folder, self.out_py_folder, pyi_folder)
+        self._discovery = splitter.make_discovery(
+            **{
+                key: process_options[key]  # type: ignore[misc]
+                for key in ("include", "exclude", "gitignore")
+                if key in process_options
+            }
+        )
+        self._snapshot: dict[Path, tuple[int, int]] = {}
+        self._outputs: set[Path] = set()
+
+    def snapshot(self) -> dict[Path, tuple[int, int]]:
+        """Return ``(mtime_ns, size)`` of every file discovery selects."""
+        state = {}
+        for py_path in self._discovery.scan(self.py_folder):
+            try:
+                stat = os.stat(py_path)
+            except OSError:
+                continue  # removed while scanning
+            state[py_path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def rebuild(self) -> RebuildStats:
+        """Reprocess changed files and rewrite the splits that changed."""
+        start = time.perf_counter()
+        self._snapshot = self.snapshot()
+        splitter = self.splitter
+        splitter.code_folder_data = {}
+        splitter.code_summary = {}
+        splitter.process_py(
+            self.py_folder, self.out_py_folder, self.pyi_folder, **self.process_options
+        )
+        outputs = set(splitter.code_folder_data)
+        for stale_path in self._outputs - outputs:
+            stale_path.unlink(missing_ok=True)
+        removed = len(self._outputs - outputs)
+        self._outputs = outputs
+        reprocessed = sum(
+            not record.cached for record in splitter.code_folder_data.values()
+        )
+        splitter.write_splits()
+        stats = RebuildStats(
+            reprocessed, len(outputs), removed, time.perf_counter() - start
+        )
+        logger.info(
+            "Rebuilt splits in %.2fs: %d of %d files reprocessed, %d removed.",
+            stats.seconds,
+            stats.reprocessed,
+            stats.files,
+            stats.removed,
+        )
+        return stats
+
+    def _settle(self, stop: threading.Event) -> bool:
+        """Wait until the snapshot stops changing; return whether it changed."""
+        current = self.snapshot()
+        if current == self._snapshot:
+            return False
+        while not stop.wait(self.debounce):
+            latest = self.snapshot()
+            if latest == current:
+                break
+            current = latest
+        return True
+
+    def wait(self, stop: threading.Event | None = None) -> bool:
+        """Block until the sources changed and the burst of changes is over.
+
+        Args:
+            stop: Event that ends the wait early when set.
+
+        Returns:
+            ``True`` when a rebuild is due, ``False`` when *stop* was set.
+        """
+        stop = stop or threading.Event()
+        if self._settle(stop):  # changed during the last rebuild
+            return not stop.is_set()
+        if self.backend == "watchfiles":
+            import watchfiles  # lazy optional import
+
+            for _ in watchfiles.watch(
+                self.py_folder,
+                debounce=int(self.debounce * 1000),
+                stop_event=stop,
+            ):
+                if self._settle(stop):
+                    break
+        else:
+            while not stop.wait(self.interval):
+                if self._settle(stop):
+                    break
+        return not stop.is_set()
+
+    def run(
+        self,
+        stop: threading.Event | None = None,
+        callback: Callable[[RebuildStats], object] | None = None,
+    ) -> None:
+        """Rebuild now, then after every change until *stop* is set.
+
+        Args:
+            stop: Event that ends watching when set; without one, watching
+                continues until interrupted.
+            callback: Called with the :class:`RebuildStats` of each rebuild.
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                stats = self.rebuild()
+            except Exception:
+                # keep watching: the next save may fix the error
+                logger.exception("Rebuild failed")
+            else:
+                if callback is not None:
+                    callback(stats)
+            if not self.wait(stop):
+                break
@@ -0,0 +1,412 @@
+"""Stage benchmarks for split-python4gpt on synthetic corpora.
+
+Builds a synthetic project of a given shape, runs
+``PyLLMSplitter.process_py`` followed by ``write_splits`` with the profiler
+enabled, and compares the per-stage timings read from its spans with a JSON
+baseline stored in ``tests/data/benchmarks/<tokenizer>/``.  Timings are
+normalised by a fixed calibration workload, so baselines recorded on one
+machine remain usable on another; token counting differs too much between
+tokenizers, so each one has its own baselines.
+
+Run from the repository root::
+
+    python tests/benchmark.py files-10 long-functions   # compare
+    python tests/benchmark.py files-1k --update         # record a baseline
+    python tests/benchmark.py --list
+
+The exit status is 1 when any stage regressed beyond ``--tolerance``.  A
+corpus without a baseline for the tokenizer in use is reported on stderr.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from ast import parse, unparse
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from split_python4gpt.minifier import PyLLMSplitter
+from split_python4gpt.profiling import Profiler
+
+BASELINE_DIR = Path(__file__).parent / "data" / "benchmarks"
+DEFAULT_TOLERANCE = 1.5
+MIN_REGRESSION_SECONDS = 0.02
+
+# profiler spans whose self time makes up each stage
+STAGE_SPANS: dict[str, tuple[str, ...]] = {
+    "discovery": ("discover",),
+    "read": ("read",),
+    "minify": ("minify", "minify_file", "python_minifier"),
+    "sectioning": ("parse", "sectioning", "build_sections", "unparse", "summarize"),
+    "tokenization": ("tokenization", "tokenize"),
+    "packing": ("splits",),
+    "write": ("write",),
+}
+STAGES = tuple(STAGE_SPANS)
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    """Shape of a synthetic corpus.
+
+    Attributes:
+        files: Number of modules, spread over packages of
+            *files_per_package* modules each.
+        functions: Module-level functions per module; each module also has
+            a class with half as many methods.
+        statements: Statements in the loop body of every function.
+        nesting: Depth of nested classes added to every module.
+        literal_items: Entries of a list literal added to every module.
+        files_per_package: Modules per package folder.
+        seed: Seed of the random choices (imports, constants).
+    """
+
+    files: int
+    functions: int
+    statements: int = 6
+    nesting: int = 0
+    literal_items: int = 0
+    files_per_package: int = 50
+    seed: int = 0
+
+
+CORPORA: dict[str, CorpusSpec] = {
+    "files-10": CorpusSpec(files=10, functions=20),
+    "files-1k": CorpusSpec(files=1_000, functions=3),
+    "files-10k": CorpusSpec(files=10_000, functions=1),
+    "deep-nesting": CorpusSpec(files=8, functions=2, nesting=60),
+    "huge-literals": CorpusSpec(files=2, functions=2, literal_items=4_000),
+    "long-functions": CorpusSpec(files=2, functions=2, statements=600),
+}
+
+
+def _function_source(name: str, index: int, statements: int, indent: str) -> str:
+    lines = [
+        f"def {name}(self, items, scale=None):"
+        if indent
+        else f"def {name}(items, scale=None):",
+        f'    """Compute value {index} from *items*.',
+        "",
+        "    Args:",
+        "        items: Input values.",
+        "        scale: Optional factor.",
+        '    """',
+        "    total = 0",
+        "    scale = scale or 1",
+        "    for position, item in enumerate(items):",
+    ]
+    for s in range(statements):
+        if s % 3 == 0:
+            lines.append(f"        value_{s} = item * {s + index} + position")
+        elif s % 3 == 1:
+            lines.append(f"        if value_{s - 1} > {index}:")
+            lines.append(f"            total += value_{s - 1} // scale")
+        else:
+            lines.append(f"        total -= len(str(value_{s - 2})) * {s}")
+    lines.append(f"    return {{'index': {index}, 'total': total}}")
+    return "\n".join(indent + line if line else line for line in lines) + "\n"
+
+
+def module_source(spec: CorpusSpec, index: int, imports: list[str]) -> str:
+    """Return the source of module *index* of a corpus shaped by *spec*."""
+    parts = [
+        f'"""Synthetic module {index}."""\n',
+        "from __future__ import annotations\n",
+    ]
+    parts.extend(
+        f"from {package} import {module}\n"
+        for package, module in (name.rsplit(".", 1) for name in imports)
+    )
+    parts.append(f"\nCONSTANT_{index} = {index}\n\n")
+    for f in range(spec.functions):
+        parts.append(
+            "\n" + _function_source(f"function_{f}", index + f, spec.statements, "")
+        )
+    parts.append(f"\n\nclass Model{index}:\n")
+    parts.append(f'    """Synthetic model {index}."""\n\n')
+    parts.append(f"    size = {index}\n")
+    for m in range(max(1, spec.functions // 2)):
+        parts.append(
+            "\n" + _function_source(f"method_{m}", index + m, spec.statements, "    ")
+        )
+    if spec.nesting:
+        parts.append("\n")
+        for depth in range(spec.nesting):
+            indent = "    " * depth
+            parts.append(f"{indent}class Level{depth}:\n")
+            parts.append(f"{indent}    depth = {depth}\n")
+        indent = "    " * spec.nesting
+        parts.append(f"{indent}def innermost(self):\n{indent}    return self.depth\n")
+    if spec.literal_items:
+        parts.append(f"\nTABLE_{index} = [\n")
+        parts.extend(
+            f"    ({i}, 'name_{i}', {i * 0.5}, {{'key': {i % 97}}}),\n"
+            for i in range(spec.literal_items)
+        )
+        parts.append("]\n")
+    return "".join(parts)
+
+
+def generate_corpus(folder: str | Path, spec: CorpusSpec) -> list[Path]:
+    """Write a synthetic package shaped by *spec* into *folder*.
+
+    Modules live in ``<folder>/corpus/pkg_<n>/mod_<i>.py`` and each imports
+    up to two earlier modules, so the corpus has a non-trivial import graph.
+
+    Returns:
+        Sorted paths of all written ``.py`` files, including ``__init__.py``.
+    """
+    rng = random.Random(spec.seed)
+    root = Path(folder) / "corpus"
+    root.mkdir(parents=True, exist_ok=True)
+    paths = [root / "__init__.py"]
+    paths[0].write_text('"""Synthetic corpus."""\n', encoding="utf-8")
+    modules: list[str] = []
+    for i in range(spec.files):
+        package = f"pkg_{i // spec.files_per_package}"
+        package_folder = root / package
+        if i % spec.files_per_package == 0:
+            package_folder.mkdir(exist_ok=True)
+            init_path = package_folder / "__init__.py"
+            init_path.write_text(f'"""Package {package}."""\n', encoding="utf-8")
+            paths.append(init_path)
+        imports = sorted(rng.sample(modules, k=min(2, len(modules))))
+        path = package_folder / f"mod_{i}.py"
+        path.write_text(module_source(spec, i, imports), encoding="utf-8")
+        paths.append(path)
+        modules.append(f"corpus.{package}.mod_{i}")
+    return sorted(paths)
+
+
+def calibrate(rounds: int = 5) -> float:
+    """Return the fastest time of a fixed pure-Python workload in seconds.
+
+    The workload parses and unparses a generated module, which exercises the
+    interpreter much like python-minifier and sectioning do.
+    """
+    source = module_source(CorpusSpec(files=1, functions=30), 0, [])
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(3):
+            unparse(parse(source))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def stage_seconds(profiler: Profiler) -> dict[str, float]:
+    """Return the time spent in each of :data:`STAGES` by *profiler*'s spans.
+
+    The self time of every span goes to one stage, so nested spans (such as
+    the ``write`` of each output inside ``minify``) are not counted twice.
+    """
+    summary = profiler.summary()
+    return {
+        stage: sum(summary[name]["self"] for name in names if name in summary)
+        for stage, names in STAGE_SPANS.items()
+    }
+
+
+def run_stages(
+    py_folder: str | Path, out_folder: str | Path, **splitter_options: object
+) -> tuple[dict[str, float], list[str], str]:
+    """Run the splitting pipeline on *py_folder* and time its stages.
+
+    Runs ``PyLLMSplitter.process_py(types=False, mini=True)`` followed by
+    ``write_splits(release=True)`` with the profiler enabled and reads the
+    stage timings from its spans (see :func:`stage_seconds`).  The
+    tokenizer is loaded before profiling starts.
+
+    Args:
+        py_folder: Folder of the corpus to process.
+        out_folder: Output folder; split files go to its ``split4gpt``
+            subfolder.
+        **splitter_options: Forwarded to :class:`PyLLMSplitter`.
+
+    Returns:
+        ``(seconds, splits, tokenizer)``: time spent in each of
+        :data:`STAGES`, the text of every split and the name of the token
+        encoding (``"estimate"`` without tiktoken).
+    """
+    splitter = PyLLMSplitter(**splitter_options)  # type: ignore[arg-type]
+    splitter.gptoker  # noqa: B018 - load tiktoken outside the timed stages
+    profiler = splitter.enable_profiler()
+    splitter.process_py(py_folder, out_folder, types=False, mini=True)
+    splitter.write_splits(release=True)
+    splits_folder = Path(out_folder, "split4gpt")
+    splits = [
+        splits_folder.joinpath(f"split{i}.py").read_text(encoding="utf-8")
+        for i in range(1, profiler.counters.get("splits", 0) + 1)
+    ]
+    return stage_seconds(profiler), splits, splitter.gptok_counter.encoding_name
+
+
+def benchmark(
+    name: str, repeat: int = 3, **splitter_options: object
+) -> dict[str, object]:
+    """Benchmark corpus *name* from :data:`CORPORA`.
+
+    The corpus is generated once; every repetition processes it into a
+    fresh output folder, and the fastest time of each stage is kept.
+
+    Returns:
+        A result dict in the baseline format: corpus description,
+        environment, ``calibration`` seconds and ``stages`` seconds.
+    """
+    spec = CORPORA[name]
+    stages = dict.fromkeys(STAGES, float("inf"))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = generate_corpus(Path(tmpdir, "in"), spec)
+        corpus_bytes = sum(path.stat().st_size for path in paths)
+        for i in range(repeat):
+            seconds, splits, tokenizer = run_stages(
+                Path(tmpdir, "in", "corpus"),
+                Path(tmpdir, f"out{i}"),
+                **splitter_options,
+            )
+            for stage, elapsed in seconds.items():
+                stages[stage] = min(stages[stage], elapsed)
+    return {
+        "corpus": name,
+        "spec": asdict(spec),
+        "files": len(paths),
+        "bytes": corpus_bytes,
+        "splits": len(splits),
+        "tokenizer": tokenizer,
+        "python": platform.python_version(),
+        "calibration": round(calibrate(), 6),
+        "stages": {stage: round(seconds, 6) for stage, seconds in stages.items()},
+    }
+
+
+def compare(
+    result: dict[str, object],
+    baseline: dict[str, object],
+    tolerance: float = DEFAULT_TOLERANCE,
+    min_seconds: float = MIN_REGRESSION_SECONDS,
+) -> list[str]:
+    """Return a message for every stage of *result* that regressed.
+
+    Both timings are first divided by their ``calibration`` time.  A stage
+    regressed when its normalised time exceeds *tolerance* times the
+    baseline's and the slowdown, in this machine's seconds, is at least
+    *min_seconds* (so that millisecond-scale stages do not flap).
+
+    Raises:
+        ValueError: If *result* was measured with another tokenizer than
+            *baseline*; such timings are not comparable.
+    """
+    if result["tokenizer"] != baseline["tokenizer"]:
+        raise ValueError(
+            f"{result['corpus']}: the baseline was measured with the "
+            f"{baseline['tokenizer']} tokenizer, not {result['tokenizer']}"
+        )
+    scale = result["calibration"] / baseline["calibration"]  # type: ignore[operator]
+    regressions = []
+    for stage, seconds in result["stages"].items():  # type: ignore[union-attr]
+        expected = baseline["stages"].get(stage)  # type: ignore[union-attr]
+        if expected is None:
+            continue
+        expected *= scale
+        if seconds > expected * tolerance and seconds - expected >= min_seconds:
+            regressions.append(
+                f"{result['corpus']}: {stage} took {seconds:.3f}s, expected "
+                f"{expected:.3f}s (x{seconds / expected:.2f} > x{tolerance})"
+            )
+    return regressions
+
+
+def baseline_path(name: str, tokenizer: str) -> Path:
+    """Return the baseline file of corpus *name* measured with *tokenizer*."""
+    return BASELINE_DIR / tokenizer / f"{name}.json"
+
+
+def load_baseline(name: str, tokenizer: str) -> dict[str, object] | None:
+    """Return the stored *tokenizer* baseline of corpus *name*, or ``None``."""
+    try:
+        return json.loads(baseline_path(name, tokenizer).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(result: dict[str, object]) -> Path:
+    """Store *result* as the baseline of its corpus and tokenizer."""
+    path = baseline_path(str(result["corpus"]), str(result["tokenizer"]))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    return path
+
+
+def format_result(result: dict[str, object], baseline: dict[str, object] | None) -> str:
+    """Return a table of stage timings, with baseline ratios when available."""
+    lines = [
+        f"{result['corpus']}: {result['files']} files, {result['bytes']:,} bytes, "
+        f"{result['splits']} splits ({result['tokenizer']} tokens)"
+    ]
+    scale = (
+        result["calibration"] / baseline["calibration"]  # type: ignore[operator]
+        if baseline
+        else None
+    )
+    for stage, seconds in result["stages"].items():  # type: ignore[union-attr]
+        line = f"  {stage:<13}{seconds:9.3f}s"
+        expected = (
+            baseline["stages"].get(stage)  # type: ignore[union-attr]
+            if baseline
+            else None
+        )
+        if expected:
+            line += f"  x{seconds / (expected * scale):.2f} of baseline"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point; returns the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("corpora", nargs="*", help="corpus names (default: files-10)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per corpus")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="allowed slowdown factor per stage",
+    )
+    parser.add_argument("--update", action="store_true", help="store new baselines")
+    parser.add_argument("--list", action="store_true", help="list corpora and exit")
+    args = parser.parse_args(argv)
+    if args.list:
+        for name, spec in CORPORA.items():
+            print(f"{name:<16}{spec}")
+        return 0
+    unknown = sorted(set(args.corpora) - set(CORPORA))
+    if unknown:
+        parser.error(f"unknown corpora: {', '.join(unknown)}")
+    regressions = []
+    for name in args.corpora or ["files-10"]:
+        result = benchmark(name, repeat=args.repeat)
+        baseline = load_baseline(name, str(result["tokenizer"]))
+        print(format_result(result, baseline))
+        if args.update:
+            print(f"  baseline written to {save_baseline(result)}")
+        elif baseline is None:
+            print(
+                f"WARNING {name}: no baseline for the {result['tokenizer']} "
+                "tokenizer; run with --update to record one",
+                file=sys.stderr,
+            )
+        else:
+            regressions.extend(compare(result, baseline, args.tolerance))
+    for message in regressions:
+        print(f"REGRESSION {message}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,10 +9,16 @@ Read more about conftest.py under:
 
 import logging
 
-# import pytest
+import pytest
 
 # Configure basic logging for all tests to see output from the library
 logging.basicConfig(
     level=logging.DEBUG,
     format="%(asctime)s:%(levelname)s:%(name)s:%(module)s:%(funcName)s:%(lineno)d: %(message)s",
 )
+
+
+@pytest.fixture(autouse=True)
+def _no_openai_api_key(monkeypatch):
+    """Keep tests from sending summary requests to the real OpenAI API."""
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
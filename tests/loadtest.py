@@ -0,0 +1,201 @@
+"""Load test for the split-python4gpt JSON-RPC server.
+
+Sends concurrent requests from several client threads, each with its own
+connection, and reports p50/p99 latency per method together with
+throughput and the number of requests rejected as busy.  Payloads are
+synthetic modules from ``tests/benchmark.py``.  Without ``--address`` an
+in-process server is started on a free localhost port (or a temporary Unix
+socket with ``--unix``).
+
+Run from the repository root::
+
+    python tests/loadtest.py --clients 8 --requests 50
+    python tests/loadtest.py --address http://127.0.0.1:8765 --methods split
+    python tests/loadtest.py --unix --workers 2 --queue 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from benchmark import CorpusSpec, module_source
+
+from split_python4gpt.server import RPC_METHODS, RpcClient, RpcError, SplitServer
+
+DEFAULT_METHODS = ("minify", "gptok_size", "process_py_code", "split")
+
+
+def payloads(files: int) -> dict[str, dict[str, object]]:
+    """Return the parameters sent with each method."""
+    spec = CorpusSpec(files=files, functions=4)
+    sources = {
+        f"pkg/mod_{i}.py": module_source(spec, i, [f"pkg.mod_{i - 1}"] if i else [])
+        for i in range(files)
+    }
+    module = sources["pkg/mod_0.py"]
+    return {
+        "minify": {"code": module},
+        "gptok_size": {"text": module},
+        "process_py_code": {"code": module},
+        "split": {"files": sources, "limit": 1024},
+        "stats": {},
+    }
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of sorted *values*."""
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+def run_clients(
+    address: str, methods: list[str], clients: int, requests: int, files: int
+) -> tuple[dict[str, list[float]], dict[str, int], dict[str, int], float]:
+    """Send *requests* per client, cycling through *methods*.
+
+    Returns:
+        Latencies in seconds per method, busy rejections and other errors
+        per method, and the wall time of the run.
+    """
+    params = payloads(files)
+    latencies: dict[str, list[float]] = defaultdict(list)
+    busy: dict[str, int] = defaultdict(int)
+    errors: dict[str, int] = defaultdict(int)
+    lock = threading.Lock()
+    ready = threading.Barrier(clients + 1)
+
+    def client(index: int) -> None:
+        with RpcClient(address) as rpc:
+            ready.wait()
+            for n in range(requests):
+                method = methods[(index + n) % len(methods)]
+                start = time.perf_counter()
+                try:
+                    rpc.call(method, **params[method])
+                except RpcError as exc:
+                    with lock:
+                        if exc.code == -32000:
+                            busy[method] += 1
+                        else:
+                            errors[method] += 1
+                    continue
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies[method].append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return latencies, busy, errors, time.perf_counter() - start
+
+
+def format_report(
+    latencies: dict[str, list[float]],
+    busy: dict[str, int],
+    errors: dict[str, int],
+    seconds: float,
+) -> str:
+    """Return a latency table with one row per method and a total."""
+    lines = [
+        f"{'method':<18}{'ok':>7}{'busy':>7}{'errors':>8}"
+        f"{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    ]
+    everything: list[float] = []
+    for method in sorted(set(latencies) | set(busy) | set(errors)):
+        values = sorted(latencies[method])
+        everything.extend(values)
+        if values:
+            p50, p99, top = (
+                percentile(values, 0.5) * 1000,
+                percentile(values, 0.99) * 1000,
+                values[-1] * 1000,
+            )
+            timing = f"{p50:>10.2f}{p99:>10.2f}{top:>10.2f}"
+        else:
+            timing = f"{'-':>10}{'-':>10}{'-':>10}"
+        lines.append(
+            f"{method:<18}{len(values):>7}{busy[method]:>7}{errors[method]:>8}{timing}"
+        )
+    everything.sort()
+    if everything:
+        lines.append(
+            f"{'all':<18}{len(everything):>7}{sum(busy.values()):>7}"
+            f"{sum(errors.values()):>8}{percentile(everything, 0.5) * 1000:>10.2f}"
+            f"{percentile(everything, 0.99) * 1000:>10.2f}"
+            f"{everything[-1] * 1000:>10.2f}"
+        )
+        lines.append(
+            f"{len(everything) / seconds:.1f} requests/s over {seconds:.2f}s "
+            f"(mean {statistics.fmean(everything) * 1000:.2f} ms)"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point; returns the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--address", help="server URL or Unix socket to load")
+    parser.add_argument(
+        "--unix", action="store_true", help="in-process server on a Unix socket"
+    )
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument(
+        "--methods",
+        default=",".join(DEFAULT_METHODS),
+        help=f"comma-separated methods out of {', '.join(RPC_METHODS)}",
+    )
+    parser.add_argument("--files", type=int, default=10, help="modules per split call")
+    parser.add_argument("--workers", type=int, default=4, help="in-process workers")
+    parser.add_argument("--queue", type=int, default=64, help="in-process queue size")
+    args = parser.parse_args(argv)
+    methods = [method.strip() for method in args.methods.split(",") if method.strip()]
+    unknown = sorted(set(methods) - set(RPC_METHODS))
+    if unknown:
+        parser.error(f"unknown methods: {', '.join(unknown)}")
+
+    if args.address:
+        result = run_clients(
+            args.address, methods, args.clients, args.requests, args.files
+        )
+        print(format_report(*result))
+        return 0
+
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    with (
+        tempfile.TemporaryDirectory() as tmp,
+        SplitServer(
+            PyLLMSplitter(), workers=args.workers, queue_size=args.queue
+        ) as server,
+    ):
+        if args.unix:
+            address = server.bind_unix(Path(tmp) / "split4gpt.sock")
+        else:
+            address = server.bind_http()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            result = run_clients(
+                address, methods, args.clients, args.requests, args.files
+            )
+        finally:
+            server.shutdown()
+            thread.join()
+    print(f"In-process server on {address}, {args.workers} workers")
+    print(format_report(*result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
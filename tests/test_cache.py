@@ -0,0 +1,54 @@
+"""Tests for the on-disk python-minifier result cache."""
+
+import os
+from pathlib import Path
+
+from split_python4gpt.cache import MinifyCache
+from split_python4gpt.minifier import PyTypingMinifier
+
+
+def test_minify_uses_cache(tmp_path):
+    minifier = PyTypingMinifier()
+    cache = minifier.enable_minify_cache(tmp_path / "cache")
+    in_code = (Path(__file__).parent / "data" / "in_test.py").read_text()
+
+    first = minifier.minify(in_code)
+    second = minifier.minify(in_code)
+    assert first == second
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Different options must not share an entry
+    minifier.minify(in_code, remove_literal_statements=False)
+    assert cache.misses == 2
+
+
+def test_cache_persists_across_instances(tmp_path):
+    options = {"remove_pass": True}
+    MinifyCache(tmp_path).put("pass", options, "")
+    cache = MinifyCache(tmp_path)
+    assert cache.get("pass", options) == ""
+    assert cache.get("pass", {"remove_pass": False}) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = MinifyCache(tmp_path, max_bytes=250)
+    for i in range(3):
+        cache.put(f"x={i}", {}, "y" * 100)
+        # Make entry age follow insertion order regardless of timer resolution
+        os.utime(cache._entry_path(cache.key(f"x={i}", {})), (i, i))
+    assert cache.get("x=0", {}) is None
+    assert cache.get("x=2", {}) == "y" * 100
+    assert cache.size() <= 250
+
+
+def test_process_py_cache_flag(tmp_path):
+    in_folder = Path(__file__).parent / "data" / "folder_in"
+    out_dir = tmp_path / "out"
+    PyTypingMinifier().process_py(in_folder, out_dir, types=False, cache=True)
+    minifier = PyTypingMinifier()
+    minifier.process_py(in_folder, out_dir, types=False, cache=True, jobs=2)
+    assert (out_dir / ".split4gpt-cache").is_dir()
+    assert minifier.minify_cache.stats()["hits"] == 2
+    assert minifier.minify_cache.stats()["misses"] == 0
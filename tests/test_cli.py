@@ -121,4 +121,44 @@ def func2():
         split_dir = output_dir / "split4gpt"
         assert split_dir.exists()
         split_files = list(split_dir.glob("split*.py"))
-        assert len(split_files) > 0
\ No newline at end of file
+        assert len(split_files) > 0
+
+
+HEAVY_MODULES = (
+    "asyncio",
+    "concurrent.futures.process",
+    "fire",
+    "python_minifier",
+    "sqlite3",
+    "tiktoken",
+    "urllib.request",
+)
+
+
+def _imported_modules(code: str) -> set[str]:
+    """Return the modules imported by running *code* in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    return {
+        line.rpartition("|")[2].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+def test_cli_import_is_lazy():
+    """Importing the package or its CLI module must not load heavy dependencies."""
+    modules = _imported_modules("import split_python4gpt.__main__")
+    assert not modules.intersection(HEAVY_MODULES)
+
+
+def test_splitter_construction_is_lazy():
+    """Constructing a splitter must not load the tokenizer or LLM client stack."""
+    modules = _imported_modules(
+        "from split_python4gpt.minifier import PyLLMSplitter; PyLLMSplitter()"
+    )
+    assert not modules.intersection({"asyncio", "tiktoken", "urllib.request"})
@@ -0,0 +1,100 @@
+"""Tests for scandir-based discovery with excludes and .gitignore rules."""
+
+from pathlib import Path
+
+from split_python4gpt.discovery import Discovery, PathRules
+from split_python4gpt.minifier import PyLLMSplitter
+
+
+def _tree(root: Path, files: dict[str, str]) -> None:
+    for rel_path, text in files.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def _rel(root: Path, paths: list[Path]) -> list[str]:
+    return [path.relative_to(root).as_posix() for path in paths]
+
+
+def test_path_rules_follow_gitignore_semantics():
+    rules = PathRules()
+    rules.add_lines(["# comment", "*.log", "/build/", "docs/**/gen_*.py", "!keep.log"])
+    assert rules.match("a/b/x.log", False)
+    assert not rules.match("a/keep.log", False)
+    assert rules.match("build", True)
+    assert not rules.match("build", False)  # folders only
+    assert not rules.match("src/build", True)  # anchored to the root
+    assert rules.match("docs/gen_a.py", False)
+    assert rules.match("docs/api/v1/gen_b.py", False)
+    assert not rules.match("docs/api/main.py", False)
+
+    nested = PathRules()
+    nested.add("*.py", "pkg/sub")
+    assert nested.match("pkg/sub/a.py", False)
+    assert not nested.match("pkg/a.py", False)
+
+
+def test_scan_prunes_excluded_folders_and_sorts(tmp_path):
+    _tree(
+        tmp_path,
+        {
+            "z.py": "",
+            "pkg/__init__.py": "",
+            "pkg/b.py": "",
+            "pkg/a.txt": "",
+            "pkg/gen/out.py": "",
+            "pkg/sub/ignored.py": "",
+            "pkg/sub/kept.py": "",
+            "pkg/.gitignore": "gen/\nsub/*.py\n!sub/kept.py\n",
+            ".venv/lib/site.py": "",
+            "env2/pyvenv.cfg": "",
+            "env2/lib/x.py": "",
+            "node_modules/pkg/setup.py": "",
+            "build/lib/pkg.py": "",
+            "src/build/keep.py": "",
+            "tests/test_a.py": "",
+        },
+    )
+    discovery = Discovery(exclude=["tests/"])
+    found = _rel(tmp_path, discovery.scan(tmp_path))
+
+    assert found == [
+        "pkg/__init__.py",
+        "pkg/b.py",
+        "pkg/sub/kept.py",
+        "src/build/keep.py",
+        "z.py",
+    ]
+    assert discovery.dirs_pruned == 6  # .venv, env2, node_modules, build, gen, tests
+    assert discovery.seconds > 0
+
+    everything = Discovery(default_excludes=False, gitignore=False).scan(tmp_path)
+    assert len(everything) == 12
+
+
+def test_scan_includes_and_skips(tmp_path):
+    _tree(tmp_path, {"src/app/a.py": "", "src/app/b.pyi": "", "scripts/s.py": ""})
+    assert _rel(tmp_path, Discovery(include=["src/**/*.py*"]).scan(tmp_path)) == [
+        "src/app/a.py",
+        "src/app/b.pyi",
+    ]
+    skipped = Discovery(skip=[tmp_path / "src"]).scan(tmp_path)
+    assert _rel(tmp_path, skipped) == ["scripts/s.py"]
+
+
+def test_rerun_does_not_pick_up_own_output(tmp_path):
+    _tree(tmp_path, {"pkg/a.py": "def f():\n    return 1\n", "b.py": "x = 1\n"})
+    out_dir = tmp_path / "out"
+    for _ in range(2):
+        splitter = PyLLMSplitter()
+        splitter.process_py(tmp_path, out_dir, types=False)
+        splitter.write_splits()
+        assert sorted(_rel(out_dir, list(splitter.code_folder_data))) == [
+            "b.py",
+            "pkg/a.py",
+        ]
+
+    in_place = PyLLMSplitter()
+    in_place.process_py(out_dir, types=False)
+    assert "split4gpt/split1.py" not in _rel(out_dir, list(in_place.code_folder_data))
@@ -0,0 +1,64 @@
+"""Tests for atomic, skip-if-unchanged output writes."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from split_python4gpt.fileio import atomic_write, write_if_changed
+from split_python4gpt.minifier import PyLLMSplitter
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+def test_write_if_changed_skips_identical_content(tmp_path):
+    path = tmp_path / "out.py"
+    assert write_if_changed(path, "x=1\n")
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+    assert not write_if_changed(path, "x=1\n")
+    assert path.stat().st_mtime_ns == 1_000_000_000
+
+    assert write_if_changed(path, "x=2\n")
+    assert path.read_text() == "x=2\n"
+    assert path.stat().st_mtime_ns != 1_000_000_000
+    assert [p.name for p in tmp_path.iterdir()] == ["out.py"]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX permission bits")
+def test_write_if_changed_keeps_permissions(tmp_path):
+    path = tmp_path / "tool.py"
+    path.write_text("old\n")
+    path.chmod(0o751)
+    write_if_changed(path, "new\n")
+    assert path.stat().st_mode & 0o777 == 0o751
+
+
+def test_atomic_write_cleans_up_on_failure(tmp_path):
+    path = tmp_path / "missing" / "out.bin"
+    with pytest.raises(FileNotFoundError):
+        atomic_write(path, b"data")
+    atomic_write(tmp_path / "out.bin", b"data")
+    assert (tmp_path / "out.bin").read_bytes() == b"data"
+    with pytest.raises(OSError):
+        atomic_write(tmp_path, b"data")  # replacing a folder fails
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out.bin"]
+
+
+def test_rerun_leaves_unchanged_outputs_untouched(tmp_path):
+    out_dir = tmp_path / "out"
+    splitter = PyLLMSplitter(gptok_threshold=10)
+    splitter.process_py(DATA_DIR / "folder_in", out_dir, types=False)
+    splitter.write_splits()
+    outputs = sorted(p for p in out_dir.rglob("*.py"))
+    mtimes = {p: p.stat().st_mtime_ns for p in outputs}
+
+    rerun = PyLLMSplitter(gptok_threshold=10)
+    profiler = rerun.enable_profiler()
+    rerun.process_py(DATA_DIR / "folder_in", out_dir, types=False)
+    rerun.write_splits()
+
+    assert sorted(out_dir.rglob("*.py")) == outputs
+    assert {p: p.stat().st_mtime_ns for p in outputs} == mtimes
+    assert profiler.counters["writes_skipped"] == len(outputs)
+    assert profiler.summary()["read"]["calls"] == len(rerun.code_summary)
@@ -0,0 +1,106 @@
+"""Tests for the import graph and import-ordered splitting."""
+
+from ast import parse
+from pathlib import Path
+
+from split_python4gpt.imports import (
+    cross_split_edges,
+    import_graph,
+    import_order,
+    imported_names,
+    module_name,
+    package_prefix,
+)
+
+
+def test_module_name_and_prefix(tmp_path):
+    pkg = tmp_path / "src" / "pkg"
+    pkg.mkdir(parents=True)
+    (pkg / "__init__.py").write_text("")
+    assert package_prefix(pkg) == "pkg"
+    assert package_prefix(tmp_path) == ""
+    assert module_name(Path("sub/__init__.py"), "pkg") == "pkg.sub"
+    assert module_name(Path("sub/mod.py")) == "sub.mod"
+
+
+def test_imported_names_resolves_relative_imports():
+    code = (
+        "import os, pkg.util\n"
+        "from . import sibling\n"
+        "from ..core import thing\n"
+        "def f():\n"
+        "    from .lazy import x\n"
+    )
+    names = imported_names(parse(code).body, "pkg.sub.mod", is_package=False)
+    assert names == [
+        "os",
+        "pkg.core",
+        "pkg.core.thing",
+        "pkg.sub",
+        "pkg.sub.lazy",
+        "pkg.sub.lazy.x",
+        "pkg.sub.sibling",
+        "pkg.util",
+    ]
+
+
+def test_import_graph_keeps_project_modules():
+    graph = import_graph(
+        {
+            "pkg": [],
+            "pkg.a": ["os", "pkg.b.func"],
+            "pkg.b": ["pkg.a", "pkg"],
+        }
+    )
+    assert graph == {"pkg": [], "pkg.a": ["pkg.b"], "pkg.b": ["pkg.a", "pkg"]}
+
+
+def test_import_order_groups_cycles_after_dependencies():
+    graph = {
+        "app": ["b", "util"],
+        "a": ["b"],
+        "b": ["a", "util"],
+        "other": [],
+        "util": [],
+    }
+    order = import_order(graph)
+    assert sorted(order) == sorted(graph)
+    assert order.index("util") < order.index("a") < order.index("app")
+    assert abs(order.index("a") - order.index("b")) == 1
+
+
+def test_cross_split_edges():
+    graph = {"a": ["b", "c"], "b": ["c"], "c": []}
+    assert cross_split_edges(graph, [["a", "b"], ["b", "c"]]) == (1, 3)
+
+
+def test_splitter_import_order_reduces_cross_split_edges(tmp_path):
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    src = tmp_path / "src"
+    src.mkdir()
+    filler = "".join(f"V{i} = {i}\n" for i in range(40))
+    files = {
+        "a_main.py": "from z_core import helper\n",
+        "b_other.py": "",
+        "c_other.py": "",
+        "z_core.py": "def helper():\n    return 1\n",
+    }
+    for name, code in files.items():
+        (src / name).write_text(code + filler)
+
+    results = {}
+    for order in ("file", "imports"):
+        splitter = PyLLMSplitter(split_order=order)
+        splitter.process_py(src, tmp_path / order, types=False, mini=False)
+        # file order a, b, c, z; room for exactly two files per split
+        splitter.code_summary = dict(sorted(splitter.code_summary.items()))
+        splitter.gptok_limit = 2 * max(
+            data.gptok_size + splitter.gptok_size(f"# File: {path}\n")
+            for path, data in splitter.code_summary.items()
+        )
+        splitter.write_splits()
+        results[order] = splitter.cross_split_edges()
+
+    assert results["file"] == (1, 1)
+    assert results["imports"] == (0, 1)
@@ -0,0 +1,128 @@
+"""Tests for incremental rebuilds driven by the build manifest."""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+from split_python4gpt.manifest import Manifest
+from split_python4gpt.minifier import PyLLMSplitter, PyTypingMinifier
+
+
+def _copy_folder_in(tmp_path):
+    in_folder = tmp_path / "in"
+    shutil.copytree(Path(__file__).parent / "data" / "folder_in", in_folder)
+    return in_folder
+
+
+def _read_splits(out_dir):
+    return {p.name: p.read_text() for p in (out_dir / "split4gpt").glob("*.py")}
+
+
+def test_incremental_skips_unchanged_files(tmp_path, monkeypatch):
+    in_folder = _copy_folder_in(tmp_path)
+    out_dir = tmp_path / "out"
+    PyLLMSplitter().process_py(in_folder, out_dir, types=False, incremental=True)
+    assert (out_dir / ".split4gpt-manifest.json").exists()
+
+    (in_folder / "file1.py").write_text("def func1(a, b):\n    return a - b\n")
+    minified = []
+    original_minify = PyTypingMinifier.minify
+
+    def counting_minify(self, py_code, **options):
+        minified.append(py_code)
+        return original_minify(self, py_code, **options)
+
+    monkeypatch.setattr(PyTypingMinifier, "minify", counting_minify)
+    splitter = PyLLMSplitter()
+    paths = splitter.process_py(in_folder, out_dir, types=False, incremental=True)
+    splitter.write_splits()
+
+    assert len(paths) == 2
+    assert splitter.code_folder_data[out_dir / "subdir" / "file2.py"].cached
+    assert "return a-b" in (out_dir / "file1.py").read_text()
+    assert all("MyClass" not in code for code in minified)
+
+    full_out = tmp_path / "full"
+    full = PyLLMSplitter()
+    full.process_py(in_folder, full_out, types=False)
+    full.write_splits()
+    incremental_splits = _read_splits(out_dir)
+    full_splits = _read_splits(full_out)
+    assert incremental_splits.keys() == full_splits.keys()
+    for name, text in incremental_splits.items():
+        assert text.replace(str(out_dir), "") == full_splits[name].replace(
+            str(full_out), ""
+        )
+
+
+def test_incremental_rebuilds_when_options_change(tmp_path):
+    in_folder = _copy_folder_in(tmp_path)
+    out_dir = tmp_path / "out"
+    PyTypingMinifier().process_py(in_folder, out_dir, types=False, incremental=True)
+
+    minifier = PyTypingMinifier()
+    minifier.process_py(
+        in_folder, out_dir, types=False, incremental=True, remove_pass=False
+    )
+    assert not any(d.cached for d in minifier.code_folder_data.values())
+
+    minifier = PyTypingMinifier()
+    minifier.process_py(
+        in_folder, out_dir, types=False, incremental=True, remove_pass=False
+    )
+    assert all(d.cached for d in minifier.code_folder_data.values())
+
+
+def test_repeated_runs_reuse_manifest_in_memory(tmp_path, monkeypatch):
+    in_folder = _copy_folder_in(tmp_path)
+    out_dir = tmp_path / "out"
+    splitter = PyLLMSplitter()
+    splitter.process_py(in_folder, out_dir, types=False, incremental=True)
+    manifest = splitter.manifest
+    manifest_path = out_dir / ".split4gpt-manifest.json"
+    saved = manifest_path.read_text()
+    os.utime(manifest_path, ns=(1_000_000_000, 1_000_000_000))
+
+    def fail_load(*args, **kwargs):
+        raise AssertionError("manifest reloaded")
+
+    monkeypatch.setattr(Manifest, "load", fail_load)
+    splitter.code_folder_data = {}
+    splitter.process_py(in_folder, out_dir, types=False, incremental=True)
+    assert splitter.manifest is manifest
+    assert all(d.cached for d in splitter.code_folder_data.values())
+    assert manifest_path.stat().st_mtime_ns == 1_000_000_000  # nothing to save
+
+    (in_folder / "file1.py").unlink()
+    splitter.code_folder_data = {}
+    splitter.process_py(in_folder, out_dir, types=False, incremental=True)
+    assert manifest_path.read_text() != saved
+    assert "file1.py" not in json.loads(manifest_path.read_text())["files"]
+
+
+def test_incremental_in_place_skips_on_second_run(tmp_path):
+    in_folder = _copy_folder_in(tmp_path)
+    PyLLMSplitter().process_py(in_folder, types=False, incremental=True)
+    minified = {p: p.read_text() for p in in_folder.rglob("*.py")}
+
+    splitter = PyLLMSplitter()
+    splitter.process_py(in_folder, types=False, incremental=True)
+    assert all(d.cached for d in splitter.code_folder_data.values())
+    assert {p: p.read_text() for p in in_folder.rglob("*.py")} == minified
+
+    (in_folder / "file1.py").write_text("def func1(a, b):\n    return a - b\n")
+    splitter = PyLLMSplitter()
+    splitter.process_py(in_folder, types=False, incremental=True)
+    assert not splitter.code_folder_data[in_folder / "file1.py"].cached
+    assert splitter.code_folder_data[in_folder / "subdir" / "file2.py"].cached
+
+
+def test_types_mode_invalidates_manifest():
+    minifier = PyTypingMinifier()
+    file_mode = minifier._manifest_options(True, "file", True, {})
+    assert file_mode != minifier._manifest_options(True, "project", True, {})
+    # without types the mode has no effect on the outputs
+    assert minifier._manifest_options(
+        False, "file", True, {}
+    ) == minifier._manifest_options(False, "project", True, {})
@@ -3,9 +3,12 @@ import logging
 import subprocess
 import sys
 import tempfile
+import threading
+import time
 
 import pytest
 
+from split_python4gpt import minifier as minifier_module
 from split_python4gpt.minifier import PyTypingMinifier
 
 
@@ -345,3 +348,563 @@ def test_process_empty_file(minifier, tmp_path):
 
     processed_code = processed_file_path.read_text()
     assert processed_code == expected_out_code
+
+
+def test_process_folder_parallel_matches_serial(tmp_path):
+    data_dir = Path(__file__).parent / "data"
+    in_folder = data_dir / "folder_in"
+
+    outputs = {}
+    for jobs in (1, 2):
+        test_out_dir = tmp_path / f"jobs_{jobs}"
+        processed_files = PyTypingMinifier().process_py(
+            py_path_or_folder=in_folder,
+            out_py_folder=test_out_dir,
+            types=False,
+            mini=True,
+            jobs=jobs,
+        )
+        outputs[jobs] = [
+            (pf.relative_to(test_out_dir), pf.read_text()) for pf in processed_files
+        ]
+
+    assert len(outputs[1]) == 2
+    assert outputs[1] == outputs[2]
+
+
+def test_infer_types_project_maps_stubs_by_relative_path(
+    minifier, tmp_path, monkeypatch
+):
+    pytest.importorskip("pytype")
+    out_dir = tmp_path / "out"
+    files = {}
+    for package in ("a", "b"):
+        py_path = out_dir / package / "utils.py"
+        py_path.parent.mkdir(parents=True)
+        py_path.write_text("def f(x):\n    return x\n")
+        files[py_path] = py_path.read_text()
+    minifier.init_folders(out_dir)
+    minifier.PY_TYPE_PY_EXE = sys.executable
+
+    def fake_run(command, cwd, **kwargs):
+        output = next(c for c in command if c.startswith("--output="))
+        pyi_root = Path(output.split("=", 1)[1])
+        for package, type_name in (("a", "int"), ("b", "str")):
+            pyi_path = pyi_root / "pyi" / package / "utils.pyi"
+            pyi_path.parent.mkdir(parents=True, exist_ok=True)
+            pyi_path.write_text(f"def f(x: {type_name}) -> {type_name}: ...\n")
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    typed = minifier.infer_types_project(files)
+
+    assert "x: int" in typed[out_dir / "a" / "utils.py"]
+    assert "x: str" in typed[out_dir / "b" / "utils.py"]
+
+
+def test_process_folder_types_project_mode_falls_back(minifier, tmp_path, caplog):
+    in_folder = Path(__file__).parent / "data" / "folder_in"
+    minifier.PY_TYPE_PY_EXE = None
+    caplog.set_level(logging.WARNING)
+
+    processed_files = minifier.process_py(
+        in_folder, tmp_path / "out", types=True, types_mode="project", mini=False
+    )
+
+    assert len(processed_files) == 2
+    for pf in processed_files:
+        rel_path = pf.relative_to(tmp_path / "out")
+        assert pf.read_text() == (in_folder / rel_path).read_text()
+    assert sum("Pytype failed for" in r.message for r in caplog.records) == 2
+
+
+def test_infer_types_many_timeout_and_order(minifier, tmp_path, monkeypatch, caplog):
+    pytest.importorskip("pytype")
+    minifier.init_folders(tmp_path)
+    minifier.PY_TYPE_PY_EXE = sys.executable
+    started = []
+
+    def fake_run(command, cwd, timeout=None):
+        started.append(Path(command[-1]).name)
+        if command[-1] == "slow.py":
+            raise subprocess.TimeoutExpired(command, timeout)
+        raise subprocess.CalledProcessError(1, command)
+
+    monkeypatch.setattr(minifier_module, "_run_process_group", fake_run)
+    caplog.set_level(logging.WARNING)
+    files = [
+        (tmp_path / "small.py", tmp_path / "small.pyi", "x = 1\n"),
+        (tmp_path / "slow.py", tmp_path / "slow.pyi", "y = 2\n" * 100),
+    ]
+
+    results = minifier.infer_types_many(files, timeout=0.1)
+
+    assert results == [code for _, _, code in files]
+    assert started == ["slow.py", "small.py"]
+    assert minifier.pytype_timeouts == [tmp_path / "slow.py"]
+    assert any("timed out for 1 of 2 files" in r.message for r in caplog.records)
+
+
+def test_infer_types_many_runs_jobs_in_separate_folders(
+    minifier, tmp_path, monkeypatch
+):
+    pytest.importorskip("pytype")
+    minifier.init_folders(tmp_path)
+    minifier.PY_TYPE_PY_EXE = sys.executable
+    outputs = []
+    both_started = threading.Barrier(2, timeout=10)
+
+    def fake_run(command, cwd, timeout=None):
+        output = Path(
+            next(c for c in command if c.startswith("--output=")).split("=", 1)[1]
+        )
+        outputs.append(output)
+        both_started.wait()  # the two runs overlap
+        type_name = "int" if command[-1].startswith("a") else "str"
+        pyi_path = output / "pyi" / Path(command[-1]).with_suffix(".pyi")
+        pyi_path.parent.mkdir(parents=True)
+        pyi_path.write_text(f"def f(x: {type_name}) -> {type_name}: ...\n")
+
+    monkeypatch.setattr(minifier_module, "_run_process_group", fake_run)
+    files = []
+    for package in ("a", "b"):
+        rel_path = Path(package, "utils.py")
+        pyi_path = minifier._pyi_path(rel_path)
+        files.append((tmp_path / rel_path, pyi_path, "def f(x):\n    return x\n"))
+
+    typed = minifier.infer_types_many(files, jobs=2)
+
+    assert "x: int" in typed[0] and "x: str" in typed[1]
+    assert len(set(outputs)) == 2 and not any(path.exists() for path in outputs)
+    assert files[0][1] == tmp_path / ".pytype" / "pyi" / "a" / "utils.pyi"
+    assert "x: str" in files[1][1].read_text()
+
+
+def test_types_stage_sources_outside_the_output_folder(
+    minifier, tmp_path, monkeypatch
+):
+    pytest.importorskip("pytype")
+    in_folder = Path(__file__).parent / "data" / "folder_in"
+    out_dir = tmp_path / "out"
+    minifier.PY_TYPE_PY_EXE = sys.executable
+    seen = {}
+
+    def fake_run(command, cwd, timeout=None):
+        rel_path = command[-1]
+        in_output = (out_dir / rel_path).exists()
+        seen[rel_path] = (Path(cwd, rel_path).read_text(), in_output)
+        raise subprocess.CalledProcessError(1, command)
+
+    monkeypatch.setattr(minifier_module, "_run_process_group", fake_run)
+    writes = []
+    write_output = minifier._write_output
+    monkeypatch.setattr(
+        minifier,
+        "_write_output",
+        lambda path, code: (writes.append(path), write_output(path, code)),
+    )
+
+    processed_files = minifier.process_py(in_folder, out_dir, types=True, mini=True)
+
+    assert sorted(writes) == sorted(processed_files)
+    for rel_path, (source, in_output) in seen.items():
+        assert source == (in_folder / rel_path).read_text() and not in_output
+    assert len(seen) == 2 and minifier.pytype_sources is None
+    assert not list((out_dir / ".pytype").glob("src-*"))
+
+
+def test_run_process_group_kills_grandchildren_on_timeout(tmp_path):
+    psutil = pytest.importorskip("psutil")
+    pid_file = tmp_path / "grandchild.pid"
+    script = (
+        "import pathlib, subprocess, sys, time; "
+        "sleep = 'import time; time.sleep(60)'; "
+        "child = subprocess.Popen([sys.executable, '-c', sleep]); "
+        f"pathlib.Path({str(pid_file)!r}).write_text(str(child.pid)); "
+        "time.sleep(60)"
+    )
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        minifier_module._run_process_group([sys.executable, "-c", script], tmp_path, 2)
+
+    grandchild = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            if psutil.Process(grandchild).status() == psutil.STATUS_ZOMBIE:
+                break
+        except psutil.NoSuchProcess:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("pytype's grandchild processes survived the timeout")
+
+
+def test_memory_limited_command_sets_rlimit(tmp_path):
+    resource = pytest.importorskip("resource")
+    command = [
+        sys.executable,
+        "-c",
+        "import resource; print(resource.getrlimit(resource.RLIMIT_AS)[0])",
+    ]
+    assert minifier_module._memory_limited(command, None) is command
+
+    limited = minifier_module._memory_limited(command, 4096)
+    completed = subprocess.run(limited, capture_output=True, text=True, check=True)
+
+    assert int(completed.stdout) == 4096 * 1024 * 1024
+    assert resource.getrlimit(resource.RLIMIT_AS)[0] != 4096 * 1024 * 1024
+
+
+def test_process_py_code_slices_sections():
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    splitter = PyLLMSplitter(gptok_threshold=10_000)
+    py_code = (
+        "import os\n"
+        "x = 1; y = 'żółw'\n"
+        "@staticmethod\n"
+        "def f(a):\n"
+        "    return a + 1\n"
+        "class C:\n"
+        "    def g(self):\n"
+        "        return 'ünï'\n"
+    )
+
+    sections = splitter.process_py_code(splitter.minify(py_code))
+
+    assert [sec["py"] for sec in sections] == [
+        "import os\n",
+        "x=1\n",
+        "y='żółw'\n",
+        "@staticmethod\ndef f(a):return a+1\n",
+        "class C:\n\tdef g(self):return'ünï'\n",
+    ]
+    assert all(sec["gptok_size"] == splitter.gptok_size(sec["py"]) for sec in sections)
+    compile("".join(sec["py"] for sec in sections), "<sections>", "exec")
+    assert splitter.process_py_code(py_code) == sections
+    assert splitter.process_py_code(py_code, minified=True)[0]["py"] == "import os\n"
+
+
+def test_unminified_outputs_still_get_minified_sections(tmp_path):
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    data_dir = Path(__file__).parent / "data"
+    splitter = PyLLMSplitter(gptok_threshold=10_000)
+    splitter.process_py(
+        data_dir / "folder_in", tmp_path / "out", types=False, mini=False
+    )
+
+    path = str(tmp_path / "out" / "file1.py")
+    assert "    return a + b" in Path(path).read_text()
+    record = splitter.code_summary[path]
+    source = splitter._file_source(path, record)
+    assert [sec.render(source) for sec in record.sections] == [
+        "def func1(a,b):\n\t'Docstring for func1.'\n"
+        "\tif a>b:print('a is greater')\n"
+        "\telse:print('b is greater or equal')\n\treturn a+b\n",
+        "x=func1(10,5)\n",
+    ]
+
+
+def test_split_records_keep_offsets_not_sources(tmp_path):
+    from split_python4gpt.minifier import PyLLMSplitter
+    from split_python4gpt.records import Section
+
+    data_dir = Path(__file__).parent / "data"
+    splitter = PyLLMSplitter(gptok_threshold=10_000)
+    splitter.process_py(data_dir / "folder_in", tmp_path / "out", types=False)
+
+    for path, record in splitter.code_summary.items():
+        assert record.py_code is None
+        assert record.sections
+        assert all(sec.text is None for sec in record.sections)
+        source = Path(path).read_text()
+        expected = splitter.process_py_code(source)
+        assert [sec.as_dict(source) for sec in record.sections] == expected
+        assert splitter.code_folder_data[Path(path)] is record
+
+    section = Section(7, 2, 9, exact=False)
+    assert Section.from_json(section.to_json()) == section
+    owned = Section(3, text="x=1\n")
+    assert Section.from_json(owned.to_json()) == owned
+    assert owned.render("ignored") == "x=1\n"
+
+
+def test_file_records_still_support_item_access():
+    from split_python4gpt.records import FileRecord
+
+    record = FileRecord(Path("a.py"), Path("a.py"), Path("a.pyi"), py_code="x=1\n")
+    with pytest.warns(DeprecationWarning, match=r"\.py_code"):
+        assert record["py_code"] == "x=1\n"
+    with pytest.warns(DeprecationWarning):
+        record["gptok_size"] = 3
+    assert record.gptok_size == 3
+    with pytest.raises(KeyError):
+        record["missing"]
+
+
+def test_process_py_code_stubs_oversized_methods():
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    splitter = PyLLMSplitter(gptok_threshold=20)
+    splitter.llm_summarizer = None
+    body = "\n".join(f"        v{i} = {i}" for i in range(30))
+    py_code = (
+        f"class C:\n    def small(self):\n        return 1\n"
+        f"    def big(self):\n{body}\n"
+    )
+
+    (section,) = splitter.process_py_code(splitter.minify(py_code))
+
+    assert "def small(self):return 1" in section["py"]
+    assert "def big(self):..." in section["py"]
+    assert "v29" not in section["py"]
+
+
+def test_iter_splits_streams_and_releases(tmp_path):
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    in_folder = Path(__file__).parent / "data" / "folder_in"
+    splitter = PyLLMSplitter(gptok_limit=20)
+    splitter.process_py(in_folder, tmp_path / "out", types=False)
+
+    splits = splitter.iter_splits()
+    first = next(splits)
+    assert first.startswith("# File: ")
+    expected = [first, *splits]
+    assert len(expected) > 1
+
+    splitter.write_splits()
+    splitter.write_splits()  # sections are kept by default
+    assert splitter.split_plan_report()["greedy"]["splits"] == len(expected)
+    splitter.write_splits(release=True)
+
+    written = sorted(
+        (tmp_path / "out" / "split4gpt").glob("split*.py"),
+        key=lambda p: int(p.stem[5:]),
+    )
+    assert [p.read_text() for p in written] == expected
+    for code_data in splitter.code_summary.values():
+        assert code_data.sections is None
+        assert code_data.py_code is None
+    with pytest.raises(ValueError, match="released"):
+        splitter.write_splits()
+    with pytest.raises(ValueError, match="process_py again"):
+        next(splitter.iter_splits())
+
+
+def test_process_py_code_splits_sections_over_limit():
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    splitter = PyLLMSplitter(gptok_limit=60, gptok_threshold=10_000)
+    methods = "".join(
+        f"    @staticmethod\n    def m{i}(a, b):\n"
+        f"        x = a + {i}\n        return x * b\n"
+        for i in range(12)
+    )
+    py_code = (
+        f"@dataclass\nclass Big(Base):\n{methods}"
+        f"def f(a):\n" + "".join(f"    a{i} = a\n" for i in range(60))
+    )
+
+    sections = splitter.process_py_code(splitter.minify(py_code))
+
+    assert len(sections) > 2
+    assert all(sec["gptok_size"] <= 60 for sec in sections)
+    for sec in sections:
+        compile(sec["py"], "<section>", "exec")  # every piece is valid code
+    texts = [sec["py"] for sec in sections]
+    assert texts[0].startswith("@dataclass\nclass Big(Base):\n")
+    assert texts[1].startswith("class Big(Base):  # continued\n")
+    assert any(t.startswith("def f(a):  # continued\n") for t in texts)
+    joined = "".join(texts)
+    assert all(f"def m{i}(" in joined for i in range(12))
+    assert all(f"a{i}=a" in joined for i in range(60))
+
+
+def test_split_oversized_cuts_giant_statement():
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    splitter = PyLLMSplitter()
+    text = "X=[" + ",".join(str(i) for i in range(500)) + "]\n"
+
+    pieces = splitter.split_oversized(text, 50)
+
+    assert "".join(pieces) == text
+    assert all(splitter.gptok_size(piece) <= 50 for piece in pieces)
+
+
+def test_write_splits_never_exceed_limit(tmp_path):
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    src = tmp_path / "src"
+    src.mkdir()
+    body = "".join(f"    def m{i}(self):\n        return {i}\n" for i in range(80))
+    (src / "big.py").write_text(f"class Big:\n{body}")
+
+    splitter = PyLLMSplitter(gptok_limit=80)
+    splitter.process_py(src, tmp_path / "out", types=False)
+    splitter.write_splits()
+
+    splits = list((tmp_path / "out" / "split4gpt").glob("split*.py"))
+    assert len(splits) > 1
+    assert all(splitter.gptok_size(p.read_text()) <= 80 for p in splits)
+
+
+def test_iter_splits_keeps_header_with_first_section(tmp_path):
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    src = tmp_path / "src"
+    src.mkdir()
+    for name in ("a", "b"):
+        (src / f"{name}.py").write_text("".join(f"X{i} = {i}\n" for i in range(8)))
+    splitter = PyLLMSplitter(gptok_limit=10)
+    splitter.process_py(src, tmp_path / "out", types=False)
+    header_size = splitter.gptok_size(f"# File: {tmp_path / 'out' / 'b.py'}\n")
+    splitter.gptok_limit = header_size + 8  # the last split of a.py has no room
+
+    for split in splitter.iter_splits():
+        lines = split.splitlines(keepends=True)
+        assert not lines[-1].startswith("# File: ")
+        assert sum(map(splitter.gptok_size, lines)) <= splitter.gptok_limit
+
+
+def test_split_target_specs():
+    from split_python4gpt.minifier import SplitTarget, split_target
+
+    assert split_target("gpt-3.5-turbo-16k") == SplitTarget(
+        "gpt-3.5-turbo-16k", "gpt-3.5-turbo-16k", 16384
+    )
+    assert split_target("gpt-4:6000") == SplitTarget("gpt-4-6000", "gpt-4", 6000)
+    assert split_target(("gpt-4", 8192)).name == "gpt-4"
+    for spec in ("gpt-5", "gpt-4:lots", "gpt-4:0"):
+        with pytest.raises(ValueError):
+            split_target(spec)
+
+
+def test_write_splits_for_several_targets_in_one_pass(tmp_path, monkeypatch):
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    src = tmp_path / "src"
+    src.mkdir()
+    for n in range(4):
+        body = "".join(f"def f{i}(a):\n    return a * {i + n}\n" for i in range(12))
+        (src / f"mod{n}.py").write_text(body)
+    out = tmp_path / "out"
+    (out / "split4gpt").mkdir(parents=True)
+    (out / "split4gpt" / "split1.py").write_text("# from a single-target run\n")
+
+    minified = []
+    original_minify = PyLLMSplitter.minify
+
+    def counting_minify(self, py_code, **options):
+        minified.append(py_code)
+        return original_minify(self, py_code, **options)
+
+    monkeypatch.setattr(PyLLMSplitter, "minify", counting_minify)
+    splitter = PyLLMSplitter(gptok_targets=["gpt-4:300", "gpt-4:60", "gpt-4:60"])
+    assert splitter.gptok_limit == 60
+    splitter.process_py(src, out, types=False)
+    splitter.write_splits(release=True)
+
+    assert len(minified) == 4  # processed once for both targets
+    assert not list((out / "split4gpt").glob("*.py"))
+    folders = sorted(p.name for p in (out / "split4gpt").iterdir())
+    assert folders == ["gpt-4-300", "gpt-4-60"]
+    texts = {}
+    for name, limit in (("gpt-4-300", 300), ("gpt-4-60", 60)):
+        splits = sorted(
+            (out / "split4gpt" / name).glob("split*.py"),
+            key=lambda p: int(p.stem[5:]),
+        )
+        for split in splits:  # one section per line; estimates are not additive
+            lines = split.read_text().splitlines(keepends=True)
+            assert sum(map(splitter.gptok_size, lines)) <= limit
+        texts[name] = [p.read_text() for p in splits]
+    assert len(texts["gpt-4-60"]) > len(texts["gpt-4-300"])
+    assert "".join(texts["gpt-4-60"]) == "".join(texts["gpt-4-300"])
+    assert all(record.sections is None for record in splitter.code_summary.values())
+
+
+def test_targets_with_another_tokenizer_are_recounted(tmp_path, monkeypatch):
+    import split_python4gpt.minifier as minifier_module
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    class FakeEncoding:
+        def __init__(self, name, chars_per_token):
+            self.name = name
+            self.chars_per_token = chars_per_token
+
+        def encode_ordinary(self, text):
+            return range(len(text) // self.chars_per_token)
+
+    encodings = {
+        "gpt-4": FakeEncoding("wide", 4),
+        "narrow-model": FakeEncoding("narrow", 1),
+    }
+    monkeypatch.setattr(minifier_module, "_load_encoding", encodings.get)
+
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "mod.py").write_text("".join(f"X{i} = {i}\n" for i in range(40)))
+    splitter = PyLLMSplitter(
+        gptok_model="gpt-4", gptok_targets=["gpt-4:100", "narrow-model:100"]
+    )
+    splitter.process_py(src, tmp_path / "out", types=False)
+    (record,) = splitter.code_summary.values()
+    sizes = [sec.gptok_size for sec in record.sections]
+    splitter.write_splits(release=False)
+
+    narrow = FakeEncoding("narrow", 1)
+    splits_folder = tmp_path / "out" / "split4gpt"
+    wide_splits = list((splits_folder / "gpt-4-100").glob("split*.py"))
+    narrow_splits = list((splits_folder / "narrow-model-100").glob("split*.py"))
+    assert len(narrow_splits) > len(wide_splits)
+    assert all(len(narrow.encode_ordinary(p.read_text())) <= 100 for p in narrow_splits)
+    assert splitter._target_counter("narrow-model") is not splitter.gptok_counter
+    # the shared sections keep the sizes of the primary tokenizer
+    assert [sec.gptok_size for sec in record.sections] == sizes
+
+
+def test_targets_refit_sections_over_their_limit(tmp_path, monkeypatch):
+    import split_python4gpt.minifier as minifier_module
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    class FakeEncoding:
+        def __init__(self, name, chars_per_token):
+            self.name = name
+            self.chars_per_token = chars_per_token
+
+        def encode_ordinary(self, text):
+            return range(len(text) // self.chars_per_token)
+
+    narrow = FakeEncoding("narrow", 1)
+    encodings = {"gpt-4": FakeEncoding("wide", 4), "narrow-model": narrow}
+    monkeypatch.setattr(minifier_module, "_load_encoding", encodings.get)
+
+    src = tmp_path / "src"
+    src.mkdir()
+    body = "".join(f"    value{i} = {i}\n" for i in range(20))
+    (src / "mod.py").write_text(f"def f():\n{body}    return value0\n\nX = 1\n")
+    splitter = PyLLMSplitter(
+        gptok_model="gpt-4", gptok_targets=["gpt-4:100", "narrow-model:100"]
+    )
+    splitter.process_py(src, tmp_path / "out", types=False)
+    # the function fits one section for gpt-4 but not for narrow-model
+    ((path, record),) = splitter.code_summary.items()
+    assert max(sec.gptok_size for sec in record.sections) <= 100
+    source = splitter._file_source(path, record)
+    assert any(
+        len(narrow.encode_ordinary(sec.render(source))) > 100
+        for sec in record.sections
+    )
+    splitter.write_splits()
+
+    narrow_splits = list(
+        (tmp_path / "out" / "split4gpt" / "narrow-model-100").glob("split*.py")
+    )
+    assert len(narrow_splits) > 1
+    assert all(len(narrow.encode_ordinary(p.read_text())) <= 100 for p in narrow_splits)
+    code = "".join(p.read_text() for p in narrow_splits)
+    assert all(f"value{i}=" in code for i in range(20))
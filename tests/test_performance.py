@@ -1,5 +1,9 @@
 """Performance tests for split-python4gpt."""
 
+import ctypes
+import gc
+import os
+import sys
 import time
 from pathlib import Path
 import tempfile
@@ -72,6 +76,15 @@ if __name__ == "__main__":
     path.write_text('\n'.join(content))
 
 
+def _trimmed_rss_mb(process) -> float:
+    """Return the resident memory of *process* in MB after freeing what it can."""
+    gc.collect()
+    if sys.platform.startswith("linux"):
+        # glibc keeps freed heap pages mapped until trimmed
+        getattr(ctypes.CDLL(None), "malloc_trim", lambda pad: 0)(0)
+    return process.memory_info().rss / 1024 / 1024
+
+
 @pytest.mark.performance
 def test_large_file_processing():
     """Test processing of a large Python file."""
@@ -200,4 +213,181 @@ def test_memory_usage():
         
         # Should still produce output
         assert len(processed_files) == 1
-        assert processed_files[0].exists()
\ No newline at end of file
+        assert processed_files[0].exists()
+
+        # Many files through the splitter: memory kept by the per-file records
+        from split_python4gpt.minifier import PyLLMSplitter
+
+        corpus = tmp_path / "corpus"
+        corpus.mkdir()
+        for i in range(500):
+            create_large_python_file(corpus / f"module_{i}.py", num_functions=5)
+        splitter = PyLLMSplitter()
+        splitter.gptoker  # load the tokenizer before measuring
+        before_split = _trimmed_rss_mb(process)
+        splitter.process_py(corpus, output_dir / "corpus", types=False)
+        after_split = _trimmed_rss_mb(process)
+        splitter.code_summary.clear()
+        splitter.code_folder_data.clear()
+        records = after_split - _trimmed_rss_mb(process)
+        print(
+            f"\n500 files: RSS grew {after_split - before_split:.1f} MB, "
+            f"{records:.1f} MB of it released with the per-file records"
+        )
+        assert after_split - before_split < 50.0
+
+
+@pytest.mark.performance
+def test_single_pass_sectioning_speedup():
+    """Benchmark sectioning a 5,000-function module against per-node minification."""
+    from ast import parse, unparse
+
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    splitter = PyLLMSplitter(gptok_threshold=10**9)
+    py_code = splitter.minify(
+        "\n".join(
+            f"def function_{i}(a, b):\n"
+            f"    c = a + b * {i}\n"
+            f"    if c > {i}:\n"
+            f"        return [c, a]\n"
+            f"    return {{'k': b}}"
+            for i in range(5000)
+        )
+    )
+
+    start_time = time.perf_counter()
+    sections = splitter.process_py_code(py_code, minified=True)
+    single_pass_time = time.perf_counter() - start_time
+
+    # Previous approach: unparse and re-minify every top-level node
+    start_time = time.perf_counter()
+    for node in parse(py_code).body:
+        splitter.gptok_size(
+            splitter.minify(unparse(node), remove_literal_statements=False)
+        )
+    per_node_time = time.perf_counter() - start_time
+
+    print(
+        f"\nsectioning 5000 functions: single-pass {single_pass_time:.2f}s, "
+        f"per-node minify {per_node_time:.2f}s "
+        f"({per_node_time / single_pass_time:.1f}x speedup)"
+    )
+    assert len(sections) == 5000
+    assert single_pass_time * 3 < per_node_time
+
+
+@pytest.mark.performance
+def test_batched_tokenization_throughput():
+    """Report tokens/second of batched section counting at 1, 4 and 16 threads."""
+    tiktoken = pytest.importorskip("tiktoken")
+    try:
+        encoder = tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:
+        pytest.skip(f"tiktoken encoding unavailable: {exc}")
+
+    from split_python4gpt.tokens import TokenCounter
+
+    texts = [
+        f"def function_{i}(a,b):\n\tc=a+b*{i}\n\treturn[c,a,'{'x' * (i % 50)}']\n"
+        for i in range(20000)
+    ]
+    expected = [len(encoder.encode_ordinary(text)) for text in texts]
+    total_tokens = sum(expected)
+
+    for threads in (1, 4, 16):
+        counter = TokenCounter(encoder, cache_size=0)
+        start_time = time.perf_counter()
+        sizes = counter.count_batch(texts, num_threads=threads)
+        elapsed = time.perf_counter() - start_time
+        print(f"\n{threads:>2} threads: {total_tokens / elapsed:,.0f} tokens/s")
+        assert sizes == expected
+
+
+def test_generated_corpus_is_deterministic(tmp_path):
+    """Synthetic corpora are valid Python and identical across runs."""
+    from ast import parse
+
+    from benchmark import CorpusSpec, generate_corpus
+
+    spec = CorpusSpec(files=3, functions=2, nesting=5, literal_items=10)
+    first = generate_corpus(tmp_path / "a", spec)
+    second = generate_corpus(tmp_path / "b", spec)
+    assert len(first) == 5  # corpus/__init__.py, pkg_0/__init__.py, 3 modules
+    for a, b in zip(first, second):
+        assert a.read_text() == b.read_text()
+        parse(a.read_text())
+    assert "from corpus.pkg_0 import mod_0" in first[-1].read_text()
+
+
+def test_benchmark_stages_match_process_py(tmp_path):
+    """The benchmark times the real pipeline's stages from profiler spans."""
+    from benchmark import STAGES, CorpusSpec, generate_corpus, run_stages
+
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    generate_corpus(tmp_path / "in", CorpusSpec(files=4, functions=3))
+    seconds, splits, _ = run_stages(
+        tmp_path / "in" / "corpus", tmp_path / "out", gptok_limit=600
+    )
+    assert list(seconds) == list(STAGES)
+    assert all(seconds[stage] > 0 for stage in ("read", "minify", "packing", "write"))
+
+    splitter = PyLLMSplitter(gptok_limit=600)
+    splitter.process_py(
+        tmp_path / "in" / "corpus", tmp_path / "out", types=False, mini=True
+    )
+    assert splits == list(splitter.iter_splits())
+    assert len(splits) > 1
+
+
+def test_benchmark_compare_flags_stage_regressions():
+    """Stage timings are compared after normalising by the calibration time."""
+    from benchmark import compare
+
+    baseline = {
+        "tokenizer": "estimate",
+        "calibration": 0.05,
+        "stages": {"minify": 1.0, "write": 0.001},
+    }
+    # a machine twice as slow: minify 2x slower is expected, 4x is not
+    result = {
+        "corpus": "files-10",
+        "tokenizer": "estimate",
+        "calibration": 0.1,
+        "stages": {"minify": 2.5, "write": 0.01},
+    }
+    assert compare(result, baseline) == []
+    result["stages"]["minify"] = 4.0
+    (message,) = compare(result, baseline)
+    assert message.startswith("files-10: minify took 4.000s, expected 2.000s")
+    # tiny stages only fail once the slowdown is noticeable
+    assert compare(result, baseline, tolerance=3.0) == []
+    result["stages"]["write"] = 0.05
+    assert len(compare(result, baseline, tolerance=3.0)) == 1
+    # timings with another tokenizer are not comparable
+    with pytest.raises(ValueError, match="estimate tokenizer, not cl100k_base"):
+        compare(result | {"tokenizer": "cl100k_base"}, baseline)
+
+
+@pytest.mark.performance
+@pytest.mark.skipif(
+    not os.environ.get("SPLIT4GPT_BENCHMARKS"),
+    reason="wall-clock baselines are machine-dependent; set SPLIT4GPT_BENCHMARKS=1",
+)
+@pytest.mark.parametrize(
+    "corpus", ["files-10", "deep-nesting", "huge-literals", "long-functions"]
+)
+def test_stage_timings_against_baseline(corpus):
+    """Fail when a pipeline stage is slower than its stored baseline allows."""
+    from benchmark import benchmark, compare, format_result, load_baseline
+
+    result = benchmark(corpus, repeat=2)
+    baseline = load_baseline(corpus, result["tokenizer"])
+    print("\n" + format_result(result, baseline))
+    if baseline is None:
+        pytest.fail(
+            f"no {result['tokenizer']} baseline for {corpus}; record one with "
+            f"python tests/benchmark.py {corpus} --update"
+        )
+    assert compare(result, baseline) == []
@@ -0,0 +1,68 @@
+"""Tests for the split planners."""
+
+from pathlib import Path
+
+import pytest
+
+from split_python4gpt.planner import (
+    plan_first_fit_decreasing,
+    plan_greedy,
+    plan_optimal,
+    plan_stats,
+)
+
+SIZES = [6, 5, 4, 3, 2, 6, 4]
+
+
+def _loads(bins, sizes):
+    return [sum(sizes[i] for i in b) for b in bins]
+
+
+def test_greedy_keeps_order():
+    assert plan_greedy(SIZES, 10) == [[0], [1, 2], [3, 4], [5, 6]]
+
+
+@pytest.mark.parametrize("planner", [plan_first_fit_decreasing, plan_optimal])
+def test_planners_cover_items_within_limit(planner):
+    bins = planner(SIZES, 10)
+    assert sorted(i for b in bins for i in b) == list(range(len(SIZES)))
+    assert all(load <= 10 for load in _loads(bins, SIZES))
+
+
+def test_optimal_beats_first_fit_decreasing():
+    sizes = [4, 4, 4, 3, 3, 3, 3, 3, 3]
+    assert len(plan_first_fit_decreasing(sizes, 10)) == 4
+    assert len(plan_optimal(sizes, 10)) == 3
+
+
+def test_oversized_items_get_own_split():
+    assert plan_optimal([15, 5, 5], 10) == [[0], [1, 2]]
+
+
+def test_plan_stats():
+    stats = plan_stats([[0], [1, 2]], [5, 3, 2], 10)
+    assert stats == {"splits": 2, "fill": 0.5}
+
+
+def test_splitter_planner_report(tmp_path):
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    in_folder = Path(__file__).parent / "data" / "folder_in"
+    splitter = PyLLMSplitter(gptok_limit=60, split_planner="ffd")
+    splitter.process_py(in_folder, tmp_path / "out", types=False)
+
+    report = splitter.split_plan_report()
+    assert set(report) == {"greedy", "ffd", "optimal"}
+    assert report["optimal"]["splits"] <= report["ffd"]["splits"]
+
+    splitter.write_splits()
+    splits = list((tmp_path / "out" / "split4gpt").glob("split*.py"))
+    assert len(splits) == report["ffd"]["splits"]
+    assert all(s.read_text().startswith("# File: ") for s in splits)
+
+
+def test_splitter_rejects_unknown_planner():
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    with pytest.raises(ValueError):
+        PyLLMSplitter(split_planner="random")
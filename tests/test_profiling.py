@@ -0,0 +1,113 @@
+"""Tests for timing spans, counters and Chrome trace export."""
+
+import json
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from split_python4gpt.minifier import PyLLMSplitter
+from split_python4gpt.profiling import NULL_PROFILER, Profiler
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+def test_null_profiler_records_nothing():
+    with NULL_PROFILER.span("stage", file="a.py"):
+        NULL_PROFILER.count("bytes_in", 10)
+    assert not NULL_PROFILER.enabled
+    assert NULL_PROFILER.span("a") is NULL_PROFILER.span("b")
+
+
+def test_summary_separates_total_and_self_time():
+    profiler = Profiler()
+    with profiler.span("outer"):
+        time.sleep(0.02)
+        for _ in range(2):
+            with profiler.span("inner", "file"):
+                time.sleep(0.02)
+    profiler.count("files", 2)
+    profiler.count("files")
+
+    summary = profiler.summary()
+    assert summary["inner"]["calls"] == 2
+    assert summary["outer"]["total"] >= 0.06
+    assert summary["outer"]["self"] < summary["outer"]["total"] - 0.035
+    assert summary["outer"]["self"] >= 0.015
+    assert profiler.counters == {"files": 3}
+    table = profiler.format_summary()
+    assert "outer" in table and "files" in table
+
+
+def test_trace_events_follow_chrome_format(tmp_path):
+    profiler = Profiler()
+    with profiler.span("main_stage"):
+        with profiler.span("side"):
+            pass
+    thread = threading.Thread(target=lambda: _in_span(profiler, "worker_span"))
+    thread.start()
+    thread.join()
+    profiler.count("tokens", 42)
+    trace_path = tmp_path / "trace.json"
+    profiler.write_trace(trace_path)
+
+    trace = json.loads(trace_path.read_text())
+    spans = {e["name"]: e for e in trace["traceEvents"] if e["ph"] == "X"}
+    assert set(spans) == {"main_stage", "side", "worker_span"}
+    assert spans["main_stage"]["tid"] == 0
+    assert spans["worker_span"]["tid"] == 1
+    assert spans["worker_span"]["args"] == {"file": "x.py"}
+    assert spans["side"]["ts"] >= spans["main_stage"]["ts"]
+    (counters,) = [e for e in trace["traceEvents"] if e["ph"] == "C"]
+    assert counters["args"] == {"tokens": 42}
+    assert trace["otherData"]["counters"] == {"tokens": 42}
+
+
+def _in_span(profiler, name):
+    with profiler.span(name, "file", file="x.py"):
+        pass
+
+
+def test_splitter_records_stages_and_counters(tmp_path):
+    splitter = PyLLMSplitter(gptok_threshold=10)
+    profiler = splitter.enable_profiler()
+    assert splitter.enable_profiler() is profiler
+    splitter.process_py(DATA_DIR / "folder_in", tmp_path / "out", types=False)
+    splitter.write_splits()
+
+    summary = profiler.summary()
+    for stage in ("discover", "read", "minify", "python_minifier", "parse"):
+        assert stage in summary
+    for stage in ("tokenization", "sectioning", "splits", "write"):
+        assert stage in summary
+    assert summary["read"]["calls"] == len(splitter.code_summary)
+    counters = profiler.counters
+    assert counters["files"] == len(splitter.code_summary)
+    assert counters["bytes_in"] > counters["bytes_out"] > 0
+    assert counters["sections"] > 0
+    assert counters["splits"] >= 1
+
+
+def test_cli_profile_writes_trace(tmp_path):
+    trace_path = tmp_path / "trace.json"
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "split_python4gpt",
+            str(DATA_DIR / "folder_in"),
+            "--out",
+            str(tmp_path / "out"),
+            "--types=False",
+            "--profile",
+            str(trace_path),
+        ],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "python_minifier" in result.stderr
+    assert f"Profile written to {trace_path}" in result.stderr
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    assert any(e["name"] == "minify" and e["ph"] == "X" for e in events)
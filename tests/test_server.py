@@ -0,0 +1,169 @@
+"""Tests for the JSON-RPC server mode."""
+
+import json
+import socket
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from split_python4gpt.minifier import PyLLMSplitter
+from split_python4gpt.server import (
+    INVALID_PARAMS,
+    METHOD_NOT_FOUND,
+    PARSE_ERROR,
+    SERVER_BUSY,
+    RpcClient,
+    RpcError,
+    SplitServer,
+)
+
+MODULE = '''"""Module docstring."""
+import os
+
+
+def add(a, b):
+    """Add two numbers."""
+    return a + b
+
+
+class Box:
+    size = 1
+'''
+
+
+@pytest.fixture
+def serving():
+    servers = []
+
+    def start(server, address):
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append((server, thread))
+        return address
+
+    yield start
+    for server, thread in servers:
+        server.shutdown()
+        thread.join()
+        server.close()
+
+
+def test_http_methods_match_the_splitter(serving):
+    server = SplitServer(PyLLMSplitter(gptok_limit=40), workers=2)
+    local = PyLLMSplitter(gptok_limit=40)
+    with RpcClient(serving(server, server.bind_http())) as rpc:
+        assert rpc.call("minify", code=MODULE) == local.minify(MODULE)
+        assert rpc.call(
+            "minify", code=MODULE, options={"remove_literal_statements": False}
+        ) == local.minify(MODULE, remove_literal_statements=False)
+        assert rpc.call("gptok_size", text=MODULE) == local.gptok_size(MODULE)
+        assert rpc.call("process_py_code", code=MODULE) == local.process_py_code(MODULE)
+
+        files = {"pkg/b.py": "from pkg import a\nY = a.X\n", "pkg/a.py": "X = 1\n"}
+        result = rpc.call("split", files=files, order="imports")
+        assert result["paths"] == [["pkg/a.py", "pkg/b.py"]]
+        assert result["splits"][0].startswith("# File: pkg/a.py\nX=1\n")
+        small = rpc.call("split", files={"m.py": MODULE}, limit=12, mini=False)
+        assert len(small["splits"]) > 1
+        assert "".join(small["splits"]).startswith("# File: m.py\n")
+
+        assert rpc.call("stats")["requests"] == 7
+
+
+def test_unix_socket_errors_notifications_and_batches(serving):
+    if not hasattr(socket, "AF_UNIX"):
+        pytest.skip("Unix sockets unavailable")
+    server = SplitServer(PyLLMSplitter())
+    with tempfile.TemporaryDirectory() as tmp:
+        address = serving(server, server.bind_unix(Path(tmp) / "rpc.sock"))
+        with RpcClient(address) as rpc:
+            assert rpc.call("gptok_size", text="x" * 40) == PyLLMSplitter().gptok_size(
+                "x" * 40
+            )
+            with pytest.raises(RpcError) as error:
+                rpc.call("write_splits")
+            assert error.value.code == METHOD_NOT_FOUND
+            with pytest.raises(RpcError) as error:
+                rpc.call("minify", source="x = 1")
+            assert error.value.code == INVALID_PARAMS
+            with pytest.raises(RpcError) as error:
+                rpc.call("process_py_code", code="def broken(:\n")
+            assert error.value.code == INVALID_PARAMS
+            with pytest.raises(RpcError) as error:
+                rpc.call("split", files={"a.py": "x = 1\n"}, planner="best")
+            assert error.value.code == INVALID_PARAMS
+
+        with socket.socket(socket.AF_UNIX) as raw:
+            raw.connect(address)
+            reader = raw.makefile("rb")
+            batch = [
+                {"jsonrpc": "2.0", "method": "gptok_size", "params": ["abcd"]},
+                {"jsonrpc": "2.0", "id": 7, "method": "gptok_size", "params": ["abcd"]},
+            ]
+            raw.sendall(json.dumps(batch).encode() + b"\n{not json\n")
+            assert json.loads(reader.readline()) == [
+                {"jsonrpc": "2.0", "id": 7, "result": 1}
+            ]
+            assert json.loads(reader.readline())["error"]["code"] == PARSE_ERROR
+            reader.close()
+    assert not Path(address).exists()
+
+
+def test_full_queue_rejects_requests():
+    server = SplitServer(PyLLMSplitter(), workers=1, queue_size=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_gptok_size(text):
+        started.set()
+        release.wait(10)
+        return 0
+
+    server.rpc_gptok_size = slow_gptok_size
+    request = {"jsonrpc": "2.0", "id": 1, "method": "gptok_size", "params": ["x"]}
+    responses = []
+    threads = [
+        threading.Thread(target=lambda: responses.append(server.handle(request)))
+        for _ in range(2)
+    ]
+    threads[0].start()
+    started.wait(10)
+    threads[1].start()  # waits in the queue
+    while server.in_flight < 2:  # the second request holds the last slot
+        threading.Event().wait(0.01)
+    busy = server.handle(request)
+    release.set()
+    for thread in threads:
+        thread.join()
+    server.close()
+
+    assert busy["error"]["code"] == SERVER_BUSY
+    assert [response["result"] for response in responses] == [0, 0]
+    assert server.rpc_stats()["rejected"] == 1
+
+
+def test_concurrent_splits_are_isolated():
+    server = SplitServer(PyLLMSplitter(gptok_limit=30), workers=4)
+    results = {}
+
+    def run(n):
+        files = {
+            f"m{n}_{i}.py": f"def f{i}(a):\n    return a * {n}\n" for i in range(6)
+        }
+        results[n] = (files, server.call("split", {"files": files}))
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.close()
+
+    for files, result in results.values():
+        assert sorted({path for paths in result["paths"] for path in paths}) == sorted(
+            files
+        )
+        assert all(f"# File: {name}" in "".join(result["splits"]) for name in files)
+    assert server.splitter.code_summary == {}
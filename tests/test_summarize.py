@@ -0,0 +1,237 @@
+"""Tests for concurrent LLM summarisation against a local fake server."""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from split_python4gpt.summarize import AsyncSummarizer, RateLimiter
+
+
+class FakeChatServer(ThreadingHTTPServer):
+    """Minimal chat-completions endpoint that records concurrency."""
+
+    def __init__(self, fail_first: int = 0, delay: float = 0.05):
+        super().__init__(("127.0.0.1", 0), FakeChatHandler)
+        self.fail_first = fail_first
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/chat/completions"
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append(body)
+            failing = len(server.requests) <= server.fail_first
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+        if failing:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        code = body["messages"][-1]["content"]
+        reply = {"choices": [{"message": {"content": f"This function: {code[:12]}"}}]}
+        data = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def chat_server():
+    servers = []
+
+    def start(**kwargs):
+        server = FakeChatServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_summarize_many_concurrent_and_ordered(chat_server):
+    server = chat_server(delay=0.1)
+    summarizer = AsyncSummarizer("gpt-test", base_url=server.url, concurrency=4)
+    codes = [f"def f{i}():..." for i in range(12)]
+
+    start = time.monotonic()
+    summaries = summarizer.run(codes)
+    elapsed = time.monotonic() - start
+
+    assert summaries == [f"This function: {code[:12]}" for code in codes]
+    assert server.max_in_flight == 4
+    assert elapsed < 12 * 0.1  # faster than serial round-trips
+    assert server.requests[0]["model"] == "gpt-test"
+
+
+def test_summarize_retries_rate_limited_requests(chat_server):
+    server = chat_server(fail_first=2, delay=0)
+    summarizer = AsyncSummarizer(
+        "gpt-test", base_url=server.url, concurrency=1, backoff=0.01
+    )
+
+    assert summarizer.run(["def f():..."]) == ["This function: def f():..."]
+    assert summarizer.requests == 3
+    assert summarizer.failures == 0
+
+
+def test_summarize_gives_up_after_retries(chat_server):
+    server = chat_server(fail_first=100, delay=0)
+    summarizer = AsyncSummarizer(
+        "gpt-test", base_url=server.url, max_retries=2, backoff=0.01
+    )
+
+    assert summarizer.run(["def f():..."]) == [None]
+    assert summarizer.requests == 3
+    assert summarizer.failures == 1
+
+
+def test_rate_limiter_requests_and_tokens():
+    async def timed(limiter, costs):
+        start = time.monotonic()
+        stamps = []
+        for cost in costs:
+            await limiter.acquire(cost)
+            stamps.append(time.monotonic() - start)
+        return stamps
+
+    stamps = asyncio.run(timed(RateLimiter(rpm=2, period=0.2), [0, 0, 0]))
+    assert stamps[1] < 0.1 <= 0.19 <= stamps[2]
+
+    stamps = asyncio.run(timed(RateLimiter(tpm=100, period=0.2), [60, 60]))
+    assert stamps[1] >= 0.19
+
+
+def test_splitter_summarizes_stubbed_methods(chat_server):
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    server = chat_server(delay=0.05)
+    splitter = PyLLMSplitter(gptok_threshold=20, llm_base_url=server.url)
+    methods = "".join(
+        f"    def big{i}(self):\n" + "".join(f"        v{j} = {j}\n" for j in range(30))
+        for i in range(5)
+    )
+
+    (section,) = splitter.process_py_code(splitter.minify(f"class C:\n{methods}"))
+
+    assert len(server.requests) == 5
+    assert server.max_in_flight > 1
+    for i in range(5):
+        assert f"def big{i}(self):'This function: def big{i}(sel';..." in section["py"]
+    assert section["gptok_size"] == splitter.gptok_size(section["py"])
+
+
+def test_offline_summarizer_describes_functions():
+    from split_python4gpt.summarize import OfflineSummarizer
+
+    code = (
+        "@property\n"
+        "def size(self):\n"
+        '    """Return the size.\n\n    Details."""\n'
+        "    if not self.items: raise errors.Empty('no items')\n"
+        "    def inner(): ignored()\n"
+        "    return helper(len(self.items)) + self.log.count()\n"
+    )
+
+    assert OfflineSummarizer().run(
+        [code, "async def g(a):\n yield await fetch(a)", "x=1"]
+    ) == [
+        "This property: Return the size. Calls helper, log.count. Raises errors.Empty.",
+        "This async generator function. Calls fetch.",
+        None,
+    ]
+
+
+def test_make_summarizer_backends():
+    from split_python4gpt.summarize import (
+        LOCAL_CHAT_URL,
+        LocalHTTPSummarizer,
+        OfflineSummarizer,
+        OpenAISummarizer,
+        make_summarizer,
+    )
+
+    local = make_summarizer("local", "llama", concurrency=2)
+    assert isinstance(local, LocalHTTPSummarizer)
+    assert (local.base_url, local.concurrency) == (LOCAL_CHAT_URL, 2)
+    assert isinstance(make_summarizer("openai", "gpt-4"), OpenAISummarizer)
+    assert isinstance(make_summarizer("offline", "gpt-4", rpm=3), OfflineSummarizer)
+    with pytest.raises(ValueError):
+        make_summarizer("bogus", "gpt-4")
+
+
+def test_backend_without_run_cannot_be_created():
+    from split_python4gpt.summarize import SummarizerBackend
+
+    class NoRun(SummarizerBackend):
+        name = "norun"
+
+    with pytest.raises(TypeError):
+        NoRun("gpt-4")
+
+
+def test_splitter_offline_backend_keeps_useful_stubs():
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    splitter = PyLLMSplitter(gptok_threshold=20, llm_backend="offline")
+    body = "".join(f"        v{j} = load({j})\n" for j in range(30))
+    py_code = f"class C:\n    def big(self):\n{body}        raise KeyError\n"
+
+    (section,) = splitter.process_py_code(splitter.minify(py_code))
+
+    assert (
+        "def big(self):'This method. Calls load. Raises KeyError.';..." in section["py"]
+    )
+
+
+def test_offline_backend_sees_docstrings_removed_by_minify(tmp_path):
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    body = "".join(f"        v{j} = helper({j})\n" for j in range(30))
+    py_code = (
+        "class Index:\n"
+        "    def load(self):\n"
+        '        """Load the index from disk.\n\n        Details."""\n'
+        f"{body}"
+        "        raise KeyError\n"
+    )
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "index.py").write_text(py_code)
+    splitter = PyLLMSplitter(gptok_threshold=20, llm_backend="offline")
+
+    splitter.process_py(tmp_path / "in", tmp_path / "out", types=False)
+    (split,) = splitter.iter_splits()
+    (from_sources,) = splitter.split_sources({"index.py": py_code})
+
+    stub = (
+        "def load(self):'This method: Load the index from disk. "
+        "Calls helper. Raises KeyError.';..."
+    )
+    assert stub in split
+    assert stub in from_sources
+    assert "Details" not in split
@@ -0,0 +1,89 @@
+"""Tests for the persistent LLM summary cache."""
+
+import time
+
+from split_python4gpt.summary_cache import SummaryCache
+
+
+def test_key_depends_on_code_model_and_prompt():
+    keys = {
+        SummaryCache.key("def f():...", "gpt-4", "prompt"),
+        SummaryCache.key("def g():...", "gpt-4", "prompt"),
+        SummaryCache.key("def f():...", "gpt-3.5-turbo", "prompt"),
+        SummaryCache.key("def f():...", "gpt-4", "other prompt"),
+    }
+    assert len(keys) == 4
+
+
+def test_get_put_persists(tmp_path):
+    cache = SummaryCache(tmp_path / "s.sqlite")
+    assert cache.get("code", "m", "p") is None
+    cache.put("code", "m", "p", "This function does it.")
+    cache.close()
+
+    cache = SummaryCache(tmp_path / "s.sqlite")
+    assert cache.get("code", "m", "p") == "This function does it."
+    assert cache.get("code", "other", "p") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_ttl_expires_entries(tmp_path):
+    cache = SummaryCache(tmp_path / "s.sqlite", ttl=0.05)
+    cache.put("code", "m", "p", "summary")
+    assert cache.get("code", "m", "p") == "summary"
+    time.sleep(0.1)
+    assert cache.get("code", "m", "p") is None
+    assert cache.prune() == 1
+    assert len(cache) == 0
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = SummaryCache(tmp_path / "s.sqlite", max_entries=2)
+    for name in ("a", "b", "c"):
+        cache.put(name, "m", "p", name.upper())
+        time.sleep(0.01)
+    cache.get("a", "m", "p")  # "b" is now the least recently used
+
+    assert cache.prune() == 1
+    assert cache.get("b", "m", "p") is None
+    assert cache.get("a", "m", "p") == "A"
+    assert cache.get("c", "m", "p") == "C"
+
+
+def test_export_import_round_trip(tmp_path):
+    source = SummaryCache(tmp_path / "ci.sqlite")
+    source.put("f", "m", "p", "new summary")
+    source.put("g", "m", "p", "other")
+    assert source.export_entries(tmp_path / "seed.jsonl") == 2
+
+    target = SummaryCache(tmp_path / "local.sqlite")
+    target.put("g", "m", "p", "newer local summary")
+    (tmp_path / "seed.jsonl").open("a").write("not json\n")
+
+    assert target.import_entries(tmp_path / "seed.jsonl") == 1
+    assert target.get("f", "m", "p") == "new summary"
+    assert target.get("g", "m", "p") == "newer local summary"
+
+
+def test_cache_hit_skips_network(tmp_path):
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    # nothing listens on port 9: any request would fail
+    splitter = PyLLMSplitter(
+        gptok_threshold=20, llm_base_url="http://127.0.0.1:9/v1/chat/completions"
+    )
+    splitter.llm_summarizer.max_retries = 0
+    cache = splitter.enable_summary_cache(tmp_path / "s.sqlite")
+    body = "".join(f"        v{j} = {j}\n" for j in range(30))
+    py_code = splitter.minify(f"class C:\n    def big(self):\n{body}")
+    method_code = splitter.minify(
+        py_code.split("\n", 1)[1].replace("\t", "", 1), remove_literal_statements=False
+    )
+    summarizer = splitter.llm_summarizer
+    cache.put(method_code, summarizer.model, summarizer.system, "This method caches.")
+
+    (section,) = splitter.process_py_code(py_code)
+
+    assert summarizer.requests == 0
+    assert "'This method caches.'" in section["py"]
+    assert cache.stats()["hits"] == 1
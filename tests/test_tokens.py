@@ -0,0 +1,181 @@
+"""Tests for memoized token counting."""
+
+import re
+
+import pytest
+
+from split_python4gpt.tokens import TokenCounter
+
+
+class FakeEncoding:
+    name = "fake"
+
+    def __init__(self):
+        self.calls = 0
+        self.batches = []
+
+    def encode_ordinary(self, text):
+        self.calls += 1
+        return text.split()
+
+    def encode_ordinary_batch(self, texts, num_threads=8):
+        self.batches.append((len(texts), num_threads))
+        return [text.split() for text in texts]
+
+
+def test_token_counter_memoizes_counts():
+    encoder = FakeEncoding()
+    counter = TokenCounter(encoder)
+
+    assert counter.count("a b c") == 3
+    assert counter.count("a b c") == 3
+    assert counter.count("<|endoftext|> d") == 2
+    assert encoder.calls == 2
+    stats = counter.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+    assert stats["hit_rate"] == 1 / 3
+
+
+def test_token_counter_evicts_least_recently_used():
+    encoder = FakeEncoding()
+    counter = TokenCounter(encoder, cache_size=2)
+
+    counter.count("a")
+    counter.count("b")
+    counter.count("a")
+    counter.count("c")  # evicts "b"
+    counter.count("a")
+    assert encoder.calls == 3
+    counter.count("b")
+    assert encoder.calls == 4
+
+
+def test_token_counter_estimate_without_encoder():
+    counter = TokenCounter(None)
+    assert counter.count("x" * 40) == 10
+    assert counter.stats()["hits"] == counter.stats()["misses"] == 0
+
+
+def test_count_batch_matches_count():
+    texts = ["a b", "c", "a b", "d e f", ""]
+    encoder = FakeEncoding()
+    counter = TokenCounter(encoder)
+    counter.count("c")
+
+    assert counter.count_batch(texts, num_threads=4) == [
+        TokenCounter(FakeEncoding()).count(text) for text in texts
+    ]
+    assert encoder.batches == [(3, 4)]
+    assert counter.count("d e f") == 3
+    assert encoder.calls == 1
+
+
+def test_count_batch_without_cache():
+    encoder = FakeEncoding()
+    counter = TokenCounter(encoder, cache_size=0)
+    assert counter.count_batch(["a", "a b", "a"]) == [1, 2, 1]
+    assert encoder.batches == [(3, 8)]
+
+
+def test_token_estimator_calibration_bounds():
+    from split_python4gpt.tokens import TokenEstimator
+
+    texts = ["a b c d e f g h", "abcdefgh ij", "x y z w v u t s r q"]
+    sizes = [len(t.split()) for t in texts]
+
+    estimator = TokenEstimator.calibrate(texts, sizes, min_chars=8)
+
+    for text, size in zip(texts, sizes):
+        low, high = estimator.bounds(text)
+        assert low <= size <= high
+    assert estimator.applies_to("plain")
+    assert not estimator.applies_to("żółw")
+    assert TokenEstimator.calibrate(["short"], [1]) is None
+
+
+def test_estimated_splits_respect_limit(tmp_path):
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    py_code = "\n".join(
+        f"def f{i}({', '.join(f'a{j}' for j in range(i % 7 + 1))}):return {i}"
+        for i in range(200)
+    )
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "mod.py").write_text(py_code)
+    encoder = FakeEncoding()
+    splitter = PyLLMSplitter(
+        gptok_limit=60, gptok_estimate=True, gptok_estimate_sample=20
+    )
+    splitter.gptoker = encoder
+    splitter.gptok_counter = TokenCounter(encoder)
+
+    splitter.process_py(tmp_path / "in", tmp_path / "out", types=False)
+    splitter.write_splits()
+
+    splits = sorted((tmp_path / "out" / "split4gpt").glob("split*.py"))
+    assert len(splits) > 1
+    for split in splits:
+        assert len(split.read_text().split()) <= 60
+    assert encoder.calls + sum(n for n, _ in encoder.batches) < 200 + len(splits)
+
+
+class DigitEncoding(FakeEncoding):
+    """Every digit is a token of its own, so numbers are much denser."""
+
+    name = "digits"
+
+    def encode_ordinary(self, text):
+        self.calls += 1
+        return re.findall(r"\d|[^\d\s]+", text)
+
+    def encode_ordinary_batch(self, texts, num_threads=8):
+        self.batches.append((len(texts), num_threads))
+        return [re.findall(r"\d|[^\d\s]+", text) for text in texts]
+
+
+def _digit_splitter(**kwargs):
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    encoder = DigitEncoding()
+    splitter = PyLLMSplitter(gptok_estimate=True, **kwargs)
+    splitter.gptoker = encoder
+    splitter.gptok_counter = TokenCounter(encoder)
+    return splitter, encoder
+
+
+def test_estimator_sample_is_spread_over_all_sections():
+    from split_python4gpt.minifier import PyLLMSplitter
+
+    py_code = "\n".join(f"def f{i}(a, b):\n    return a + b" for i in range(256))
+    py_code += "\n" + "\n".join(f"D{i} = {'1234567890' * 8}" for i in range(60))
+    splitter, encoder = _digit_splitter(gptok_limit=400)
+    splits = splitter.split_sources({"m.py": py_code})
+
+    assert max(len(encoder.encode_ordinary(split)) for split in splits) <= 400
+    exact = PyLLMSplitter(gptok_limit=400)
+    exact.gptoker = encoder
+    assert len(splits) == len(exact.split_sources({"m.py": py_code}))
+
+
+@pytest.mark.parametrize("planner", ["greedy", "ffd"])
+def test_denser_sections_than_the_sample_stay_within_limit(planner):
+    from split_python4gpt.tokens import TokenEstimator
+
+    ordinary = [f"def f{i}(a,b):return a+b\n" for i in range(50)]
+    splitter, encoder = _digit_splitter(
+        gptok_limit=400, gptok_threshold=10**6, split_planner=planner
+    )
+    splitter.gptok_estimator = TokenEstimator.calibrate(  # calibrated on code only
+        ordinary, [len(encoder.encode_ordinary(text)) for text in ordinary]
+    )
+    dense = "".join(f"    x{i} = {'1234567890' * 2}\n" for i in range(40))
+    py_code = "".join(ordinary)
+    py_code += "".join(f"D{i} = {'1234567890' * 8}\n" for i in range(60))
+    py_code += f"def dense():\n{dense}"  # 671 tokens, estimated at 224
+
+    splits = splitter.split_sources({"m.py": py_code})
+
+    assert max(len(encoder.encode_ordinary(split)) for split in splits) <= 400
+    text = "".join(splits)
+    assert all(f"D{i}=" in text for i in range(60))
+    assert all(f"x{i}=" in text for i in range(40))
@@ -0,0 +1,133 @@
+"""Tests for watch mode: warm incremental rebuilds on source changes."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from split_python4gpt.minifier import PyLLMSplitter, PyTypingMinifier
+from split_python4gpt.watch import Watcher
+
+
+def _write(path, text, mtime_offset=0):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    if mtime_offset:
+        # make the change visible even on filesystems with coarse mtimes
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+
+
+@pytest.fixture
+def project(tmp_path):
+    in_dir = tmp_path / "in"
+    _write(in_dir / "pkg" / "a.py", "def f(a):\n    return a + 1\n")
+    _write(in_dir / "pkg" / "b.py", "def g(b):\n    return b * 2\n")
+    _write(in_dir / "c.py", "x = 1\n")
+    return in_dir, tmp_path / "out"
+
+
+def test_rebuild_reprocesses_only_changed_files(project, monkeypatch):
+    in_dir, out_dir = project
+    splitter = PyLLMSplitter()
+    # room for about one file per split
+    splitter.gptok_limit = splitter.gptok_size(f"# File: {out_dir}/pkg/a.py\n") + 10
+    watcher = Watcher(splitter, in_dir, out_dir, types=False, backend="poll")
+    first = watcher.rebuild()
+    assert (first.reprocessed, first.files, first.removed) == (3, 3, 0)
+    splits = sorted((out_dir / "split4gpt").glob("split*.py"))
+    assert len(splits) > 1
+    mtimes = {path: path.stat().st_mtime_ns for path in splits}
+
+    minified = []
+    original_minify = PyTypingMinifier.minify
+
+    def counting_minify(self, py_code, **options):
+        minified.append(py_code)
+        return original_minify(self, py_code, **options)
+
+    monkeypatch.setattr(PyTypingMinifier, "minify", counting_minify)
+    _write(in_dir / "c.py", "x = 2\n", mtime_offset=10**9)
+    second = watcher.rebuild()
+
+    assert (second.reprocessed, second.files) == (1, 3)
+    assert minified == ["x = 2\n"]
+    changed = {path for path in splits if path.stat().st_mtime_ns != mtimes[path]}
+    assert changed == {path for path in splits if "x=2" in path.read_text()}
+    assert len(changed) == 1
+
+    (in_dir / "pkg" / "b.py").unlink()
+    third = watcher.rebuild()
+    assert (third.reprocessed, third.files, third.removed) == (0, 2, 1)
+    assert not (out_dir / "pkg" / "b.py").exists()
+    splits = list((out_dir / "split4gpt").glob("split*.py"))
+    assert len(splits) == len(splitter.split_paths)  # stale splits removed
+    assert all("b*2" not in path.read_text() for path in splits)
+
+
+def test_wait_debounces_bursts_and_ignores_output(project):
+    in_dir, out_dir = project
+    watcher = Watcher(
+        PyLLMSplitter(),
+        in_dir,
+        in_dir / "out",
+        types=False,
+        debounce=0.1,
+        interval=0.02,
+        backend="poll",
+    )
+    watcher.rebuild()
+    stop = threading.Event()
+    assert not watcher._settle(stop)
+
+    def burst():
+        for i in range(3):
+            _write(in_dir / "pkg" / "a.py", f"y = {i}\n", mtime_offset=(i + 1) * 10**9)
+            time.sleep(0.03)
+        _write(in_dir / "out" / "extra.py", "z = 1\n")  # output is not watched
+
+    thread = threading.Thread(target=burst)
+    thread.start()
+    assert watcher.wait(stop)
+    thread.join()
+    assert watcher.snapshot()[in_dir / "pkg" / "a.py"][1] == len("y = 2\n")
+
+    watcher.rebuild()
+    threading.Timer(0.1, stop.set).start()
+    assert not watcher.wait(stop)
+
+
+def test_run_stops_on_event(project):
+    in_dir, out_dir = project
+    stop = threading.Event()
+    results = []
+
+    def on_rebuild(stats):
+        results.append(stats)
+        if len(results) == 1:
+            _write(in_dir / "d.py", "w = 1\n")
+        else:
+            stop.set()
+
+    watcher = Watcher(
+        PyLLMSplitter(),
+        in_dir,
+        out_dir,
+        types=False,
+        debounce=0.05,
+        interval=0.02,
+        backend="poll",
+    )
+    watcher.run(stop, on_rebuild)
+    assert [stats.files for stats in results] == [3, 4]
+    assert results[1].reprocessed == 1
+    assert (out_dir / "d.py").exists()
+
+
+def test_watcher_needs_separate_output(project):
+    in_dir, _ = project
+    with pytest.raises(ValueError, match="output folder"):
+        Watcher(PyLLMSplitter(), in_dir, in_dir)
+    with pytest.raises(ValueError, match="backend"):
+        Watcher(PyLLMSplitter(), in_dir, in_dir / "out", backend="inotify")